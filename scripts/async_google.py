@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Asyncio client for the Blogger and Drive REST APIs.
+
+googleapiclient executes one blocking httplib2 request at a time per connection.
+AsyncGoogleClient instead keeps one pooled, keep-alive httpx connection (HTTP/2
+when the 'h2' package is installed, so many requests share a single TCP/TLS
+connection) and bounds the number of requests in flight with a semaphore, so
+listing, uploading and publishing can overlap.
+
+Request URLs come from the cached discovery documents (google_services.py), so no
+discovery fetch happens at run time. OAuth tokens come from auth_cache.py and are
+refreshed when they expire. Every call goes through the shared per-API limiter of
+rate_limit.py, which spaces requests, retries 403 rate-limit / 429 / 5xx responses
+and records them in the quota ledger.
+
+Usage:
+    async with AsyncGoogleClient(creds) as client:
+        async for item in client.drive_list("'<folder_id>' in parents"):
+            ...
+        post = await client.blogger_insert(BLOG_ID, {"title": ..., "content": ...})
+
+Requirements:
+    pip install "httpx[http2]"
+"""
+
+import asyncio
+import json
+import re
+import uuid
+
+import httpx
+from google.auth.transport.requests import Request
+
+from google_services import api_root, discovery_document
+from rate_limit import error_reason, get_limiter, is_throttled
+from tracing import count, span
+
+DEFAULT_CONCURRENCY = 8
+PAGE_SIZE = 1000
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class AsyncGoogleClient:
+    """Pooled, concurrency-bounded client for Drive v3 and Blogger v3."""
+
+    def __init__(self, credentials, max_concurrency=DEFAULT_CONCURRENCY, base_urls=None):
+        self.credentials = credentials
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._refresh_lock = asyncio.Lock()
+        # base_urls={'drive': 'http://127.0.0.1:8765/'} points an API at another server;
+        # GOOGLE_API_ROOT does the same for every API.
+        self._base_urls = base_urls or {}
+        self._client = httpx.AsyncClient(
+            http2=_http2_available(),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    # ---------- plumbing ----------
+    def method_url(self, api, version, method, upload=False, **path_params):
+        """Builds the URL of e.g. ('drive', 'v3', 'files.list') from the discovery document."""
+        doc = discovery_document(api, version)
+        node = doc
+        for part in method.split('.')[:-1]:
+            node = node['resources'][part]
+        spec = node['methods'][method.split('.')[-1]]
+        root = self._base_urls.get(api) or api_root() or doc['rootUrl']
+        if upload:
+            path = spec['mediaUpload']['protocols']['simple']['path'].lstrip('/')
+        else:
+            path = doc['servicePath'] + spec.get('flatPath', spec['path'])
+        return root + re.sub(r'\{\+?(\w+)\}', lambda m: str(path_params[m.group(1)]), path)
+
+    async def _auth_header(self):
+        if not self.credentials.valid:
+            async with self._refresh_lock:
+                if not self.credentials.valid:
+                    with span('token_refresh'):
+                        await asyncio.to_thread(self.credentials.refresh, Request())
+        return {'Authorization': f'Bearer {self.credentials.token}'}
+
+    async def request(self, method, url, api_method='request', **kwargs):
+        """
+        Sends one request with a fresh token and returns the decoded JSON body (or None).
+        api_method (e.g. 'drive.files.list') selects the limiter and names the ledger line.
+        """
+        limiter = get_limiter(api_method.split('.')[0])
+        attempt = 0
+        while True:
+            with span('rate_wait'):
+                await limiter.acquire_async()
+            count('api.calls')
+            with span('api', method=api_method, attempt=attempt):
+                async with self._semaphore:
+                    headers = dict(kwargs.get('headers') or {})
+                    headers.update(await self._auth_header())
+                    response = await self._client.request(method, url, **dict(kwargs, headers=headers))
+            if response.is_success:
+                limiter.ledger.record(api_method)
+                limiter.on_success()
+                return response.json() if response.content else None
+
+            reason = error_reason(response.content)
+            delay = limiter.retry_delay(attempt, response.status_code, reason, response.headers)
+            limiter.ledger.record(api_method, retried=delay is not None,
+                                  throttled=is_throttled(response.status_code, reason))
+            if delay is None:
+                response.raise_for_status()
+            count('api.retries')
+            with span('backoff', seconds=round(delay, 3)):
+                await asyncio.sleep(delay)
+            attempt += 1
+
+    # ---------- Drive ----------
+    async def drive_list(self, q=None, fields='id, name', page_size=PAGE_SIZE, **params):
+        """Async generator over every file matching q, following nextPageToken."""
+        url = self.method_url('drive', 'v3', 'files.list')
+        params = dict(params, pageSize=page_size, fields=f'nextPageToken, files({fields})')
+        if q:
+            params['q'] = q
+        while True:
+            body = await self.request('GET', url, 'drive.files.list', params=params)
+            for item in body.get('files', []):
+                yield item
+            if not body.get('nextPageToken'):
+                break
+            params['pageToken'] = body['nextPageToken']
+
+    async def drive_get(self, file_id, fields='id, name'):
+        url = self.method_url('drive', 'v3', 'files.get', fileId=file_id)
+        return await self.request('GET', url, 'drive.files.get', params={'fields': fields})
+
+    async def drive_upload(self, name, parent_id, data, mime_type, fields='id, name, md5Checksum'):
+        """Uploads a small file in one multipart request."""
+        boundary = uuid.uuid4().hex
+        metadata = json.dumps({'name': name, 'parents': [parent_id]})
+        body = (f'--{boundary}\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n{metadata}\r\n'
+                f'--{boundary}\r\nContent-Type: {mime_type}\r\n\r\n').encode() + data + f'\r\n--{boundary}--'.encode()
+        url = self.method_url('drive', 'v3', 'files.create', upload=True)
+        return await self.request('POST', url, 'drive.files.create',
+                                  params={'uploadType': 'multipart', 'fields': fields},
+                                  content=body, headers={'Content-Type': f'multipart/related; boundary={boundary}'})
+
+    # ---------- Blogger ----------
+    async def blogger_insert(self, blog_id, body):
+        url = self.method_url('blogger', 'v3', 'posts.insert', blogId=blog_id)
+        return await self.request('POST', url, 'blogger.posts.insert', json=body)
+
+    async def blogger_patch(self, blog_id, post_id, body):
+        url = self.method_url('blogger', 'v3', 'posts.patch', blogId=blog_id, postId=post_id)
+        return await self.request('PATCH', url, 'blogger.posts.patch', json=body)
+
+    async def blogger_list(self, blog_id, **params):
+        """Async generator over every post of blog_id, following nextPageToken."""
+        url = self.method_url('blogger', 'v3', 'posts.list', blogId=blog_id)
+        while True:
+            body = await self.request('GET', url, 'blogger.posts.list', params=params)
+            for item in body.get('items', []):
+                yield item
+            if not body.get('nextPageToken'):
+                break
+            params['pageToken'] = body['nextPageToken']
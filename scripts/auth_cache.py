@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Shared OAuth credential cache for the Blogger and Drive scripts.
+
+Every script used to run InstalledAppFlow.run_local_server() on each invocation.
+This module persists the resulting tokens under SCRIPT_DIR/.tokens (one JSON file
+per scope set), refreshes expired tokens silently, and reuses any stored token
+whose scopes cover the ones requested. Asking for BLOGGER_SCOPES + DRIVE_SCOPES
+once gives a single token that serves both APIs in one process.
+
+Usage:
+    python auth_cache.py                 # authorise Blogger + Drive once
+    python auth_cache.py --list          # show the cached tokens and their scopes
+    python auth_cache.py --clear         # remove all cached tokens
+
+From another script:
+    from auth_cache import get_credentials, BLOGGER_SCOPES
+    creds = get_credentials(BLOGGER_SCOPES)
+
+Set BLOG_NONINTERACTIVE=1 (e.g. from cron) to fail instead of opening a browser
+when no usable token is cached.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+
+import google_auth_httplib2
+import httplib2
+from google.auth.exceptions import RefreshError
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+
+from tracing import span, traced
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CLIENT_SECRET_FILE = os.path.join(
+    SCRIPT_DIR,
+    "client_secret_4676203276-kg4ui39sai1auibi9suofqels2sqcis4.apps.googleusercontent.com.json",
+)
+TOKEN_DIR = os.path.join(SCRIPT_DIR, ".tokens")
+
+BLOGGER_SCOPES = ["https://www.googleapis.com/auth/blogger"]
+DRIVE_SCOPES = ["https://www.googleapis.com/auth/drive.metadata.readonly"]
+# Uploading into existing (user-created) folders needs the full Drive scope.
+DRIVE_WRITE_SCOPES = ["https://www.googleapis.com/auth/drive"]
+
+
+class AuthenticationRequired(RuntimeError):
+    """Raised when no cached token is usable and interactive login is disabled."""
+
+
+def _token_path(scopes):
+    key = " ".join(sorted(set(scopes)))
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(TOKEN_DIR, f"token_{digest}.json")
+
+
+def _load_token(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+        return Credentials.from_authorized_user_info(info)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_token(creds, scopes):
+    os.makedirs(TOKEN_DIR, mode=0o700, exist_ok=True)
+    path = _token_path(scopes)
+    info = json.loads(creds.to_json())
+    info["scopes"] = sorted(set(scopes))
+    tmp_path = path + ".tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(info, f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def cached_tokens():
+    """Returns a list of (path, scopes) for every token stored in TOKEN_DIR."""
+    tokens = []
+    if not os.path.isdir(TOKEN_DIR):
+        return tokens
+    for name in sorted(os.listdir(TOKEN_DIR)):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(TOKEN_DIR, name)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                scopes = json.load(f).get("scopes") or []
+        except (OSError, ValueError):
+            continue
+        tokens.append((path, scopes))
+    return tokens
+
+
+def _find_covering_token(scopes):
+    """Yields stored credentials whose scopes are a superset of 'scopes', smallest first."""
+    wanted = set(scopes)
+    candidates = [(path, stored) for path, stored in cached_tokens() if wanted <= set(stored)]
+    candidates.sort(key=lambda item: len(item[1]))
+    for path, stored in candidates:
+        creds = _load_token(path)
+        if creds is not None:
+            yield creds, stored
+
+
+def _run_flow(client_secret_file, scopes, port, open_browser):
+    if not os.path.exists(client_secret_file):
+        print(f"❌ Error: '{client_secret_file}' file not found. Check your Google API credentials.")
+        sys.exit(1)
+    if os.environ.get("BLOG_NONINTERACTIVE"):
+        raise AuthenticationRequired(
+            f"No cached token for scopes {sorted(scopes)}; run 'python auth_cache.py' interactively once."
+        )
+    flow = InstalledAppFlow.from_client_secrets_file(
+        client_secret_file, scopes, redirect_uri=f"http://localhost:{port}"
+    )
+    # Use a fixed port that is added in your Google Cloud Console's Authorized Redirect URIs
+    return flow.run_local_server(port=port, open_browser=open_browser)
+
+
+@traced('auth')
+def get_credentials(scopes, client_secret_file=CLIENT_SECRET_FILE, port=8080, open_browser=True):
+    """
+    Returns valid credentials for 'scopes', using the cache whenever possible:
+    1. A stored token covering the scopes is reused, refreshing it if expired.
+    2. Otherwise the browser flow runs once and the new token is stored.
+    """
+    scopes = sorted(set(scopes))
+
+    for creds, stored_scopes in _find_covering_token(scopes):
+        if creds.valid:
+            return creds
+        if creds.expired and creds.refresh_token:
+            try:
+                with span('token_refresh'):
+                    creds.refresh(Request())
+            except RefreshError:
+                # Revoked or expired refresh token: try the next candidate, then the flow.
+                continue
+            _save_token(creds, stored_scopes)
+            return creds
+
+    creds = _run_flow(client_secret_file, scopes, port, open_browser)
+    path = _save_token(creds, scopes)
+    print(f"🔑 Token cached: {path}")
+    return creds
+
+
+_thread_local = threading.local()
+
+
+def thread_http(credentials):
+    """
+    Returns an authorised httplib2 connection owned by the calling thread.
+    httplib2 is not thread-safe, so a shared service object is executed with
+    request.execute(http=thread_http(creds)) instead of building one per thread.
+    """
+    http = getattr(_thread_local, "http", None)
+    if http is None or http.credentials is not credentials:
+        http = google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
+        _thread_local.http = http
+    return http
+
+
+def clear_cache():
+    """Removes every cached token."""
+    for path, _ in cached_tokens():
+        os.remove(path)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--list":
+        for path, scopes in cached_tokens():
+            print(f"{os.path.basename(path)}: {' '.join(scopes)}")
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "--clear":
+        clear_cache()
+        print("🧹 Cached tokens removed.")
+        return
+
+    get_credentials(BLOGGER_SCOPES + DRIVE_SCOPES)
+    print("✅ Credentials for Blogger and Drive are cached.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the publishing pipeline, run against fake_google_api.py.
+
+Each benchmark reports operations, wall time, throughput, p50/p99 latency per
+operation and the API calls the fake server received:
+
+    substitute          substitute_img_src() over every post of the corpus
+    substitute-regex    the old regex substitution, as a baseline
+    substitute-opt      substitute with optimize_assets.py (inlining, sizes, lazy loading)
+    parse_gdrive_list   parsing a 20,000-line Gdrive.list
+    image_map_ids       loading the same folder from image_map.py's SQLite store
+    image_map_lookup    single-image lookups in that store
+    resolve_paths       resolving every corpus folder on the fake Drive (cold cache)
+    resolve_cached      the same with a warm path cache
+    list_folder         listing a 2,500-file Drive folder with pagination
+    publish             publishing every post to the fake Blogger (create_post.publish_file)
+    publish_unchanged   the same again: every post is skipped by the journal
+
+The fake Drive mirrors the corpus tree under 'HTML', so the real path-resolution
+and listing code paths run unchanged. Rate limits are lifted (the point is the
+pipeline, not the quota policy) unless --real-limits is given.
+
+With --json FILE the results are saved; with --baseline FILE each throughput is
+compared with a saved run and the script exits with 1 when one dropped by more
+than --tolerance (default 25%).
+
+Usage:
+    python bench_pipeline.py [CORPUS] [--latency S] [--error-rate F] [--only NAME[,NAME]]
+                             [--json FILE] [--baseline FILE] [--tolerance 0.25] [--real-limits]
+
+Example:
+    python bench_pipeline.py ../HTML/2025 --latency 0.02 --json bench.json
+"""
+
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google.auth.credentials import AnonymousCredentials
+
+import google_services
+import rate_limit
+from fake_google_api import FakeGoogleApi
+from tracing import setup_from_argv
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPUS = os.path.join(SCRIPT_DIR, '..', 'HTML', '2025')
+GDRIVE_LIST_LINES = 20000
+BIG_FOLDER_FILES = 2500
+PUBLISH_WORKERS = 4
+BLOG_ID = 'bench-blog'
+DEFAULT_TOLERANCE = 0.25
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+class Result:
+    """Timings of one benchmark plus the API calls it caused."""
+
+    def __init__(self, name, latencies, wall, calls, size=None):
+        self.name = name
+        self.latencies = latencies
+        self.wall = wall
+        self.calls = calls
+        self.size = size
+
+    def as_dict(self):
+        ops = len(self.latencies)
+        result = {'ops': ops, 'wall_s': round(self.wall, 4),
+                  'ops_per_s': round(ops / self.wall, 2) if self.wall else None,
+                  'p50_ms': round(1000 * statistics.median(self.latencies), 3) if ops else None,
+                  'p99_ms': round(1000 * percentile(self.latencies, 0.99), 3) if ops else None,
+                  'api_calls': sum(self.calls.values()), 'calls': dict(self.calls)}
+        if self.size:
+            result['mb_per_s'] = round(self.size / 1e6 / self.wall, 2) if self.wall else None
+        return result
+
+
+def measure(name, operations, server, workers=1, size=None):
+    """Runs every zero-argument callable in operations, timing each one."""
+    server.reset_counts()
+
+    def timed(operation):
+        start = time.perf_counter()
+        operation()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            latencies = list(executor.map(timed, operations))
+    else:
+        latencies = [timed(operation) for operation in operations]
+    wall = time.perf_counter() - start
+    return Result(name, latencies, wall, dict(server.calls), size)
+
+
+# ---------- corpus ----------
+def corpus_posts(corpus):
+    """Returns the post HTML files of the corpus (generated copies excluded)."""
+    from search_posts import html_files
+
+    return list(html_files(corpus))
+
+
+def image_map(post):
+    """A Gdrive.list-style map for the post's images/ folder (real list if present, else synthetic IDs)."""
+    from image_map import parse_gdrive_list
+
+    images_dir = os.path.join(os.path.dirname(post), 'images')
+    gdrive_list = os.path.join(images_dir, 'Gdrive.list')
+    if os.path.isfile(gdrive_list):
+        return parse_gdrive_list(gdrive_list)
+    if not os.path.isdir(images_dir):
+        return {}
+    return {name: f"fake{i:06d}" for i, name in enumerate(sorted(os.listdir(images_dir)))}
+
+
+def corpus_folders(corpus, top_mount):
+    """Relative Drive paths of every folder of the corpus."""
+    from list_drive_files_v3 import get_relative_drive_path
+
+    folders = []
+    for dirpath, dirnames, _ in os.walk(corpus):
+        dirnames.sort()
+        folders.append(get_relative_drive_path(top_mount, dirpath))
+    return folders
+
+
+# ---------- benchmarks ----------
+def bench_substitute(corpus, server):
+    from create_post import read_html_file
+    from substitute_img_src import substitute_img_src, substitute_img_src_regex
+
+    posts = [(read_html_file(path), image_map(path)) for path in corpus_posts(corpus)]
+    size = sum(len(html_content.encode('utf-8')) for html_content, _ in posts)
+    yield measure('substitute', [lambda p=p: substitute_img_src(*p) for p in posts], server, size=size)
+    yield measure('substitute-regex', [lambda p=p: substitute_img_src_regex(*p) for p in posts], server, size=size)
+
+    from optimize_assets import AssetOptimizer
+
+    optimized = [(html_content, ids, AssetOptimizer(os.path.join(os.path.dirname(path), 'images')))
+                 for path, (html_content, ids) in zip(corpus_posts(corpus), posts)]
+    yield measure('substitute-opt',
+                  [lambda p=p: substitute_img_src(p[0], p[1], optimizer=p[2]) for p in optimized], server, size=size)
+
+
+def bench_parse_gdrive_list(corpus, server, workdir):
+    from image_map import parse_gdrive_list
+
+    path = os.path.join(workdir, 'Gdrive.list')
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(GDRIVE_LIST_LINES):
+            name = f"figure {i} (copy).png" if i % 10 == 0 else f"image_{i}.jpg"
+            f.write(f"{name} (1{i:032d})\n")
+    size = os.path.getsize(path)
+    yield measure('parse_gdrive_list', [lambda: parse_gdrive_list(path)] * 10, server, size=10 * size)
+
+    from image_map import ImageMap
+
+    store = ImageMap(workdir)
+    store.ids(workdir)  # the first call imports Gdrive.list
+    yield measure('image_map_ids', [lambda: store.ids(workdir)] * 10, server)
+    names = [f"image_{i}.jpg" for i in range(1, GDRIVE_LIST_LINES, 97)]
+    yield measure('image_map_lookup', [lambda name=name: store.lookup(workdir, name) for name in names], server)
+    store.close()
+
+
+def bench_resolve(corpus, server, workdir, top_mount):
+    from drive_path_cache import DrivePathCache, resolve_paths
+
+    service = google_services.get_service('drive', 'v3', AnonymousCredentials())
+    folders = corpus_folders(corpus, top_mount)
+    cache_file = os.path.join(workdir, 'path_cache.json')
+
+    def cold():
+        if os.path.exists(cache_file):
+            os.remove(cache_file)
+        resolve_paths(service, folders, cache=DrivePathCache(cache_file))
+
+    yield measure('resolve_paths', [cold] * 5, server)
+    cache = DrivePathCache(cache_file)
+    yield measure('resolve_cached', [lambda: resolve_paths(service, folders, cache=cache)] * 5, server)
+
+
+def bench_list_folder(corpus, server):
+    from list_drive_files_v3 import iter_drive_files
+
+    service = google_services.get_service('drive', 'v3', AnonymousCredentials())
+    folder_id = server.drive.folder('bench/big')
+    if not any(folder_id in f.get('parents', []) for f in server.drive.files.values()):
+        for i in range(BIG_FOLDER_FILES):
+            server.drive.add(f"img_{i:05d}.jpg", folder_id, data=str(i).encode())
+    yield measure('list_folder', [lambda: sum(1 for _ in iter_drive_files(service, folder_id))] * 5, server)
+
+
+def bench_publish(corpus, server, workdir):
+    from auth_cache import thread_http
+    from create_post import Journal, publish_file
+
+    credentials = AnonymousCredentials()
+    service = google_services.get_service('blogger', 'v3', credentials)
+    journal = Journal(os.path.join(workdir, 'journal.jsonl'))
+    posts = corpus_posts(corpus)
+
+    def publish(path):
+        publish_file(service, BLOG_ID, path, None, journal, http=thread_http(credentials))
+
+    operations = [lambda p=p: publish(p) for p in posts]
+    # read_post_body() prints the cleaning savings of every file; keep the report readable.
+    with contextlib.redirect_stdout(io.StringIO()):
+        first = measure('publish', operations, server, workers=PUBLISH_WORKERS)
+        second = measure('publish_unchanged', operations, server, workers=PUBLISH_WORKERS)
+    yield first
+    yield second
+
+
+BENCHMARKS = ['substitute', 'parse_gdrive_list', 'resolve', 'list_folder', 'publish']
+
+
+def run(corpus, latency=0.0, error_rate=0.0, only=None, real_limits=False):
+    """Starts a fake server, runs the selected benchmarks and returns {name: result dict}."""
+    corpus = os.path.abspath(corpus)
+    top_mount = os.path.dirname(os.path.dirname(corpus))  # the fake Drive holds HTML/ at its root
+    server = FakeGoogleApi(latency=latency, error_rate=error_rate, retry_after=0.05).start()
+    previous_root = os.environ.get(google_services.API_ROOT_ENV)
+    os.environ[google_services.API_ROOT_ENV] = server.root_url
+    google_services.clear_services()
+    if not real_limits:
+        for api in ('drive', 'blogger'):
+            rate_limit.set_limits(api, 10000, 1000, 10000, backoff_base=0.05)
+
+    html_root = os.path.join(top_mount, 'HTML')
+    server.drive.add_tree(html_root if os.path.isdir(html_root) else corpus,
+                          'HTML' if os.path.isdir(html_root) else os.path.relpath(corpus, top_mount))
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            suites = {
+                'substitute': lambda: bench_substitute(corpus, server),
+                'parse_gdrive_list': lambda: bench_parse_gdrive_list(corpus, server, workdir),
+                'resolve': lambda: bench_resolve(corpus, server, workdir, top_mount),
+                'list_folder': lambda: bench_list_folder(corpus, server),
+                'publish': lambda: bench_publish(corpus, server, workdir),
+            }
+            for name in BENCHMARKS:
+                if only and name not in only:
+                    continue
+                for result in suites[name]():
+                    results[result.name] = result.as_dict()
+                    print_result(result.name, results[result.name])
+    finally:
+        server.stop()
+        google_services.clear_services()
+        if previous_root is None:
+            os.environ.pop(google_services.API_ROOT_ENV, None)
+        else:
+            os.environ[google_services.API_ROOT_ENV] = previous_root
+    return results
+
+
+def print_result(name, result):
+    extra = f"  {result['mb_per_s']:.1f} MB/s" if result.get('mb_per_s') is not None else ''
+    print(f"⏱️  {name:<18} {result['ops']:>5} ops  {result['wall_s']:>8.3f}s  {result['ops_per_s'] or 0:>9.1f} ops/s  "
+          f"p50 {result['p50_ms']:>9.3f} ms  p99 {result['p99_ms']:>9.3f} ms  "
+          f"{result['api_calls']:>5} API calls{extra}")
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Returns the names whose throughput dropped by more than tolerance against baseline."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before or not before.get('ops_per_s') or not result.get('ops_per_s'):
+            continue
+        change = result['ops_per_s'] / before['ops_per_s'] - 1
+        flag = '❌' if change < -tolerance else '✅'
+        print(f"{flag} {name:<18} {before['ops_per_s']:>9.1f} -> {result['ops_per_s']:>9.1f} ops/s ({change:+.0%}), "
+              f"API calls {before.get('api_calls')} -> {result.get('api_calls')}")
+        if change < -tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    args = setup_from_argv()[1:]
+    options = {}
+    for flag in ('--latency', '--error-rate', '--only', '--json', '--baseline', '--tolerance'):
+        if flag in args:
+            i = args.index(flag)
+            options[flag] = args[i + 1]
+            del args[i:i + 2]
+    real_limits = '--real-limits' in args
+    if real_limits:
+        args.remove('--real-limits')
+    if len(args) > 1 or (args and not os.path.isdir(args[0])):
+        print("Usage: python bench_pipeline.py [CORPUS] [--latency S] [--error-rate F] [--only NAME[,NAME]] "
+              "[--json FILE] [--baseline FILE] [--tolerance 0.25] [--real-limits]")
+        sys.exit(1)
+
+    only = set(options['--only'].split(',')) if '--only' in options else None
+    results = run(args[0] if args else DEFAULT_CORPUS, float(options.get('--latency', 0)),
+                  float(options.get('--error-rate', 0)), only, real_limits)
+
+    if '--json' in options:
+        with open(options['--json'], 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Results saved to {options['--json']}")
+    if '--baseline' in options:
+        with open(options['--baseline'], 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, float(options.get('--tolerance', DEFAULT_TOLERANCE)))
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
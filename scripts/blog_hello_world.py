@@ -13,10 +13,8 @@ Usage:
 Run the script to authenticate and create a new blog post titled 'Hello World'.
 """
 
-import json
-import os
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from auth_cache import get_credentials
+from google_services import get_service
 
 # 🔹 Replace with your Blog ID from Blogger
 BLOG_ID = "5963855917365984730"  # Blog ID from your Blogger URL
@@ -28,23 +26,12 @@ SCOPES = ["https://www.googleapis.com/auth/blogger"]
 CLIENT_SECRET_FILE = "client_secret_4676203276-kg4ui39sai1auibi9suofqels2sqcis4.apps.googleusercontent.com.json"
 
 def authenticate():
-    """Handles OAuth authentication and returns credentials."""
-    creds = None
-    # Ensure the correct JSON file exists
-    if os.path.exists(CLIENT_SECRET_FILE):
-        flow = InstalledAppFlow.from_client_secrets_file(
-            CLIENT_SECRET_FILE, SCOPES, redirect_uri="http://localhost"
-        )
-        creds = flow.run_local_server(port=8080)  # Use a fixed port to match the redirect URI
-    else:
-        print(f"❌ Error: '{CLIENT_SECRET_FILE}' file not found. Check your Google API credentials.")
-        exit()
-    
-    return creds
+    """Returns cached OAuth credentials, running the browser flow only on first use."""
+    return get_credentials(SCOPES, client_secret_file=CLIENT_SECRET_FILE)
 
 def create_blog_post(credentials, blog_id, title, content):
     """Posts a new blog entry to Blogger."""
-    service = build("blogger", "v3", credentials=credentials)
+    service = get_service("blogger", "v3", credentials)
     
     post_body = {
         "title": title,
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Incremental build of the blog tree.
+
+The manual chain
+    resolve_relative_path.py -> list_drive_files_v3.py -> substitute_img_src.py -> create_post.py
+reprocessed everything on every run. build.py models each post folder as a small
+dependency graph and only re-runs the steps whose inputs changed:
+
+    images/*  (originals)                       --derivatives-->  images/derivatives.json
+    post.html + images/Gdrive.list
+              + images/derivatives.json
+              (+ images/* with --optimize)       --substitute--->  post_Gdrive.html
+    post_Gdrive.html                             --publish------>  Blogger (create_post.py)
+
+A step is up to date when every input still has the size and mtime recorded in
+ROOT/.build_state.json; when the mtime moved, the content hash decides, so a touched
+but unchanged file does not trigger a rebuild. Folders are independent and are
+built in parallel. Posts are the HTML files of any folder; a post without an
+images/Gdrive.list (which comes from generate_gdrive_lists.py or sync_images.py)
+has nothing to substitute and is published as it is. The IDs are read through the
+site's image map (image_map.py, ROOT/.image_map.sqlite), which only re-parses a
+Gdrive.list after it changed. With --optimize the substitute step also inlines
+small images and adds dimensions and loading hints (optimize_assets.py).
+
+Usage:
+    python build.py <ROOT> [--derivatives] [--optimize] [--publish] [--workers N] [--force] [--dry-run]
+
+Example:
+    python build.py ../HTML/2025 --publish
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from image_derivatives import (MANIFEST_NAME, build_derivatives, encoding_key, file_sha256, load_manifest,
+                               source_images)
+from image_map import ImageMap, find_image_map
+from optimize_assets import AssetOptimizer
+from substitute_img_src import substitute_img_src_file
+from tracing import count, setup_from_argv, span
+
+STATE_NAME = '.build_state.json'
+OUTPUT_SUFFIX = '_Gdrive.html'
+GENERATED_SUFFIXES = (OUTPUT_SUFFIX, '_clean.html')
+DEFAULT_WORKERS = 4
+
+
+class BuildState:
+    """Recorded (mtime_ns, size, sha256) of every input and output, per step."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.steps = json.load(f)
+        except (OSError, ValueError):
+            self.steps = {}
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _unchanged(self, path, recorded):
+        stat = self._stat(path)
+        if stat is None or recorded is None:
+            return stat is None and recorded is None
+        if list(stat) == recorded[:2]:
+            return True
+        # mtime/size moved: only a content change counts.
+        return stat[1] == recorded[1] and file_sha256(path) == recorded[2]
+
+    def is_up_to_date(self, step):
+        with self._lock:
+            recorded = self.steps.get(step.name)
+        if recorded is None:
+            return False
+        files = step.inputs + step.outputs
+        if sorted(files) != sorted(recorded):
+            return False
+        return all(self._unchanged(path, recorded[path]) for path in files)
+
+    def record(self, step):
+        signatures = {}
+        for path in step.inputs + step.outputs:
+            stat = self._stat(path)
+            signatures[path] = None if stat is None else [stat[0], stat[1], file_sha256(path)]
+        with self._lock:
+            self.steps[step.name] = signatures
+
+    def save(self):
+        with self._lock:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.steps, f, indent=0, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+class Step:
+    """One node of the graph: rebuilds 'outputs' from 'inputs' by calling action()."""
+
+    def __init__(self, name, inputs, outputs, action):
+        self.name = name
+        self.inputs = sorted(inputs)
+        self.outputs = sorted(outputs)
+        self.action = action
+
+
+def post_files(folder, filenames=None):
+    """Returns the source posts (HTML files, build outputs and Office lock files excluded) of folder."""
+    if filenames is None:
+        filenames = [name for name in os.listdir(folder) if os.path.isfile(os.path.join(folder, name))]
+    return [os.path.join(folder, name) for name in sorted(filenames)
+            if name.lower().endswith(('.html', '.htm')) and not name.endswith(GENERATED_SUFFIXES)
+            and not name.startswith(('.', '~$'))]
+
+
+def find_posts(root):
+    """Returns {folder: [post.html, ...]} for every folder holding posts."""
+    posts = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        html_files = post_files(dirpath, filenames)
+        if html_files:
+            posts[dirpath] = html_files
+    return posts
+
+
+def plan_folder(folder, html_files, image_map, derivatives=False, publisher=None, optimize=False):
+    """Returns the ordered steps for one post folder."""
+    images_dir = os.path.join(folder, 'images')
+    gdrive_list = os.path.join(images_dir, 'Gdrive.list')
+    manifest = os.path.join(images_dir, MANIFEST_NAME)
+    steps = []
+    has_list = os.path.isfile(gdrive_list)
+
+    if derivatives and os.path.isdir(images_dir):
+        originals = [os.path.join(images_dir, name) for name in source_images(images_dir)]
+        # The encoder settings are part of the name, so changing them rebuilds the manifest.
+        steps.append(Step(f"derivatives[{encoding_key()}]:{images_dir}", originals, [manifest],
+                          lambda: build_derivatives(images_dir)))
+
+    for html_file in html_files:
+        if not has_list:
+            # No Drive images to substitute: the source itself is the post.
+            if publisher is not None:
+                steps.append(Step(f"publish:{html_file}", [html_file], [],
+                                  lambda html_file=html_file: publisher(html_file)))
+            continue
+        output = os.path.splitext(html_file)[0] + OUTPUT_SUFFIX
+        inputs = [html_file, gdrive_list] + ([manifest] if derivatives or os.path.exists(manifest) else [])
+        if optimize:
+            # Inlined data and width/height come from the image files themselves.
+            inputs += [os.path.join(images_dir, name) for name in source_images(images_dir)]
+
+        def substitute(html_file=html_file, output=output):
+            optimizer = AssetOptimizer(images_dir) if optimize else None
+            substitute_img_src_file(html_file, output, image_map.ids(images_dir), load_manifest(images_dir),
+                                    optimizer)
+
+        name = f"substitute+optimize:{html_file}" if optimize else f"substitute:{html_file}"
+        steps.append(Step(name, inputs, [output], substitute))
+        if publisher is not None:
+            steps.append(Step(f"publish:{output}", [output], [],
+                              lambda output=output: publisher(output)))
+    return steps
+
+
+def run_steps(steps, state, force=False, dry_run=False):
+    """Runs the out-of-date steps of one folder in order. Returns the names that ran."""
+    ran = []
+    for step in steps:
+        if not force and state.is_up_to_date(step):
+            count('build.steps_up_to_date')
+            continue
+        ran.append(step.name)
+        if dry_run:
+            continue
+        with span('step', step=step.name):
+            step.action()
+        state.record(step)
+    return ran
+
+
+def make_publisher():
+    """Returns a callable publishing one file through create_post's incremental index."""
+    from auth_cache import thread_http
+    from create_post import BLOG_ID, Journal, authenticate, publish_file
+    from google_services import get_service
+
+    credentials = authenticate()
+    service = get_service("blogger", "v3", credentials)
+    journal = Journal()
+
+    def publish(path):
+        # publish_file() carries a post first published from its source (before it had an
+        # images/Gdrive.list) over to the substituted output, so it is not posted twice.
+        action, post = publish_file(service, BLOG_ID, path, None, journal,
+                                    http=thread_http(credentials))
+        print(f"🌐 {action}: {os.path.basename(path)} -> {post.get('url')}")
+
+    return publish
+
+
+def build(root, derivatives=False, publish=False, workers=DEFAULT_WORKERS, force=False, dry_run=False,
+          optimize=False):
+    """Builds every post folder under root. Returns (steps_run, failures)."""
+    start = time.perf_counter()
+    state = BuildState(os.path.join(root, STATE_NAME))
+    publisher = make_publisher() if publish and not dry_run else None
+    if publish and dry_run:
+        publisher = lambda path: None  # noqa: E731 - only planned, never called
+
+    image_map = find_image_map(root) or ImageMap(root)
+    folders = find_posts(root)
+    plans = {folder: plan_folder(folder, files, image_map, derivatives, publisher, optimize)
+             for folder, files in folders.items()}
+
+    steps_run = failures = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(run_steps, steps, state, force, dry_run): folder
+                   for folder, steps in plans.items()}
+        for future in as_completed(futures):
+            try:
+                ran = future.result()
+            except Exception as e:
+                print(f"❌ {futures[future]}: {e}")
+                failures += 1
+                continue
+            for name in ran:
+                print(f"{'would run' if dry_run else '🔨'} {name}")
+            steps_run += len(ran)
+
+    if not dry_run:
+        state.save()
+    total = sum(len(steps) for steps in plans.values())
+    print(f"Build finished in {time.perf_counter() - start:.2f}s: {steps_run} of {total} step(s) run, "
+          f"{failures} folder(s) failed.")
+    return steps_run, failures
+
+
+def main():
+    args = setup_from_argv()[1:]
+    flags = {flag: flag in args for flag in ('--derivatives', '--optimize', '--publish', '--force', '--dry-run')}
+    args = [a for a in args if a not in flags]
+    workers = DEFAULT_WORKERS
+    if '--workers' in args:
+        i = args.index('--workers')
+        workers = int(args[i + 1])
+        del args[i:i + 2]
+
+    if len(args) != 1 or not os.path.isdir(args[0]):
+        print("Usage: python build.py <ROOT> [--derivatives] [--optimize] [--publish] [--workers N] [--force] "
+              "[--dry-run]")
+        sys.exit(1)
+
+    _, failures = build(args[0], derivatives=flags['--derivatives'], publish=flags['--publish'],
+                        workers=workers, force=flags['--force'], dry_run=flags['--dry-run'],
+                        optimize=flags['--optimize'])
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
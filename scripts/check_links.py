@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Find broken links and image URLs in the local posts and the mirrored blog.
+
+A Drive image that was deleted, or whose sharing was revoked, only showed up as
+a broken image in a reader's browser. This script collects every URL of the
+local HTML under ROOT and/or of the posts in the blog mirror (mirror_blog.py),
+using the same parser as substitute_img_src.py (src, href, srcset, style and
+<style> url(...)), and checks each distinct URL once:
+
+    - Drive URLs (lh3.google.com/u/0/d/<id>, drive.google.com/file/d/<id>, ...)
+      are checked with batched files().get requests (up to 100 IDs per batch)
+      asking for the file's permissionIds: a deleted or trashed file, or one
+      whose "anyone with the link" sharing was revoked, is broken. The Drive
+      index (drive_index.py) cannot see sharing; it is used in bulk to count
+      the IDs it knows, and files it does not know are added to it. IDs that
+      passed are cached like web URLs, so later runs only re-check new ones,
+    - relative URLs of local files must exist on disk,
+    - every other http(s) URL gets a HEAD request (GET when the server refuses
+      HEAD); requests run concurrently, at most --per-host at a time per host.
+
+Working URLs and Drive IDs are remembered in SCRIPT_DIR/.link_cache.json for
+CACHE_TTL, so a second run only re-checks new and broken ones (--refresh ignores
+the cache).
+tests/test_check_links.py runs it against the fake server (fake_google_api.py).
+
+Usage:
+    python check_links.py [<ROOT>] [--mirror] [--blog BLOG_ID] [--no-drive] [--no-external]
+                          [--per-host N] [--concurrency N] [--refresh]
+
+Example:
+    python check_links.py ../HTML/2025 --mirror
+"""
+
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import unquote, urljoin, urlsplit
+
+import httpx
+from googleapiclient.errors import HttpError
+
+from drive_index import FILE_FIELDS
+from drive_path_cache import BATCH_LIMIT
+from html_rewriter import HtmlRewriter
+from rate_limit import get_limiter
+from tracing import count, setup_from_argv, span
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_FILE = os.path.join(SCRIPT_DIR, '.link_cache.json')
+CACHE_TTL = 24 * 3600
+DEFAULT_CONCURRENCY = 16
+DEFAULT_PER_HOST = 4
+TIMEOUT = 15.0
+DRIVE_URL = re.compile(
+    r'^https?://(?:lh3\.google(?:usercontent)?\.com/(?:u/\d+/)?d/'
+    r'|drive\.google\.com/(?:file/d/|(?:uc|open|thumbnail)\?(?:[^#]*&)?id=))([-\w]{10,})')
+IGNORED_SCHEMES = ('data:', 'mailto:', 'javascript:', 'tel:', 'about:', '#')
+HEAD_REFUSED = {403, 405, 501}  # some servers only answer GET
+PUBLIC_PERMISSIONS = {'anyoneWithLink', 'anyone'}  # Drive's fixed IDs of the public permissions
+
+
+def extract_urls(html_content):
+    """Returns the distinct URLs referenced by a document, in order of appearance."""
+    urls = {}
+
+    def collect(url, tag, attr):
+        urls.setdefault(url, None)
+        return None
+
+    rewriter = HtmlRewriter(lambda text: None, collect)
+    rewriter.feed(html_content)
+    rewriter.close()
+    return list(urls)
+
+
+def drive_id(url):
+    match = DRIVE_URL.match(url)
+    return match.group(1) if match else None
+
+
+def local_documents(root):
+    """Yields (path, html) of every HTML file under root."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for name in sorted(filenames):
+            if name.lower().endswith(('.html', '.htm')) and not name.startswith(('.', '~$')):
+                path = os.path.join(dirpath, name)
+                with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                    yield path, f.read()
+
+
+def mirrored_documents(mirror, blog_id=None):
+    """Yields (post URL, html) of every mirrored post."""
+    for row in mirror.posts(blog_id):
+        yield row['url'] or row['id'], mirror.content(row['id'])
+
+
+class Links:
+    """Every URL to check, with the documents that reference it."""
+
+    def __init__(self):
+        self.drive = defaultdict(set)  # file ID -> {source}
+        self.web = defaultdict(set)  # absolute URL -> {source}
+        self.missing_files = []  # (source, url) of relative URLs with no local file
+
+    def add_document(self, source, html_content, base_url=None):
+        """Sorts the URLs of one document; base_url is None for local files."""
+        for url in extract_urls(html_content):
+            if not url or url.lower().startswith(IGNORED_SCHEMES):
+                continue
+            if url.startswith('//'):
+                url = 'https:' + url
+            file_id = drive_id(url)
+            if file_id is not None:
+                self.drive[file_id].add(source)
+            elif urlsplit(url).scheme in ('http', 'https'):
+                self.web[url.split('#', 1)[0]].add(source)
+            elif urlsplit(url).scheme:
+                continue  # ftp:, file:, ...
+            elif base_url is not None:
+                self.web[urljoin(base_url, url).split('#', 1)[0]].add(source)
+            else:
+                path = os.path.join(os.path.dirname(source), unquote(urlsplit(url).path))
+                if not os.path.exists(path):
+                    self.missing_files.append((source, url))
+        count('links.documents')
+
+
+class LinkCache:
+    """JSON-backed map of URL -> last status, trusted for ttl seconds when it was a success."""
+
+    def __init__(self, path=CACHE_FILE, ttl=CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+
+    def is_ok(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+        return entry is not None and entry['ok'] and time.time() - entry['t'] <= self.ttl
+
+    def put(self, url, status, ok):
+        with self._lock:
+            self._entries[url] = {'status': status, 'ok': ok, 't': time.time()}
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, indent=0, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+def check_drive_ids(service, index, file_ids, cache=None):
+    """
+    Returns {file_id: reason} for the IDs that are deleted, trashed or no longer
+    shared with anyone who has the link. IDs cached as working are skipped; the
+    others are fetched with batched files().get calls, and files the index did
+    not know are added to it.
+    """
+    known = index.known_ids(file_ids)
+    count('links.drive_known', len(known))
+    pending = sorted(file_id for file_id in file_ids if cache is None or not cache.is_ok(f"drive:{file_id}"))
+    count('links.drive_cached', len(file_ids) - len(pending))
+    broken = {}
+    for start in range(0, len(pending), BATCH_LIMIT):
+        chunk = pending[start:start + BATCH_LIMIT]
+
+        def callback(request_id, response, exception):
+            file_id = chunk[int(request_id)]
+            if isinstance(exception, HttpError):
+                broken[file_id] = f"HTTP {exception.resp.status}"
+            elif exception is not None:
+                broken[file_id] = str(exception)
+            elif response.get('trashed'):
+                broken[file_id] = 'trashed'
+            else:
+                if file_id not in known:
+                    index.upsert(response)
+                if not PUBLIC_PERMISSIONS & set(response.get('permissionIds') or ()):
+                    broken[file_id] = 'not shared with anyone with the link'
+            if cache is not None:
+                cache.put(f"drive:{file_id}", broken.get(file_id, 200), file_id not in broken)
+
+        requests = {str(i): service.files().get(fileId=file_id, fields=f"{FILE_FIELDS}, permissionIds")
+                    for i, file_id in enumerate(chunk)}
+        get_limiter('drive').execute_batch(service, requests, callback)
+    return broken
+
+
+async def _head_all(urls, concurrency, per_host, timeout):
+    hosts = defaultdict(lambda: asyncio.Semaphore(per_host))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(follow_redirects=True, timeout=timeout, limits=limits) as client:
+        async def check(url):
+            host = urlsplit(url).netloc
+            async with hosts[host]:
+                count('links.requests')
+                try:
+                    with span('head', host=host):
+                        response = await client.head(url)
+                        if response.status_code in HEAD_REFUSED:
+                            async with client.stream('GET', url) as response:
+                                pass  # the status is enough; the body is never read
+                except httpx.HTTPError as e:
+                    return url, type(e).__name__
+            return url, response.status_code
+
+        return dict(await asyncio.gather(*(check(url) for url in urls)))
+
+
+def check_urls(urls, cache=None, concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST, timeout=TIMEOUT):
+    """HEADs every URL not cached as working. Returns {url: reason} of the broken ones."""
+    pending = [url for url in urls if cache is None or not cache.is_ok(url)]
+    count('links.cached', len(urls) - len(pending))
+    statuses = asyncio.run(_head_all(pending, concurrency, per_host, timeout)) if pending else {}
+    broken = {}
+    for url, status in statuses.items():
+        ok = isinstance(status, int) and status < 400
+        if cache is not None:
+            cache.put(url, status, ok)
+        if not ok:
+            broken[url] = f"HTTP {status}" if isinstance(status, int) else status
+    return broken
+
+
+def check_links(links, service=None, index=None, external=True, cache=None,
+                concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST):
+    """
+    Checks collected Links. Drive IDs are only checked when service and a synced
+    index are given. Returns [(source, url, reason)] sorted by source.
+    """
+    problems = [(source, url, 'no such local file') for source, url in links.missing_files]
+    if service is not None and index is not None:
+        with span('check_drive', ids=len(links.drive)):
+            broken = check_drive_ids(service, index, list(links.drive), cache)
+        problems += [(source, f"drive:{file_id}", reason) for file_id, reason in broken.items()
+                     for source in links.drive[file_id]]
+    if external:
+        with span('check_web', urls=len(links.web)):
+            broken = check_urls(list(links.web), cache, concurrency, per_host)
+        problems += [(source, url, reason) for url, reason in broken.items() for source in links.web[url]]
+    count('links.broken', len(problems))
+    return sorted(problems)
+
+
+def main():
+    args = setup_from_argv()[1:]
+    options = {'--blog': None, '--per-host': DEFAULT_PER_HOST, '--concurrency': DEFAULT_CONCURRENCY}
+    for option in options:
+        if option in args:
+            i = args.index(option)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+    flags = {flag: flag in args for flag in ('--mirror', '--no-drive', '--no-external', '--refresh')}
+    args = [a for a in args if a not in flags]
+
+    if len(args) > 1 or (args and not os.path.isdir(args[0])) or not (args or flags['--mirror']):
+        print("Usage: python check_links.py [<ROOT>] [--mirror] [--blog BLOG_ID] [--no-drive] [--no-external] "
+              "[--per-host N] [--concurrency N] [--refresh]")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    links = Links()
+    documents = 0
+    if args:
+        for path, html_content in local_documents(args[0]):
+            links.add_document(path, html_content)
+            documents += 1
+    if flags['--mirror']:
+        from create_post import BLOG_ID
+        from mirror_blog import BlogMirror
+
+        for url, html_content in mirrored_documents(BlogMirror(), options['--blog'] or BLOG_ID):
+            links.add_document(url, html_content, base_url=url)
+            documents += 1
+    print(f"🔗 {documents} document(s): {len(links.drive)} Drive ID(s), {len(links.web)} web URL(s).")
+
+    service = index = None
+    if not flags['--no-drive'] and links.drive:
+        from auth_cache import get_credentials
+        from drive_index import DriveIndex
+        from google_services import get_service
+        from list_drive_files_v3 import CREDS_FILE, SCOPES
+
+        service = get_service('drive', 'v3', get_credentials(SCOPES, client_secret_file=CREDS_FILE))
+        index = DriveIndex()
+        index.sync(service)
+
+    cache = LinkCache(ttl=0 if flags['--refresh'] else CACHE_TTL)
+    problems = check_links(links, service, index, external=not flags['--no-external'], cache=cache,
+                           concurrency=int(options['--concurrency']), per_host=int(options['--per-host']))
+    cache.save()
+    for source, url, reason in problems:
+        print(f"❌ {source}: {url} ({reason})")
+    print(f"Checked in {time.perf_counter() - start:.2f}s: {len(problems)} broken link(s).")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+clean_html.py
+-------------
+
+Cleans and minifies Word / Google-Docs HTML exports before they are published.
+
+Word exports such as Sequencing_Lab_2003/lab2_v2.html carry kilobytes of MSO-only
+CSS, conditional comments, Office XML islands and proofing spans that Blogger
+never uses. clean_html():
+
+    - removes comments, including <!--[if gte mso 9]><xml>...</xml><![endif]-->,
+      and the <![if ...]> / <![endif]> markers (their content is kept); Blogger's
+      <!--more--> jump break is kept,
+    - drops Office namespace elements (<o:p>, <w:...>, <v:...>) and Word-only
+      <meta>/<link> tags (ProgId, Generator, File-List, themeData, ...),
+    - strips mso-* declarations from style attributes and <style> blocks, plus
+      lang attributes and Word classes (Mso*, SpellE, GramE); other classes are
+      kept, since posts render inside the Blogger theme's CSS (separator,
+      tr-caption-container, ...),
+    - keeps only the CSS rules whose classes, ids and element names occur in the
+      cleaned document, and drops @page/@list rules,
+    - unwraps <span> tags left without attributes (this removes empty spans),
+    - collapses whitespace outside <pre>, <textarea> and <script>.
+
+create_post.py runs it on every body before posts().insert/patch.
+
+Example usage:
+    python clean_html.py ../HTML/2025/Sequencing_Lab_2003/lab2_v2.html [...] [--write]
+
+Prints the byte savings per file; with --write, <name>_clean.html is written too.
+"""
+
+import os
+import re
+import sys
+from html.parser import HTMLParser
+
+from html_rewriter import HtmlRewriter, serialize_starttag
+
+# create_post.py republishes every post when this changes; bump it only for output changes that should go live.
+VERSION = 1
+WORD_META_NAMES = {'progid', 'generator', 'originator'}
+WORD_LINK_RELS = {'file-list', 'themedata', 'colorschememapping', 'edit-time-data', 'afchunk'}
+WORD_CLASSES = {'SpellE', 'GramE'}
+WORD_CLASS_PREFIXES = ('Mso',)  # MsoNormal, MsoListParagraph, MsoTableGrid, ...
+PRESERVE_WHITESPACE = {'pre', 'textarea', 'script'}
+DROPPED_AT_RULES = ('@page', '@list')
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+CSS_RULE = re.compile(r'([^{}]+)\{([^{}]*)\}')
+WHITESPACE = re.compile(r'\s+')
+JUMP_BREAK = re.compile(r'^\s*more\s*$', re.IGNORECASE)  # <!--more--> splits the post for "Read more"
+
+
+def strip_mso_declarations(declarations):
+    """Removes mso-* properties from a CSS declaration list and compacts it."""
+    kept = []
+    for declaration in declarations.split(';'):
+        prop, _, value = declaration.partition(':')
+        prop = prop.strip()
+        if not prop or not value.strip() or prop.lower().startswith('mso-'):
+            continue
+        kept.append(f"{prop}:{WHITESPACE.sub(' ', value.strip())}")
+    return ';'.join(kept)
+
+
+def _selector_used(selector, used):
+    """A selector is kept when every class, id and element name it mentions is in use."""
+    selector = re.sub(r'::?[\w-]+(\([^)]*\))?', '', selector)
+    classes = re.findall(r'\.([\w-]+)', selector)
+    ids = re.findall(r'#([\w-]+)', selector)
+    tags = re.findall(r'(?:^|[\s>+~])([a-zA-Z][\w-]*)', selector)
+    return (all(c in used['classes'] for c in classes)
+            and all(i in used['ids'] for i in ids)
+            and all(t.lower() in used['tags'] for t in tags))
+
+
+def prune_css(css, used):
+    """Keeps only used rules, without mso-* declarations, comments or @page/@list rules."""
+    css = CSS_COMMENT.sub('', css.replace('<!--', '').replace('-->', ''))
+    rules = []
+    for selectors, declarations in CSS_RULE.findall(css):
+        selectors = WHITESPACE.sub(' ', selectors).strip()
+        if selectors.lower().startswith(DROPPED_AT_RULES):
+            continue
+        declarations = strip_mso_declarations(declarations)
+        if not declarations:
+            continue
+        if not selectors.startswith('@'):
+            kept = [s.strip() for s in selectors.split(',') if _selector_used(s.strip(), used)]
+            if not kept:
+                continue
+            selectors = ','.join(kept)
+        rules.append(f"{selectors}{{{declarations}}}")
+    return ''.join(rules)
+
+
+def is_word_class(name):
+    return name in WORD_CLASSES or name.startswith(WORD_CLASS_PREFIXES)
+
+
+class _UsageCollector(HTMLParser):
+    """First pass: element names, classes (minus Word's) and ids left in the cleaned document."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.used = {'tags': set(), 'classes': set(), 'ids': set()}
+
+    def handle_starttag(self, tag, attrs):
+        self.used['tags'].add(tag)
+        values = dict(attrs)
+        self.used['classes'].update(c for c in (values.get('class') or '').split() if not is_word_class(c))
+        if values.get('id'):
+            self.used['ids'].add(values['id'])
+
+
+class _Cleaner(HtmlRewriter):
+    """Second pass: writes the cleaned document, reusing HtmlRewriter's raw passthrough."""
+
+    def __init__(self, write, used):
+        super().__init__(self._track_write)
+        self._out = write
+        self._last_char = '\n'
+        # Open <span> tags are held back until some content follows, so that
+        # spans which turn out to be empty can be dropped with their end tag.
+        self._pending_spans = []
+        self._hold = False
+        self.used = used
+        self._span_stack = []
+        self._preserve = 0
+
+    def _track_write(self, text):
+        if self._hold:
+            self._hold = False
+            self._pending_spans.append(text)
+            return
+        if text:
+            if self._pending_spans:
+                self._out(''.join(self._pending_spans))
+                self._pending_spans = []
+            self._out(text)
+            self._last_char = text[-1]
+
+    def _clean_attrs(self, tag, attrs):
+        cleaned = []
+        for name, value in attrs:
+            if name == 'lang' or name.startswith('xmlns:'):
+                continue
+            if name == 'style' and value is not None:
+                value = strip_mso_declarations(value)
+                if not value:
+                    continue
+            if name == 'class' and value is not None:
+                classes = [c for c in value.split() if not is_word_class(c)]
+                if not classes:
+                    continue
+                value = ' '.join(classes)
+            cleaned.append((name, value))
+        return cleaned
+
+    def _is_word_only(self, tag, attrs):
+        values = {k: (v or '').lower() for k, v in attrs}
+        if tag == 'meta' and (values.get('name') in WORD_META_NAMES
+                              or values.get('http-equiv') == 'content-type'):
+            # The body is re-encoded as UTF-8, so the export's charset declaration is wrong.
+            return True
+        return tag == 'link' and values.get('rel') in WORD_LINK_RELS
+
+    def handle_starttag(self, tag, attrs):
+        self._in_style = tag == 'style'
+        if tag in PRESERVE_WHITESPACE:
+            self._preserve += 1
+        if ':' in tag or self._is_word_only(tag, attrs):
+            self._replacement = ''
+            return
+        cleaned = self._clean_attrs(tag, attrs)
+        if tag == 'span':
+            self._span_stack.append(bool(cleaned))
+            if not cleaned:
+                self._replacement = ''
+                return
+            self._hold = True
+        if cleaned != attrs:
+            self._replacement = serialize_starttag(tag, cleaned, self.get_starttag_text().endswith('/>'))
+
+    def handle_startendtag(self, tag, attrs):
+        if ':' in tag or self._is_word_only(tag, attrs):
+            self._replacement = ''
+            return
+        cleaned = self._clean_attrs(tag, attrs)
+        if cleaned != attrs:
+            self._replacement = serialize_starttag(tag, cleaned, True)
+
+    def handle_endtag(self, tag):
+        if tag == 'style':
+            self._in_style = False
+        if tag in PRESERVE_WHITESPACE and self._preserve:
+            self._preserve -= 1
+        if ':' in tag:
+            self._replacement = ''
+        elif tag == 'span' and self._span_stack:
+            if not self._span_stack.pop():
+                self._replacement = ''
+            elif self._pending_spans:
+                # Nothing was written since this span opened: drop it entirely.
+                self._pending_spans.pop()
+                self._replacement = ''
+
+    def handle_data(self, data):
+        if self._in_style:
+            self._replacement = prune_css(data, self.used)
+        elif not self._preserve:
+            collapsed = WHITESPACE.sub(' ', data)
+            if collapsed.startswith(' ') and self._last_char.isspace():
+                # Whitespace left on both sides of a removed element collapses too.
+                collapsed = collapsed[1:]
+            self._replacement = collapsed
+
+    def handle_comment(self, data):
+        if not JUMP_BREAK.match(data):
+            self._replacement = ''
+
+    def unknown_decl(self, data):
+        # Downlevel-revealed conditionals: <![if !supportLists]> ... <![endif]>
+        if data.lower().startswith(('if', 'endif')):
+            self._replacement = ''
+
+
+def clean_html(html_content):
+    """Returns the cleaned, minified document."""
+    collector = _UsageCollector()
+    collector.feed(html_content)
+    collector.close()
+
+    out = []
+    cleaner = _Cleaner(out.append, collector.used)
+    cleaner.feed(html_content)
+    cleaner.close()
+    out.extend(cleaner._pending_spans)  # spans left open at the end of the document
+    return ''.join(out).strip() + '\n'
+
+
+def byte_savings(before, after):
+    """Returns (bytes_before, bytes_after, percent_saved) for two strings (UTF-8)."""
+    size_before = len(before.encode('utf-8'))
+    size_after = len(after.encode('utf-8'))
+    saved = 100.0 * (size_before - size_after) / size_before if size_before else 0.0
+    return size_before, size_after, saved
+
+
+def main():
+    args = sys.argv[1:]
+    write = '--write' in args
+    if write:
+        args.remove('--write')
+    if not args:
+        print("Usage: python clean_html.py <html_file> [...] [--write]")
+        sys.exit(1)
+
+    from create_post import read_html_file
+
+    for html_file in args:
+        html_content = read_html_file(html_file)
+        cleaned = clean_html(html_content)
+        before, after, saved = byte_savings(html_content, cleaned)
+        print(f"{html_file}: {before} -> {after} bytes (-{saved:.1f}%)")
+        if write:
+            output_file = os.path.splitext(html_file)[0] + "_clean.html"
+            with open(output_file, "w", encoding="utf-8") as f:
+                f.write(cleaned)
+
+
+if __name__ == "__main__":
+    main()
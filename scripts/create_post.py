@@ -5,9 +5,40 @@ This script reads an HTML file from a command line argument and posts its conten
 
 Usage:
     python create_post.py <html_file> [<post_title>]
+    python create_post.py --batch <dir|glob|manifest> [...] [--workers N] [--interval SECONDS]
+    Add --no-clean to either form to publish the HTML exactly as exported.
 
 Example:
     python create_post.py my_formatted_post.html "Exciting Update"
+    python create_post.py --batch "../HTML/2025/*" --workers 4
+
+Batch mode:
+- Each source may be a directory (all *.html below it), a glob pattern, a single
+  .html file, or a manifest (.txt) with one "path<TAB>title" per line; "#" starts a comment.
+- A post that build.py has substituted is published from its <post>_Gdrive.html, the
+  copy with Drive image URLs; a source without that output is published as it is.
+- Titles default to the document's <title>, or the file name.
+- One Blogger service is built and shared; inserts run on a bounded thread pool
+  through an adaptive rate limiter (rate_limit.py). It starts at one call per
+  --interval seconds, speeds up while Blogger accepts the calls, backs off on 403
+  rateLimitExceeded / 429 / 5xx (honouring Retry-After) and retries those calls.
+  The quota used per API method is printed at the end.
+- Every finished post is appended to publish_journal.jsonl, so a crashed run can be
+  restarted with the same arguments and only the remaining files are posted.
+
+Cleaning:
+- Bodies go through clean_html.py (MSO styles, conditional comments, empty spans,
+  unused CSS and whitespace are removed) before posts().insert/patch, and the byte
+  savings are printed for each file.
+
+Incremental publishing (single file and batch):
+- The journal doubles as the publish index: source path -> content hash -> post ID.
+  The hash is taken over the file as it is on disk (and clean_html.VERSION), so
+  the file is only read and cleaned when it changed.
+- Unchanged files are skipped without any API call, edited files are sent with
+  posts().patch to their existing post, and only new files go through posts().insert.
+- A post deleted on Blogger (patch answers 404) is dropped from the journal and
+  published again as a new post.
 
 Requirements:
 - Enable Blogger API in Google Cloud Console.
@@ -15,6 +46,7 @@ Requirements:
 - Install required Python libraries: google-auth, google-auth-oauthlib, google-auth-httplib2, google-api-python-client.
 - Place this script and 'client_secret_4676203276-kg4ui39sai1auibi9suofqels2sqcis4.apps.googleusercontent.com.json'
   in the same folder.
+- The OAuth token is cached by auth_cache.py, so the browser only opens on the first run.
 
 Including Images:
 - Blogger doesn't allow direct image uploads via API.
@@ -22,10 +54,24 @@ Including Images:
 - Host images externally (e.g., Google Drive, Imgur, or your own server) and use the public URL.
 """
 
+import glob
+import hashlib
+import html
+import json
 import os
+import re
 import sys
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from googleapiclient.errors import HttpError
+
+from auth_cache import get_credentials, thread_http
+from build import GENERATED_SUFFIXES, OUTPUT_SUFFIX, file_sha256, post_files
+from clean_html import VERSION as CLEANER_VERSION, byte_savings, clean_html
+from google_services import get_service
+from rate_limit import DEFAULT_LIMITS, LEDGER, RateLimiter, get_limiter
+from tracing import count, setup_from_argv, span
 
 # ==========================
 # Configuration
@@ -35,66 +81,383 @@ SCOPES = ["https://www.googleapis.com/auth/blogger"]
 CLIENT_SECRET_FILE = "client_secret_4676203276-kg4ui39sai1auibi9suofqels2sqcis4.apps.googleusercontent.com.json"
 # Use the same BLOG_ID as in blog_hello_world.py
 BLOG_ID = "5963855917365984730"
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+JOURNAL_FILE = os.path.join(SCRIPT_DIR, "publish_journal.jsonl")
+# Default batch settings: a few parallel inserts, starting at one insert per second.
+DEFAULT_WORKERS = 4
+DEFAULT_INTERVAL = 1.0
 
 def authenticate():
     """
-    Uses OAuth 2.0 InstalledAppFlow to get credentials,
-    matching the blog_hello_world.py approach.
+    Returns OAuth 2.0 credentials from the shared token cache (see auth_cache.py).
+    The browser flow only runs when no cached token covers SCOPES; afterwards the
+    token is refreshed silently, so the script can run unattended.
     """
-    if not os.path.exists(CLIENT_SECRET_FILE):
-        print(f"Error: {CLIENT_SECRET_FILE} not found in current directory.")
-        sys.exit(1)
+    return get_credentials(SCOPES, client_secret_file=CLIENT_SECRET_FILE)
+
+def read_html_file(file_path):
+    """Reads an HTML file, falling back to latin-1 for non UTF-8 exports."""
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    # Open the file with error handling for encoding issues
+    with span('read', file=os.path.basename(file_path)):
+        try:
+            with open(file_path, 'r', encoding='utf-8-sig') as f:
+                content = f.read()
+        except UnicodeDecodeError:
+            with open(file_path, 'r', encoding='latin-1') as f:
+                content = f.read()
+    count('bytes_read', len(content))
+    return content
+
+
+def content_hash(file_path, clean=True):
+    """
+    SHA-256 of the source file, used to detect edits since the last publish. It
+    covers the raw bytes (and CLEANER_VERSION when cleaning), so unrelated changes
+    to clean_html.py do not republish every post.
+    """
+    digest = file_sha256(file_path)
+    if not clean:
+        return digest
+    return hashlib.sha256(f"{digest} clean_html/{CLEANER_VERSION}".encode("ascii")).hexdigest()
+
+
+def read_post_body(file_path, clean=True):
+    """Reads a post's HTML and, unless clean=False, runs it through clean_html()."""
+    html_content = read_html_file(file_path)
+    if not clean:
+        return html_content
+    with span('clean_html'):
+        cleaned = clean_html(html_content)
+    before, after, saved = byte_savings(html_content, cleaned)
+    print(f"🧹 {os.path.basename(file_path)}: {before} -> {after} bytes (-{saved:.1f}%)")
+    return cleaned
+
 
-    # Match the blog_hello_world.py approach:
-    flow = InstalledAppFlow.from_client_secrets_file(
-        CLIENT_SECRET_FILE,
-        SCOPES,
-        redirect_uri="http://localhost"  # specify the same redirect URI
-    )
-    # Use a fixed port that is added in your Google Cloud Console's Authorized Redirect URIs
-    creds = flow.run_local_server(port=8080)
-    return creds
-
-def create_blog_post_from_file(credentials, blog_id, title, file_path):
+def create_blog_post_from_file(credentials, blog_id, title, file_path, service=None,
+                               journal_path=JOURNAL_FILE, clean=True):
     """
-    Reads HTML content from 'file_path' and creates a new post on Blogger.
+    Reads HTML content from 'file_path' and publishes it on Blogger.
+    A file published before is patched in place (or skipped when unchanged)
+    instead of creating a duplicate post.
 
     Images:
     - If you want to include images, embed <img> tags in the HTML.
     - Ensure those images are publicly accessible or they won't display.
     """
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"File not found: {file_path}")
+    if service is None:
+        service = get_service("blogger", "v3", credentials)
+    journal = Journal(journal_path)
+
+    action, post = publish_file(service, blog_id, file_path, title, journal, clean=clean)
+    if action == "skipped":
+        print(f"⏭️  Unchanged since last publish: {post.get('url')}")
+    elif action == "updated":
+        print(f"🔁 Post updated: {post['url']}")
+    else:
+        print(f"✅ New post created: {post['url']}")
+    return post
+
+
+# ==========================
+# Batch publishing
+# ==========================
+def title_from_html(html_content, file_path):
+    """Returns the document <title>, or a title derived from the file name."""
+    match = re.search(r'<title[^>]*>(.*?)</title>', html_content, re.IGNORECASE | re.DOTALL)
+    if match:
+        title = " ".join(html.unescape(match.group(1)).split())
+        if title:
+            return title
+    return os.path.splitext(os.path.basename(file_path))[0].replace("_", " ")
+
+
+def read_manifest(manifest_path):
+    """Reads 'path<TAB>title' lines; paths are relative to the manifest's folder."""
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    entries = []
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            path, _, title = line.partition("\t")
+            entries.append((os.path.join(base_dir, path.strip()), title.strip() or None))
+    return entries
+
+
+def is_post_file(name):
+    """HTML sources only: build outputs (*_Gdrive.html, *_clean.html) and Office lock files are not posts."""
+    return bool(post_files("", [name]))
+
+
+def published_file(file_path):
+    """The file to publish for a post source: its build.py output (<stem>_Gdrive.html) when there is one."""
+    if os.path.basename(file_path).endswith(GENERATED_SUFFIXES):
+        return file_path
+    output = os.path.splitext(file_path)[0] + OUTPUT_SUFFIX
+    return output if os.path.isfile(output) else file_path
+
+
+def source_file(file_path):
+    """The source a build.py output was generated from, or None."""
+    if not file_path.endswith(OUTPUT_SUFFIX):
+        return None
+    stem = file_path[:-len(OUTPUT_SUFFIX)]
+    return next((stem + ext for ext in (".html", ".htm") if os.path.isfile(stem + ext)), None)
+
+
+def collect_post_files(sources):
+    """
+    Expands directories, glob patterns, manifests and single files into a
+    sorted, de-duplicated list of (file_path, title_or_None). Sources that
+    build.py has substituted are replaced by their _Gdrive.html output.
+    """
+    entries = []
+    for source in sources:
+        if os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs[:] = [d for d in dirs if not d.startswith(".")]
+                entries.extend((published_file(path), None) for path in post_files(root, files))
+        elif os.path.isfile(source) and source.lower().endswith(".txt"):
+            entries.extend((published_file(path), title) for path, title in read_manifest(source))
+        elif os.path.isfile(source) and source.lower().endswith((".html", ".htm")):
+            entries.append((published_file(source), None))
+        elif os.path.isfile(source):
+            print(f"⚠️  Skipping {source}: neither HTML nor a .txt manifest")
+        else:
+            matches = glob.glob(source, recursive=True)
+            if not matches:
+                print(f"⚠️  Nothing matches: {source}")
+            # Other files a pattern happens to match (.zip, .docx, ...) are skipped quietly.
+            entries.extend(collect_post_files(sorted(
+                match for match in matches
+                if os.path.isdir(match) or match.lower().endswith(".txt") or is_post_file(os.path.basename(match)))))
+
+    seen = set()
+    unique = []
+    for path, title in entries:
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            unique.append((key, title))
+    return sorted(unique)
+
+
+def journal_key(file_path, journal_path=JOURNAL_FILE):
+    """Journal entries are keyed by path relative to the journal, so the tree can move."""
+    return os.path.relpath(os.path.abspath(file_path), os.path.dirname(os.path.abspath(journal_path)))
+
+
+def load_journal(journal_path=JOURNAL_FILE):
+    """Returns {journal_key: entry} for every post recorded in the journal (last entry wins)."""
+    journal = {}
+    if not os.path.exists(journal_path):
+        return journal
+    with open(journal_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A crash can leave a truncated last line; ignore it.
+                continue
+            if entry.get("removed"):
+                journal.pop(entry["path"], None)
+            else:
+                journal[entry["path"]] = entry
+    return journal
+
+
+class Journal:
+    """Append-only JSON-lines record of finished posts, safe to share between threads."""
+
+    def __init__(self, journal_path=JOURNAL_FILE):
+        self.path = journal_path
+        self.entries = load_journal(journal_path)
+        self._lock = threading.Lock()
+
+    def key(self, file_path):
+        return journal_key(file_path, self.path)
+
+    def get(self, file_path):
+        return self.entries.get(self.key(file_path))
+
+    def _append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            if entry.get("removed"):
+                self.entries.pop(entry["path"], None)
+            else:
+                self.entries[entry["path"]] = entry
+
+    def record(self, file_path, **fields):
+        entry = {"path": self.key(file_path), **fields}
+        self._append(entry)
+        return entry
+
+    def forget(self, file_path):
+        """Records that the post of file_path is gone, so the next publish inserts it again."""
+        self._append({"path": self.key(file_path), "removed": True})
+
+    def adopt(self, file_path, source):
+        """
+        Carries the post of source over to file_path, so a post first published from
+        its source is patched, not duplicated, once it is published from its build output.
+        """
+        entry = self.get(file_path)
+        previous = self.get(source)
+        if entry is None and previous is not None:
+            entry = self.record(file_path, **{k: v for k, v in previous.items() if k != "path"})
+        return entry
+
+
+def publish_file(service, blog_id, file_path, title, journal, http=None, limiter=None, clean=True):
+    """
+    Publishes one file according to the journal/index and returns (action, post):
+    - "skipped": content hash unchanged and no new title given, no API call is made;
+    - "updated": the existing post is patched with the new content;
+    - "created": the file has never been published, or its post was deleted on
+      Blogger (the patch answered 404), and a new post is inserted.
+    Calls go through limiter (default: the shared Blogger limiter), which retries
+    throttled and 5xx responses.
+    """
+    with span('publish', file=os.path.basename(file_path)) as current:
+        action, post = _publish_file(service, blog_id, file_path, title, journal, http, limiter, clean)
+        current.set(action=action)
+    count(f'posts.{action}')
+    return action, post
+
+
+def _publish_file(service, blog_id, file_path, title, journal, http, limiter, clean):
+    digest = content_hash(file_path, clean)
+    entry = journal.get(file_path)
+    if entry is None and source_file(file_path) is not None:
+        entry = journal.adopt(file_path, source_file(file_path))
+
+    # An explicit title that differs from the published one is an edit too.
+    if entry is not None and entry.get("sha256") == digest and title in (None, entry.get("title")):
+        return "skipped", {"id": entry.get("post_id"), "url": entry.get("url")}
+
+    html_content = read_post_body(file_path, clean)
+    title = title or (entry or {}).get("title") or title_from_html(html_content, file_path)
+    body = {"title": title, "content": html_content}
+    limiter = limiter or get_limiter("blogger")
+    post = None
+    if entry is not None:
+        try:
+            post = limiter.execute(service.posts().patch(blogId=blog_id, postId=entry["post_id"], body=body),
+                                   http=http)
+            action = "updated"
+        except HttpError as e:
+            if e.resp.status != 404:
+                raise
+            print(f"⚠️  Post {entry['post_id']} no longer exists on Blogger; publishing {file_path} as a new post.")
+            journal.forget(file_path)
+    if post is None:
+        post = limiter.execute(service.posts().insert(blogId=blog_id, body=body), http=http)
+        action = "created"
+
+    journal.record(file_path, post_id=post["id"], url=post.get("url"), title=title, sha256=digest)
+    return action, post
+
+
+def publish_batch(credentials, blog_id, entries, workers=DEFAULT_WORKERS,
+                  interval=DEFAULT_INTERVAL, journal_path=JOURNAL_FILE, clean=True):
+    """
+    Publishes many (file_path, title) entries through one Blogger service.
+    interval (> 0) is the starting delay between calls, in seconds.
+    Unchanged files are skipped, edited ones patched, new ones inserted.
+    Returns a dict counting each action plus "failed".
+    """
+    service = get_service("blogger", "v3", credentials)
+    journal = Journal(journal_path)
+    _, burst, max_rate = DEFAULT_LIMITS["blogger"]
+    limiter = RateLimiter(1.0 / interval, burst, max(max_rate, 1.0 / interval))
+
+    def publish_one(file_path, title):
+        return publish_file(service, blog_id, file_path, title, journal,
+                            http=thread_http(credentials), limiter=limiter, clean=clean)
+
+    counts = {"created": 0, "updated": 0, "skipped": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(publish_one, path, title): path for path, title in entries}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                action, post = future.result()
+            except Exception as e:
+                counts["failed"] += 1
+                print(f"❌ {path}: {e}")
+                continue
+            counts[action] += 1
+            if action != "skipped":
+                print(f"✅ {action}: {os.path.basename(path)} -> {post.get('url')}")
+
+    print(f"Batch finished: {counts['created']} created, {counts['updated']} updated, "
+          f"{counts['skipped']} unchanged, {counts['failed']} failed.")
+    report = LEDGER.report()
+    if report:
+        print(report)
+    return counts
+
+
+def parse_batch_args(args):
+    """Parses '--batch' arguments into (sources, workers, interval)."""
+    sources = []
+    workers, interval = DEFAULT_WORKERS, DEFAULT_INTERVAL
+    i = 0
+    while i < len(args):
+        if args[i] == "--workers" and i + 1 < len(args):
+            workers = int(args[i + 1])
+            i += 2
+        elif args[i] == "--interval" and i + 1 < len(args):
+            interval = float(args[i + 1])
+            i += 2
+        else:
+            sources.append(args[i])
+            i += 1
+    return sources, workers, interval
 
-    # Open the file with error handling for encoding issues
-    try:
-        with open(file_path, 'r', encoding='utf-8-sig') as f:
-            html_content = f.read()
-    except UnicodeDecodeError:
-        with open(file_path, 'r', encoding='latin-1') as f:
-            html_content = f.read()
-
-    service = build("blogger", "v3", credentials=credentials)
-    post_body = {
-        "title": title,
-        "content": html_content
-    }
-
-    post = service.posts().insert(blogId=blog_id, body=post_body).execute()
-    print(f"✅ New post created: {post['url']}")
 
 if __name__ == "__main__":
     # Parse command-line arguments
+    setup_from_argv()
+    clean = "--no-clean" not in sys.argv
+    if not clean:
+        sys.argv.remove("--no-clean")
     if len(sys.argv) < 2:
         print("Usage: python create_post.py <html_file> [<post_title>]")
+        print("       python create_post.py --batch <dir|glob|manifest> [...] [--workers N] [--interval SECONDS]")
         sys.exit(1)
 
+    if sys.argv[1] == "--batch":
+        try:
+            sources, workers, interval = parse_batch_args(sys.argv[2:])
+        except ValueError:
+            workers = interval = 0
+        if interval <= 0 or workers < 1:
+            print("--interval must be a number > 0 (seconds) and --workers an integer >= 1.")
+            print("Usage: python create_post.py --batch <dir|glob|manifest> [...] [--workers N] [--interval SECONDS]")
+            sys.exit(1)
+        entries = collect_post_files(sources)
+        if not entries:
+            print("No HTML files found to publish.")
+            sys.exit(1)
+        credentials = authenticate()
+        counts = publish_batch(credentials, BLOG_ID, entries, workers=workers, interval=interval, clean=clean)
+        sys.exit(1 if counts["failed"] else 0)
+
     html_file_path = sys.argv[1]
-    title = sys.argv[2] if len(sys.argv) > 2 else "My Rich HTML Post"
+    title = sys.argv[2] if len(sys.argv) > 2 else None  # default: previous title, <title> or file name
 
     # 1. Authenticate and get credentials
     credentials = authenticate()
 
     # 2. Create the post
-    create_blog_post_from_file(credentials, BLOG_ID, title, html_file_path)
-
+    create_blog_post_from_file(credentials, BLOG_ID, title, html_file_path, clean=clean)
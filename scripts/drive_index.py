@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Local SQLite index of the whole Drive, kept fresh with the changes feed.
+
+Walking folder by folder ("'<id>' in parents" per folder, as list_drive_files_v2.py
+does) is dominated by round-trip latency once the mount holds thousands of files.
+This module instead:
+    - pulls the metadata of every file (id, name, parents, md5Checksum, size,
+      modifiedTime) with a few large paginated files().list calls,
+    - stores it in SCRIPT_DIR/.drive_index.sqlite and rebuilds the folder tree locally,
+    - afterwards applies only the delta reported by changes().list, starting from
+      the page token saved at the previous sync.
+
+resolve_path() and list_folder() then answer path and folder lookups without any
+API call; generate_gdrive_lists.py uses them with --index.
+
+Usage:
+    python drive_index.py sync                 # full scan on first use, changes feed afterwards
+    python drive_index.py rebuild              # force a full scan
+    python drive_index.py resolve <RELATIVE_PATH>
+    python drive_index.py list <RELATIVE_PATH>
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from auth_cache import get_credentials
+from drive_path_cache import FOLDER_MIME, path_components
+from google_services import get_service
+from list_drive_files_v3 import CREDS_FILE, SCOPES
+from rate_limit import get_limiter
+from tracing import setup_from_argv, traced
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_FILE = os.path.join(SCRIPT_DIR, '.drive_index.sqlite')
+PAGE_SIZE = 1000
+FILE_FIELDS = 'id, name, mimeType, parents, md5Checksum, size, modifiedTime, trashed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id        TEXT PRIMARY KEY,
+    name      TEXT NOT NULL,
+    mime_type TEXT,
+    parent    TEXT,
+    md5       TEXT,
+    size      INTEGER,
+    modified  TEXT
+);
+CREATE INDEX IF NOT EXISTS files_by_parent ON files (parent, name);
+CREATE INDEX IF NOT EXISTS files_by_md5 ON files (md5);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _row(item):
+    parents = item.get('parents') or [None]
+    size = item.get('size')
+    return (item['id'], item['name'], item.get('mimeType'), parents[0],
+            item.get('md5Checksum'), int(size) if size is not None else None,
+            item.get('modifiedTime'))
+
+
+class DriveIndex:
+    """On-disk copy of Drive file metadata with local path and folder lookups."""
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    # ---------- metadata ----------
+    def get_meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def _set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    @property
+    def root_id(self):
+        return self.get_meta('root_id')
+
+    def is_empty(self):
+        return self.get_meta('page_token') is None
+
+    # ---------- synchronisation ----------
+    def rebuild(self, service):
+        """Replaces the index with a full scan of the Drive. Returns the number of files."""
+        limiter = get_limiter('drive')
+        root_id = limiter.execute(service.files().get(fileId='root', fields='id'))['id']
+        # Take the changes token first so edits made during the scan are replayed later.
+        start_token = limiter.execute(service.changes().getStartPageToken())['startPageToken']
+
+        count = 0
+        with self._lock, self.db:
+            self.db.execute("DELETE FROM files")
+            page_token = None
+            while True:
+                results = limiter.execute(service.files().list(
+                    q="trashed = false",
+                    spaces='drive',
+                    pageSize=PAGE_SIZE,
+                    pageToken=page_token,
+                    fields=f"nextPageToken, files({FILE_FIELDS})"
+                ))
+                rows = [_row(item) for item in results.get('files', [])]
+                self.db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                count += len(rows)
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
+            self._set_meta('root_id', root_id)
+            self._set_meta('page_token', start_token)
+            self._set_meta('synced_at', str(time.time()))
+        return count
+
+    def apply_changes(self, service):
+        """Applies the changes feed since the saved page token. Returns the number of changes."""
+        page_token = self.get_meta('page_token')
+        count = 0
+        with self._lock, self.db:
+            while page_token:
+                results = get_limiter('drive').execute(service.changes().list(
+                    pageToken=page_token,
+                    spaces='drive',
+                    pageSize=PAGE_SIZE,
+                    includeRemoved=True,
+                    fields=f"nextPageToken, newStartPageToken, changes(fileId, removed, file({FILE_FIELDS}))"
+                ))
+                for change in results.get('changes', []):
+                    item = change.get('file')
+                    if change.get('removed') or item is None or item.get('trashed'):
+                        self.db.execute("DELETE FROM files WHERE id = ?", (change['fileId'],))
+                    else:
+                        self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)", _row(item))
+                    count += 1
+                if 'newStartPageToken' in results:
+                    self._set_meta('page_token', results['newStartPageToken'])
+                    break
+                page_token = results.get('nextPageToken')
+            self._set_meta('synced_at', str(time.time()))
+        return count
+
+    @traced('index_sync')
+    def sync(self, service):
+        """Full scan on first use, incremental changes feed afterwards."""
+        if self.is_empty():
+            count = self.rebuild(service)
+            print(f"📦 Indexed {count} Drive files.")
+        else:
+            count = self.apply_changes(service)
+            print(f"🔄 Applied {count} Drive change(s).")
+        return count
+
+    def upsert(self, item):
+        """Records a file returned by the API (e.g. after an upload) without a full sync."""
+        with self._lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)", _row(item))
+
+    # ---------- lookups ----------
+    def child(self, parent_id, name, folders_only=False):
+        query = "SELECT * FROM files WHERE parent = ? AND name = ?"
+        if folders_only:
+            query += f" AND mime_type = '{FOLDER_MIME}'"
+        return self.db.execute(query + " ORDER BY id LIMIT 1", (parent_id, name)).fetchone()
+
+    def resolve_path(self, relative_path):
+        """Returns the folder ID for a path relative to My Drive, or None if it is not indexed."""
+        folder_id = self.root_id
+        for comp in path_components(relative_path):
+            row = self.child(folder_id, comp, folders_only=True)
+            if row is None:
+                return None
+            folder_id = row['id']
+        return folder_id
+
+    def list_folder(self, folder_id):
+        """Returns the rows of every file directly inside folder_id, newest first."""
+        return self.db.execute(
+            "SELECT * FROM files WHERE parent = ? ORDER BY modified DESC, name", (folder_id,)
+        ).fetchall()
+
+    def find_by_md5(self, md5):
+        return self.db.execute("SELECT * FROM files WHERE md5 = ?", (md5,)).fetchall()
+
+    def is_under(self, file_id, folder_id):
+        """True if file_id is folder_id or lies below it, following the indexed parents."""
+        seen = set()
+        while file_id is not None and file_id not in seen:
+            if file_id == folder_id:
+                return True
+            seen.add(file_id)
+            row = self.db.execute("SELECT parent FROM files WHERE id = ?", (file_id,)).fetchone()
+            file_id = row['parent'] if row else None
+        return False
+
+    def find_reusable(self, md5, folder_id, scope_id=None):
+        """
+        A file with this checksum that may stand in for an upload into folder_id: one in
+        folder_id itself, else one below scope_id (the blog's own tree), or None. Copies
+        elsewhere (other projects, files shared with the user) are never reused, since
+        their links would depend on someone else's permissions and lifetime.
+        """
+        rows = self.find_by_md5(md5)
+        for row in rows:
+            if row['parent'] == folder_id:
+                return row
+        if scope_id is None:
+            return None
+        return next((row for row in rows if self.is_under(row['parent'], scope_id)), None)
+
+    def known_ids(self, file_ids):
+        """Returns the subset of file_ids present in the index."""
+        file_ids = list(file_ids)
+        known = set()
+        for start in range(0, len(file_ids), 500):  # stay below SQLite's bound-parameter limit
+            chunk = file_ids[start:start + 500]
+            rows = self.db.execute(f"SELECT id FROM files WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+            known.update(row['id'] for row in rows)
+        return known
+
+
+def main():
+    setup_from_argv()
+    if len(sys.argv) < 2 or sys.argv[1] not in ('sync', 'rebuild', 'resolve', 'list'):
+        print("Usage: python drive_index.py sync | rebuild | resolve <RELATIVE_PATH> | list <RELATIVE_PATH>")
+        sys.exit(1)
+
+    command = sys.argv[1]
+    index = DriveIndex()
+
+    if command in ('sync', 'rebuild'):
+        creds = get_credentials(SCOPES, client_secret_file=CREDS_FILE)
+        service = get_service('drive', 'v3', creds)
+        if command == 'rebuild':
+            print(f"📦 Indexed {index.rebuild(service)} Drive files.")
+        else:
+            index.sync(service)
+        return
+
+    if index.is_empty():
+        print("Index is empty; run 'python drive_index.py sync' first.")
+        sys.exit(1)
+    relative_path = sys.argv[2] if len(sys.argv) > 2 else ''
+    folder_id = index.resolve_path(relative_path)
+    if folder_id is None:
+        print(f"Path '{relative_path}' not found in the index.")
+        sys.exit(1)
+    if command == 'resolve':
+        print(folder_id)
+    else:
+        for row in index.list_folder(folder_id):
+            print(f"{row['name']} ({row['id']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Persistent local-path -> Drive folder-ID cache with batched lookups.
+
+resolve_local_path_to_folder_id() used to issue one files().list call per path
+component, starting from 'root' on every run. resolve_paths() instead:
+    1. answers every known prefix from a JSON cache (entries expire after a TTL),
+    2. resolves the remaining prefixes level by level, sharing common prefixes
+       between all requested paths, and
+    3. sends the misses of each level as one Drive batch request (up to 100 calls each).
+
+Resolving a whole tree of image folders therefore costs one batch per directory
+level on the first run and no API calls at all afterwards.
+
+Usage:
+    python drive_path_cache.py --show
+    python drive_path_cache.py --clear [RELATIVE_PREFIX]
+
+Note:
+    Like list_drive_files_v3.py, folder names must match the Drive folder names exactly.
+    If several folders share a name at a level, the first one returned by Drive is used.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+from rate_limit import get_limiter
+from tracing import count, setup_from_argv, traced
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_FILE = os.path.join(SCRIPT_DIR, '.drive_path_cache.json')
+DEFAULT_TTL = 7 * 24 * 3600  # folders rarely move; a week keeps lookups cheap
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+BATCH_LIMIT = 100  # Drive accepts at most 100 calls per batch request
+
+
+def path_components(relative_path):
+    """Splits a relative path into its folder names, dropping '.', '..' and empty parts."""
+    return tuple(comp for comp in relative_path.replace('\\', '/').split('/')
+                 if comp not in ('.', '..', ''))
+
+
+def _key(components):
+    return '/'.join(components)
+
+
+class DrivePathCache:
+    """JSON-backed map of relative folder path -> Drive folder ID with a TTL."""
+
+    def __init__(self, path=CACHE_FILE, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+
+    def get(self, components):
+        with self._lock:
+            entry = self._entries.get(_key(components))
+        if entry is None or (self.ttl is not None and time.time() - entry['t'] > self.ttl):
+            return None
+        return entry['id']
+
+    def put(self, components, folder_id):
+        with self._lock:
+            self._entries[_key(components)] = {'id': folder_id, 't': time.time()}
+            self._dirty = True
+
+    def invalidate(self, prefix=''):
+        """Drops 'prefix' and everything below it (everything when prefix is empty)."""
+        prefix = _key(path_components(prefix))
+        with self._lock:
+            for key in list(self._entries):
+                if not prefix or key == prefix or key.startswith(prefix + '/'):
+                    del self._entries[key]
+                    self._dirty = True
+
+    def items(self):
+        with self._lock:
+            return sorted((key, entry['id']) for key, entry in self._entries.items())
+
+    def save(self):
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, indent=0, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+def _folder_query(parent_id, name):
+    name = name.replace('\\', '\\\\').replace("'", "\\'")
+    return (f"'{parent_id}' in parents and name = '{name}' "
+            f"and mimeType = '{FOLDER_MIME}' and trashed = false")
+
+
+def _lookup_children(service, lookups):
+    """
+    Resolves [(parent_id, name), ...] with batched files().list calls.
+    Returns {(parent_id, name): folder_id or None}.
+    """
+    found = {}
+    for start in range(0, len(lookups), BATCH_LIMIT):
+        chunk = lookups[start:start + BATCH_LIMIT]
+        errors = []
+
+        def callback(request_id, response, exception):
+            lookup = chunk[int(request_id)]
+            if exception is not None:
+                errors.append((lookup, exception))
+                return
+            folders = response.get('files', [])
+            found[lookup] = folders[0]['id'] if folders else None
+
+        requests = {str(i): service.files().list(
+            q=_folder_query(parent_id, name), fields='files(id, name)', pageSize=10
+        ) for i, (parent_id, name) in enumerate(chunk)}
+        if len(chunk) == 1:
+            callback('0', get_limiter('drive').execute(requests['0']), None)
+        else:
+            # Throttled or failed parts of a batch are resent on their own.
+            get_limiter('drive').execute_batch(service, requests, callback)
+
+        if errors:
+            (parent_id, name), exception = errors[0]
+            raise RuntimeError(f"Lookup of '{name}' under '{parent_id}' failed: {exception}")
+    return found
+
+
+@traced('resolve_paths')
+def resolve_paths(service, relative_paths, cache=None, index=None):
+    """
+    Resolves many relative Drive paths at once.
+    Returns {relative_path: folder_id or None}; None means some component does not exist.
+    When a synced DriveIndex (drive_index.py) is given, it answers every lookup locally.
+    """
+    if index is not None and not index.is_empty():
+        return {path: index.resolve_path(path) for path in relative_paths}
+    if cache is None:
+        cache = DrivePathCache()
+
+    targets = {path: path_components(path) for path in relative_paths}
+    resolved = {(): 'root'}
+    missing = set()
+    depth = max((len(comps) for comps in targets.values()), default=0)
+
+    for level in range(1, depth + 1):
+        prefixes = {comps[:level] for comps in targets.values() if len(comps) >= level}
+        lookups = {}
+        for prefix in sorted(prefixes):
+            parent = prefix[:-1]
+            if parent in missing or parent not in resolved:
+                missing.add(prefix)
+                continue
+            cached_id = cache.get(prefix)
+            if cached_id is not None:
+                resolved[prefix] = cached_id
+                count('path_cache.hits')
+            else:
+                lookups[(resolved[parent], prefix[-1])] = prefix
+
+        if lookups:
+            count('path_cache.misses', len(lookups))
+            found = _lookup_children(service, list(lookups))
+            for lookup, prefix in lookups.items():
+                folder_id = found.get(lookup)
+                if folder_id is None:
+                    print(f"Folder '{lookup[1]}' not found under parent ID '{lookup[0]}'.")
+                    missing.add(prefix)
+                else:
+                    resolved[prefix] = folder_id
+                    cache.put(prefix, folder_id)
+
+    cache.save()
+    return {path: resolved.get(comps) for path, comps in targets.items()}
+
+
+def resolve_path(service, relative_path, cache=None, index=None):
+    """Resolves a single relative path; see resolve_paths()."""
+    return resolve_paths(service, [relative_path], cache, index)[relative_path]
+
+
+def main():
+    setup_from_argv()
+    if len(sys.argv) < 2 or sys.argv[1] not in ('--show', '--clear'):
+        print("Usage: python drive_path_cache.py --show | --clear [RELATIVE_PREFIX]")
+        sys.exit(1)
+
+    cache = DrivePathCache(ttl=None)
+    if sys.argv[1] == '--show':
+        for key, folder_id in cache.items():
+            print(f"{key} ({folder_id})")
+    else:
+        prefix = sys.argv[2] if len(sys.argv) > 2 else ''
+        cache.invalidate(prefix)
+        cache.save()
+        print(f"Cache entries under '{prefix or '/'}' removed.")
+
+
+if __name__ == '__main__':
+    main()
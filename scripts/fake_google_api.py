@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the parts of the Drive v3 and Blogger v3 APIs the scripts use.
+
+Nothing in the pipeline could be measured or exercised without live Google
+services. FakeGoogleApi is a ThreadingHTTPServer that emulates:
+
+    Drive    GET  drive/v3/files              q ('<id>' in parents, name = '...',
+                                              mimeType = '...', trashed = false),
+                                              pageSize / pageToken pagination
+             GET  drive/v3/files/<id>         ('root' included; every file carries the
+                                              'anyoneWithLink' permission ID until a test
+                                              clears its permissionIds)
+             POST drive/v3/files              metadata-only create (folders)
+             POST upload/drive/v3/files       multipart and resumable uploads
+             GET  drive/v3/changes/startPageToken, drive/v3/changes
+             POST batch/drive/v3              multipart/mixed batches of the above
+    Blogger  GET/POST  v3/blogs/<blog>/posts  (list supports orderBy=UPDATED)
+             GET/PATCH v3/blogs/<blog>/posts/<post>
+    HEAD/GET anything else under /web/        200 for /web/ok..., 404 otherwise
+
+Each request can be delayed by 'latency' seconds (plus up to 'jitter'), and a
+fraction 'error_rate' of them is answered with 429 + Retry-After, alternating with
+403 rateLimitExceeded. Calls are counted per endpoint in server.calls.
+
+Point the scripts at it with GOOGLE_API_ROOT=http://127.0.0.1:<port>/ (see
+google_services.py) and google.auth.credentials.AnonymousCredentials.
+
+Usage:
+    python fake_google_api.py [--port 8765] [--latency 0.05] [--error-rate 0.02] [--tree DIR]
+
+Example:
+    python fake_google_api.py --tree ../HTML --latency 0.03
+    GOOGLE_API_ROOT=http://127.0.0.1:8765/ python drive_index.py sync
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+DEFAULT_PORT = 8765
+MAX_PAGE_SIZE = 1000
+ROOT_ID = 'root-folder'
+QUERY_CLAUSE = re.compile(r"""\s*(?:
+    '(?P<parent>[^']+)'\s+in\s+parents |
+    name\s*=\s*'(?P<name>(?:[^'\\]|\\.)*)' |
+    mimeType\s*=\s*'(?P<mime>[^']+)' |
+    mimeType\s*!=\s*'(?P<not_mime>[^']+)' |
+    trashed\s*=\s*(?P<trashed>true|false)
+)\s*(?:and|$)""", re.VERBOSE | re.IGNORECASE)
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def _instant(timestamp):
+    """An RFC 3339 timestamp as an aware datetime, so offsets sort like Blogger sorts them."""
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+
+
+def _fields(item, fields):
+    """Applies a (flat) field mask like 'id, name, parents' to one resource."""
+    if not fields:
+        return dict(item)
+    wanted = {f.strip() for f in fields.split(',')}
+    return {k: v for k, v in item.items() if k in wanted}
+
+
+def _item_fields(fields, collection):
+    """Extracts the item mask from e.g. 'nextPageToken, files(id, name)'."""
+    match = re.search(rf'{collection}\(([^)]*)\)', fields or '')
+    return match.group(1) if match else None
+
+
+def parse_query(q):
+    """Turns a Drive query into a predicate over file dicts; unsupported syntax raises ValueError."""
+    tests = []
+    pos = 0
+    q = q or ''
+    while pos < len(q.strip()):
+        match = QUERY_CLAUSE.match(q, pos)
+        if not match:
+            raise ValueError(f"unsupported query near: {q[pos:]!r}")
+        pos = match.end()
+        if match.group('parent'):
+            parent = ROOT_ID if match.group('parent') == 'root' else match.group('parent')
+            tests.append(lambda f, p=parent: p in f.get('parents', []))
+        elif match.group('name') is not None:
+            name = re.sub(r'\\(.)', r'\1', match.group('name'))
+            tests.append(lambda f, n=name: f['name'] == n)
+        elif match.group('mime'):
+            tests.append(lambda f, m=match.group('mime'): f['mimeType'] == m)
+        elif match.group('not_mime'):
+            tests.append(lambda f, m=match.group('not_mime'): f['mimeType'] != m)
+        else:
+            trashed = match.group('trashed').lower() == 'true'
+            tests.append(lambda f, t=trashed: f.get('trashed', False) == t)
+    return lambda f: all(test(f) for test in tests)
+
+
+class FakeDrive:
+    """In-memory Drive: a dict of file resources plus a change counter."""
+
+    def __init__(self):
+        self.files = {ROOT_ID: {'id': ROOT_ID, 'name': 'My Drive', 'mimeType': FOLDER_MIME,
+                                'parents': [], 'modifiedTime': _now()}}
+        self.change_token = 1
+        self._lock = threading.Lock()
+
+    def add(self, name, parent_id=ROOT_ID, mime_type='application/octet-stream', data=b'', file_id=None):
+        with self._lock:
+            file_id = file_id or uuid.uuid4().hex[:28]
+            item = {'id': file_id, 'name': name, 'mimeType': mime_type, 'parents': [parent_id],
+                    'modifiedTime': _now(), 'trashed': False, 'permissionIds': ['anyoneWithLink']}
+            if mime_type != FOLDER_MIME:
+                item['md5Checksum'] = hashlib.md5(data).hexdigest()
+                item['size'] = str(len(data))
+            self.files[file_id] = item
+            self.change_token += 1
+            return item
+
+    def folder(self, path, parent_id=ROOT_ID):
+        """Returns the ID of the folder at path (below parent_id), creating missing components."""
+        for name in [p for p in path.replace('\\', '/').split('/') if p]:
+            existing = [f for f in self.files.values()
+                        if parent_id in f.get('parents', []) and f['name'] == name and f['mimeType'] == FOLDER_MIME]
+            parent_id = existing[0]['id'] if existing else self.add(name, parent_id, FOLDER_MIME)['id']
+        return parent_id
+
+    def add_tree(self, local_root, drive_path=''):
+        """Mirrors a local directory tree (names and MD5s) below drive_path."""
+        base = self.folder(drive_path) if drive_path else ROOT_ID
+        folder_ids = {os.path.abspath(local_root): base}
+        for dirpath, dirnames, filenames in os.walk(local_root):
+            parent_id = folder_ids[os.path.abspath(dirpath)]
+            for name in sorted(dirnames):
+                folder_ids[os.path.abspath(os.path.join(dirpath, name))] = self.add(name, parent_id, FOLDER_MIME)['id']
+            for name in sorted(filenames):
+                with open(os.path.join(dirpath, name), 'rb') as f:
+                    self.add(name, parent_id, data=f.read())
+        return base
+
+    def list(self, q=None, page_size=100, page_token=None):
+        predicate = parse_query(q)
+        with self._lock:
+            matches = sorted((f for f in self.files.values() if f['id'] != ROOT_ID and predicate(f)),
+                             key=lambda f: (f['name'], f['id']))
+        start = int(page_token or 0)
+        page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+        page = matches[start:start + page_size]
+        token = str(start + page_size) if start + page_size < len(matches) else None
+        return page, token
+
+
+class FakeBlogger:
+    """In-memory Blogger: posts per blog, with ids, urls and updated timestamps."""
+
+    def __init__(self):
+        self.posts = {}
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def insert(self, blog_id, body):
+        with self._lock:
+            self._counter += 1
+            post_id = str(7000000000000000000 + self._counter)
+            slug = re.sub(r'[^a-z0-9]+', '-', (body.get('title') or 'post').lower()).strip('-')[:40]
+            now = _now()
+            post = {'kind': 'blogger#post', 'id': post_id, 'blog': {'id': blog_id},
+                    'title': body.get('title', ''), 'content': body.get('content', ''),
+                    'labels': body.get('labels', []), 'status': 'LIVE', 'published': now, 'updated': now,
+                    'url': f"http://fake.blogspot.com/{now[:4]}/{now[5:7]}/{slug}-{self._counter}.html",
+                    'etag': f'"{uuid.uuid4().hex}"'}
+            self.posts[post_id] = post
+            return post
+
+    def patch(self, blog_id, post_id, body):
+        with self._lock:
+            post = self.posts.get(post_id)
+            if post is None or post['blog']['id'] != blog_id:
+                return None
+            post.update({k: v for k, v in body.items() if k in ('title', 'content', 'labels')})
+            post['updated'] = _now()
+            post['etag'] = f'"{uuid.uuid4().hex}"'
+            return post
+
+    def list(self, blog_id, order_by='PUBLISHED', page_size=20, page_token=None):
+        key = 'updated' if (order_by or '').upper() == 'UPDATED' else 'published'
+        with self._lock:
+            posts = sorted((p for p in self.posts.values() if p['blog']['id'] == blog_id),
+                           key=lambda p: (_instant(p[key]), p['id']), reverse=True)
+        start = int(page_token or 0)
+        page_size = max(1, int(page_size or 20))
+        token = str(start + page_size) if start + page_size < len(posts) else None
+        return posts[start:start + page_size], token
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    # ---------- plumbing ----------
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _send(self, status, payload=None, headers=None, content_type='application/json'):
+        body = b'' if payload is None else (payload if isinstance(payload, bytes) else json.dumps(payload).encode())
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _dispatch(self):
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        body = self._body()
+        server = self.server
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.uniform(0, server.jitter))
+        if url.path.startswith('/batch/'):
+            server.count('batch')
+            status, payload, headers, content_type = self._batch(body)
+        else:
+            if server.should_fail():
+                status, payload, headers = server.rate_limit_error()
+                server.count('throttled:' + _endpoint(self.command, url.path))
+                self._send(status, payload, headers)
+                return
+            status, payload, headers = server.route(self.command, url.path, query, self.headers, body)
+            content_type = 'application/json'
+        self._send(status, payload, headers, content_type)
+
+    do_GET = do_POST = do_PATCH = do_PUT = do_HEAD = do_DELETE = _dispatch
+
+    def _batch(self, body):
+        """Answers a multipart/mixed batch by dispatching every part in turn."""
+        content_type = self.headers.get('Content-Type', '')
+        message = BytesParser().parsebytes(f'Content-Type: {content_type}\r\n\r\n'.encode() + body)
+        if not message.is_multipart():
+            return 400, {'error': {'code': 400, 'message': 'expected multipart/mixed'}}, None, 'application/json'
+        out_boundary = 'batch_' + uuid.uuid4().hex
+        parts = []
+        for part in message.get_payload():
+            content_id = (part['Content-ID'] or '').strip('<>').encode()
+            # The embedded request uses \n or \r\n line ends depending on the client.
+            inner = (part.get_payload(decode=True) or b'').replace(b'\r\n', b'\n')
+            head, _, part_body = inner.partition(b'\n\n')
+            request_line, *header_lines = head.decode('latin-1').splitlines()
+            method, target, _ = request_line.split(' ', 2)
+            url = urlsplit(target)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            headers = {}
+            for line in header_lines:
+                if ':' in line:
+                    key, value = line.split(':', 1)
+                    headers[key.strip()] = value.strip()
+            if self.server.should_fail():
+                status, payload, _ = self.server.rate_limit_error()
+                self.server.count('throttled:' + _endpoint(method, url.path))
+            else:
+                status, payload, _ = self.server.route(method, url.path, query, headers, part_body.strip())
+            payload_bytes = json.dumps(payload).encode() if payload is not None else b''
+            response_id = b'response-' + content_id
+            parts.append(b'--' + out_boundary.encode() + b'\r\nContent-Type: application/http\r\n'
+                         b'Content-ID: <' + response_id + b'>\r\n\r\n'
+                         + f'HTTP/1.1 {status} {"OK" if status < 400 else "Error"}\r\n'
+                           f'Content-Type: application/json; charset=UTF-8\r\n'
+                           f'Content-Length: {len(payload_bytes)}\r\n\r\n'.encode()
+                         + payload_bytes + b'\r\n')
+        payload = b''.join(parts) + f'--{out_boundary}--\r\n'.encode()
+        return 200, payload, None, f'multipart/mixed; boundary={out_boundary}'
+
+
+def _endpoint(method, path):
+    """Collapses IDs out of a path so calls can be counted per endpoint."""
+    path = re.sub(r'/blogs/[^/]+', '/blogs/*', path)
+    path = re.sub(r'/posts/[^/]+', '/posts/*', path)
+    path = re.sub(r'/files/[^/]+', '/files/*', path)
+    if path.startswith('/web/'):
+        path = '/web/*'
+    return f"{method} {path}"
+
+
+class FakeGoogleApi(ThreadingHTTPServer):
+    """The server; run it with start() (background thread) or serve_forever()."""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, jitter=0.0, error_rate=0.0, retry_after=0.1, verbose=False):
+        super().__init__(('127.0.0.1', port), _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.verbose = verbose
+        self.drive = FakeDrive()
+        self.blogger = FakeBlogger()
+        self.calls = Counter()
+        self._uploads = {}
+        self._lock = threading.Lock()
+        self._errors = 0
+        self._thread = None
+
+    @property
+    def root_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def count(self, endpoint):
+        with self._lock:
+            self.calls[endpoint] += 1
+
+    def reset_counts(self):
+        with self._lock:
+            self.calls.clear()
+
+    def should_fail(self):
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+    def rate_limit_error(self):
+        with self._lock:
+            self._errors += 1
+            alternate = self._errors % 2
+        if alternate:
+            return 429, {'error': {'code': 429, 'message': 'Too many requests',
+                                   'errors': [{'reason': 'rateLimitExceeded'}]}}, {'Retry-After': f'{self.retry_after:g}'}
+        return 403, {'error': {'code': 403, 'message': 'Rate Limit Exceeded',
+                               'errors': [{'reason': 'rateLimitExceeded', 'domain': 'usageLimits'}]}}, None
+
+    # ---------- routing ----------
+    def route(self, method, path, query, headers, body):
+        """Returns (status, payload, headers) for one (non-batch) API request."""
+        self.count(_endpoint(method, path))
+        try:
+            if path.startswith('/web/'):
+                return (200, None, None) if path.startswith('/web/ok') else (404, None, None)
+            if path.startswith('/drive/v3/') or path.startswith('/upload/drive/v3/'):
+                return self._drive(method, path, query, headers, body)
+            if path.startswith('/v3/blogs/'):
+                return self._blogger(method, path, query, body)
+        except ValueError as e:
+            return 400, {'error': {'code': 400, 'message': str(e), 'errors': [{'reason': 'invalid'}]}}, None
+        return 404, {'error': {'code': 404, 'message': f'No route for {method} {path}'}}, None
+
+    def _not_found(self, what):
+        return 404, {'error': {'code': 404, 'message': f'{what} not found', 'errors': [{'reason': 'notFound'}]}}, None
+
+    def _drive(self, method, path, query, headers, body):
+        drive = self.drive
+        if path == '/drive/v3/files' and method == 'GET':
+            page, token = drive.list(query.get('q'), query.get('pageSize', 100), query.get('pageToken'))
+            mask = _item_fields(query.get('fields'), 'files')
+            payload = {'files': [_fields(f, mask) for f in page]}
+            if token:
+                payload['nextPageToken'] = token
+            return 200, payload, None
+        if path == '/drive/v3/files' and method == 'POST':
+            # Metadata-only create, e.g. a folder.
+            metadata = json.loads(body or b'{}')
+            item = drive.add(metadata.get('name', 'Untitled'), (metadata.get('parents') or [ROOT_ID])[0],
+                             metadata.get('mimeType', 'application/octet-stream'))
+            return 200, _fields(item, query.get('fields')), None
+        if path.startswith('/drive/v3/files/') and method == 'GET':
+            file_id = path.rsplit('/', 1)[1]
+            item = drive.files.get(ROOT_ID if file_id == 'root' else file_id)
+            if item is None:
+                return self._not_found(f'File {file_id}')
+            return 200, _fields(item, query.get('fields')), None
+        if path == '/drive/v3/changes/startPageToken':
+            return 200, {'startPageToken': str(drive.change_token)}, None
+        if path == '/drive/v3/changes':
+            return 200, {'changes': [], 'newStartPageToken': str(drive.change_token)}, None
+        if path.startswith('/upload/drive/v3/files'):
+            return self._upload(method, path, query, headers, body)
+        return 404, {'error': {'code': 404, 'message': f'No route for {method} {path}'}}, None
+
+    def _upload(self, method, path, query, headers, body):
+        upload_type = query.get('uploadType')
+        if upload_type == 'resumable' and 'upload_id' not in query:
+            upload_id = uuid.uuid4().hex
+            file_id = path.rsplit('/', 1)[1] if path.count('/') > 4 else None
+            self._uploads[upload_id] = {'metadata': json.loads(body or b'{}'), 'file_id': file_id}
+            location = f"{self.root_url}upload/drive/v3/files?uploadType=resumable&upload_id={upload_id}"
+            return 200, {}, {'Location': location}
+        if upload_type == 'resumable':
+            upload = self._uploads.pop(query['upload_id'], None)
+            if upload is None:
+                return self._not_found('Upload session')
+            metadata, data = upload['metadata'], body
+        else:
+            content_type = {k.lower(): v for k, v in headers.items()}.get('content-type', '')
+            boundary = re.search(r'boundary="?([^";]+)"?', content_type).group(1).encode()
+            parts = [p for p in body.split(b'--' + boundary) if p.strip() not in (b'', b'--')]
+            metadata = json.loads(parts[0].partition(b'\r\n\r\n')[2])
+            data = parts[1].partition(b'\r\n\r\n')[2].rstrip(b'\r\n')
+        parent = (metadata.get('parents') or [ROOT_ID])[0]
+        item = self.drive.add(metadata.get('name', 'upload'), parent, metadata.get('mimeType', 'application/octet-stream'),
+                              data)
+        return 200, _fields(item, query.get('fields')), None
+
+    def _blogger(self, method, path, query, body):
+        parts = path.strip('/').split('/')  # v3 blogs <blog> posts [<post>]
+        if len(parts) < 4 or parts[3] != 'posts':
+            return 404, {'error': {'code': 404, 'message': f'No route for {method} {path}'}}, None
+        blog_id = parts[2]
+        blogger = self.blogger
+        if len(parts) == 4 and method == 'POST':
+            return 200, _fields(blogger.insert(blog_id, json.loads(body or b'{}')), None), None
+        if len(parts) == 4 and method == 'GET':
+            page, token = blogger.list(blog_id, query.get('orderBy'), query.get('maxResults'), query.get('pageToken'))
+            if query.get('fetchBodies', 'true') == 'false':
+                page = [{k: v for k, v in p.items() if k != 'content'} for p in page]
+            mask = _item_fields(query.get('fields'), 'items')
+            payload = {'kind': 'blogger#postList', 'items': [_fields(p, mask) for p in page]}
+            if token:
+                payload['nextPageToken'] = token
+            return 200, payload, None
+        post_id = parts[4]
+        if method == 'PATCH':
+            post = blogger.patch(blog_id, post_id, json.loads(body or b'{}'))
+        else:
+            post = blogger.posts.get(post_id)
+        if post is None:
+            return self._not_found(f'Post {post_id}')
+        return 200, dict(post), None
+
+
+def main():
+    args = sys.argv[1:]
+    options = {'--port': str(DEFAULT_PORT), '--latency': '0', '--jitter': '0', '--error-rate': '0'}
+    trees = []
+    i = 0
+    while i < len(args):
+        if args[i] in options and i + 1 < len(args):
+            options[args[i]] = args[i + 1]
+        elif args[i] == '--tree' and i + 1 < len(args):
+            trees.append(args[i + 1])
+        else:
+            print("Usage: python fake_google_api.py [--port 8765] [--latency S] [--jitter S] "
+                  "[--error-rate F] [--tree DIR ...]")
+            sys.exit(1)
+        i += 2
+
+    server = FakeGoogleApi(int(options['--port']), float(options['--latency']), float(options['--jitter']),
+                           float(options['--error-rate']), verbose=True)
+    for tree in trees:
+        server.drive.add_tree(tree, os.path.basename(os.path.abspath(tree)))
+    print(f"🧪 Fake Google API on {server.root_url} ({len(server.drive.files)} Drive files)")
+    print(f"   export GOOGLE_API_ROOT={server.root_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
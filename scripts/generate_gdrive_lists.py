@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Generate Gdrive.list for every images/ folder under a tree in one run.
+
+list_drive_files_v3.py handles one folder per run. This script finds every
+directory named 'images' below ROOT, resolves all of them to Drive folder IDs in
+one batched pass (drive_path_cache.py), then lists the folders concurrently over
+one pooled connection (async_google.py), following every result page. Each
+listing is streamed line by line to Gdrive.list.tmp as the pages arrive, so no
+listing is held in memory, and renamed over Gdrive.list when complete, so an
+interrupted run never leaves a truncated file behind. The finished file is then
+imported into the site's image map (image_map.py) when there is one.
+
+With --index, the local Drive index (drive_index.py) is brought up to date from the
+changes feed and every folder is resolved and listed from it, with no per-folder calls.
+
+Usage:
+    python generate_gdrive_lists.py <TOP_MOUNTED_DRIVE_PATH> <ROOT> [--workers N] [--index]
+
+Example:
+    python generate_gdrive_lists.py /home/evan/GdriveMagnes /home/evan/GdriveMagnes/Github/Private/Blog/HTML/2025
+"""
+
+import asyncio
+import os
+import sys
+from contextlib import contextmanager
+
+from async_google import AsyncGoogleClient
+from auth_cache import get_credentials
+from drive_index import DriveIndex
+from drive_path_cache import resolve_paths
+from google_services import get_service
+from image_map import find_image_map
+from list_drive_files_v3 import CREDS_FILE, SCOPES, get_relative_drive_path
+from rate_limit import LEDGER
+from tracing import setup_from_argv, span
+
+IMAGES_DIR_NAME = 'images'
+GDRIVE_LIST_NAME = 'Gdrive.list'
+DEFAULT_WORKERS = 8
+
+
+def find_image_dirs(root):
+    """Returns every directory named 'images' below root (root included), sorted."""
+    found = []
+    for dirpath, dirnames, _ in os.walk(root):
+        dirnames.sort()
+        if os.path.basename(dirpath) == IMAGES_DIR_NAME:
+            found.append(dirpath)
+    return found
+
+
+class _Listing:
+    """A Gdrive.list being written, one "name (id)" line at a time."""
+
+    def __init__(self, f):
+        self.f = f
+        self.lines = 0
+
+    def write(self, name, file_id):
+        self.f.write(f"{name} ({file_id})\n")
+        self.lines += 1
+
+
+@contextmanager
+def _open_listing(local_dir, image_map=None):
+    """
+    Yields a _Listing writing local_dir/Gdrive.list.tmp, which replaces Gdrive.list
+    only if the with-block completes and is removed otherwise.
+    """
+    output_file = os.path.join(local_dir, GDRIVE_LIST_NAME)
+    tmp_file = output_file + '.tmp'
+    try:
+        with span('write_listing', dir=local_dir), open(tmp_file, 'w', encoding='utf-8') as f:
+            yield _Listing(f)
+        os.replace(tmp_file, output_file)
+    finally:
+        if os.path.exists(tmp_file):  # the listing failed part way
+            os.remove(tmp_file)
+    if image_map is not None:
+        image_map.import_list(local_dir)
+
+
+def write_listing(items, local_dir, image_map=None):
+    """
+    Streams (name, id) pairs into local_dir/Gdrive.list; returns the line count.
+    With an ImageMap (image_map.py) the finished file is imported into it, so it
+    does not have to be parsed again on the next lookup.
+    """
+    with _open_listing(local_dir, image_map) as listing:
+        for name, file_id in items:
+            listing.write(name, file_id)
+    return listing.lines
+
+
+async def write_gdrive_list_async(client, folder_id, local_dir, image_map=None):
+    """Lists folder_id over a shared AsyncGoogleClient, writing each result as its page arrives."""
+    with _open_listing(local_dir, image_map) as listing:
+        async for item in client.drive_list(f"'{folder_id}' in parents and trashed = false"):
+            listing.write(item['name'], item['id'])
+    return listing.lines
+
+
+async def _list_folders(creds, jobs, workers, image_map=None):
+    """Lists every (folder_id, local_dir) job concurrently; returns counts or exceptions."""
+    async with AsyncGoogleClient(creds, max_concurrency=max(1, workers)) as client:
+        return await asyncio.gather(*(write_gdrive_list_async(client, folder_id, local_dir, image_map)
+                                      for folder_id, local_dir in jobs), return_exceptions=True)
+
+
+def generate_gdrive_lists_from_index(index, top_mount, root):
+    """Writes Gdrive.list files from the local Drive index only. Returns (written, failed)."""
+    written = failed = 0
+    image_map = find_image_map(root)
+    for local_dir in find_image_dirs(root):
+        rel_path = get_relative_drive_path(top_mount, local_dir)
+        folder_id = index.resolve_path(rel_path)
+        if folder_id is None:
+            print(f"❌ {rel_path}: not in the Drive index")
+            failed += 1
+            continue
+        rows = index.list_folder(folder_id)
+        entries = write_listing(((row['name'], row['id']) for row in rows), local_dir, image_map)
+        print(f"✅ {rel_path}/{GDRIVE_LIST_NAME}: {entries} entries")
+        written += 1
+    return written, failed
+
+
+def generate_gdrive_lists(creds, top_mount, root, workers=DEFAULT_WORKERS):
+    """Writes Gdrive.list into every images/ folder under root. Returns (written, failed)."""
+    service = get_service('drive', 'v3', creds)
+
+    local_dirs = find_image_dirs(root)
+    if not local_dirs:
+        print(f"No '{IMAGES_DIR_NAME}' folders found under {root}")
+        return 0, 0
+
+    relative = {local_dir: get_relative_drive_path(top_mount, local_dir) for local_dir in local_dirs}
+    folder_ids = resolve_paths(service, list(relative.values()))
+
+    written = failed = 0
+    jobs = []
+    for local_dir, rel_path in relative.items():
+        folder_id = folder_ids[rel_path]
+        if folder_id is None:
+            print(f"❌ {rel_path}: no matching Drive folder")
+            failed += 1
+            continue
+        jobs.append((folder_id, local_dir))
+
+    results = asyncio.run(_list_folders(creds, jobs, workers, find_image_map(root)))
+    for (_, local_dir), result in zip(jobs, results):
+        rel_path = relative[local_dir]
+        if isinstance(result, Exception):
+            print(f"❌ {rel_path}: {result}")
+            failed += 1
+        else:
+            print(f"✅ {rel_path}/{GDRIVE_LIST_NAME}: {result} entries")
+            written += 1
+
+    return written, failed
+
+
+def main():
+    args = setup_from_argv()[1:]
+    workers = DEFAULT_WORKERS
+    use_index = '--index' in args
+    if use_index:
+        args.remove('--index')
+    if '--workers' in args:
+        i = args.index('--workers')
+        workers = int(args[i + 1])
+        del args[i:i + 2]
+
+    if len(args) != 2:
+        print("Usage: python generate_gdrive_lists.py <TOP_MOUNTED_DRIVE_PATH> <ROOT> [--workers N] [--index]")
+        sys.exit(1)
+
+    top_mount, root = args
+    try:
+        get_relative_drive_path(top_mount, root)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    creds = get_credentials(SCOPES, client_secret_file=CREDS_FILE)
+    if use_index:
+        index = DriveIndex()
+        index.sync(get_service('drive', 'v3', creds))
+        written, failed = generate_gdrive_lists_from_index(index, top_mount, root)
+    else:
+        written, failed = generate_gdrive_lists(creds, top_mount, root, workers=workers)
+    print(f"Done: {written} Gdrive.list file(s) written, {failed} failed.")
+    report = LEDGER.report()
+    if report:
+        print(report)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Shared, cached Google API service objects and discovery documents.
+
+Every helper used to call googleapiclient.discovery.build() itself; for example
+list_drive_files_v3.list_drive_files built a second Drive service although
+__main__ already had one. Each build() parses the whole discovery document again
+and opens its own connection. get_service() builds each (api, version, credentials)
+combination once per process and hands the same object to every caller.
+
+discovery_document() returns the parsed document (the static copy shipped with
+google-api-python-client, so no network fetch) and is also what async_google.py uses
+to build request URLs.
+
+Setting GOOGLE_API_ROOT (e.g. http://127.0.0.1:8765/) sends every service, including
+batch and upload requests, to another server such as fake_google_api.py.
+
+Usage:
+    from google_services import get_service
+    service = get_service('drive', 'v3', creds)
+"""
+
+import json
+import os
+import threading
+from functools import lru_cache
+
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build, build_from_document
+
+from tracing import span
+
+API_ROOT_ENV = 'GOOGLE_API_ROOT'
+
+_services = {}
+_lock = threading.Lock()
+
+
+def api_root():
+    """The root URL override from GOOGLE_API_ROOT, or None for the real endpoints."""
+    return os.environ.get(API_ROOT_ENV) or None
+
+
+@lru_cache(maxsize=None)
+def discovery_document(api, version, root_url=None):
+    """
+    Returns the parsed discovery document for api/version, loaded once per process.
+    root_url replaces the document's rootUrl, from which every request URL is built
+    (client_options' api_endpoint would miss the batch URL).
+    """
+    doc = discovery_cache.get_static_doc(api, version)
+    if doc is None:
+        return None
+    doc = json.loads(doc)
+    if root_url:
+        doc['rootUrl'] = doc['mtlsRootUrl'] = root_url
+    return doc
+
+
+def get_service(api, version, credentials, root_url=None, **kwargs):
+    """
+    Returns a service for api/version bound to credentials, building it only once.
+    root_url (default: GOOGLE_API_ROOT) points the service at another server. Extra
+    keyword arguments are forwarded to build() and take part in the cache key.
+    """
+    root_url = root_url or api_root()
+    key = (api, version, id(credentials), root_url, json.dumps(kwargs, sort_keys=True, default=str))
+    with _lock:
+        service = _services.get(key)
+        if service is None:
+            with span('discovery', api=api, version=version):
+                doc = discovery_document(api, version, root_url)
+                if doc is not None:
+                    service = build_from_document(doc, credentials=credentials, **kwargs)
+                else:
+                    service = build(api, version, credentials=credentials, **kwargs)
+            _services[key] = service
+    return service
+
+
+def clear_services():
+    """Forgets every cached service (e.g. after switching accounts)."""
+    with _lock:
+        _services.clear()
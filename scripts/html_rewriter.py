@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+html_rewriter.py
+----------------
+
+Single-pass, streaming URL rewriter for HTML built on html.parser.
+
+The regex in substitute_img_src.py only saw double-quoted <img src="...">, and
+'tag.replace(src, new_src)' could also change other attributes containing the same
+text. HtmlRewriter instead tokenizes the document and passes every URL-bearing
+attribute through one callback:
+
+    src, href, poster, data-src, background, srcset (each candidate),
+    style="...url(...)..." and url(...) inside <style> elements (background-image).
+
+Quoting style does not matter (single, double or unquoted values). Everything the
+callback leaves alone is copied to the output byte for byte, including Word
+conditional comments and MSO markup; only tags whose attributes actually changed
+are re-serialized. Input is fed in chunks and output is written as soon as each
+construct is parsed, so memory is bounded by the chunk size and the largest single
+construct (e.g. one MSO <style> block), not by the document size.
+
+Example usage:
+    python html_rewriter.py --bench ../HTML/2025/Sequencing_Lab_2003/lab2_v2.html
+"""
+
+import io
+import re
+import sys
+import time
+import tracemalloc
+from html.parser import HTMLParser
+
+CHUNK_SIZE = 64 * 1024
+URL_ATTRIBUTES = {'src', 'href', 'poster', 'data-src', 'background', 'lowsrc', 'longdesc'}
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''', re.IGNORECASE)
+
+
+def rewrite_css_urls(css, rewrite_url, tag):
+    """Rewrites every url(...) inside a CSS string."""
+    def replacer(match):
+        quote, url = match.groups()
+        new_url = rewrite_url(url.strip(), tag, 'style')
+        return match.group(0) if new_url is None else f"url({quote}{new_url}{quote})"
+    return CSS_URL.sub(replacer, css)
+
+
+def rewrite_srcset(srcset, rewrite_url, tag):
+    """Rewrites each URL of a srcset, keeping its width/density descriptor."""
+    candidates = []
+    for candidate in srcset.split(','):
+        parts = candidate.strip().split(None, 1)
+        if not parts:
+            continue
+        new_url = rewrite_url(parts[0], tag, 'srcset')
+        parts[0] = parts[0] if new_url is None else new_url
+        candidates.append(' '.join(parts))
+    return ', '.join(candidates)
+
+
+def serialize_starttag(tag, attrs, self_closing=False):
+    """Builds a start tag from (name, value) pairs, double-quoting every value."""
+    parts = [tag]
+    for name, value in attrs:
+        if value is None:
+            parts.append(name)
+        else:
+            value = value.replace('&', '&amp;').replace('"', '&quot;')
+            parts.append(f'{name}="{value}"')
+    return '<' + ' '.join(parts) + (' />' if self_closing else '>')
+
+
+class HtmlRewriter(HTMLParser):
+    """
+    Streams HTML to 'write', passing URLs through rewrite_url(url, tag, attr) -> new URL
+    or None (keep). rewrite_tag(tag, attrs) -> attrs or None, if given, can change the
+    attribute list of any start tag after the URLs have been rewritten.
+    """
+
+    def __init__(self, write, rewrite_url=None, rewrite_tag=None):
+        super().__init__(convert_charrefs=False)
+        self._write = write
+        self._rewrite_url = rewrite_url or (lambda url, tag, attr: None)
+        self._rewrite_tag = rewrite_tag
+        self._replacement = None
+        self._in_style = False
+
+    # Every construct the tokenizer consumes ends with updatepos(i, j); rawdata[i:j]
+    # is its exact source text, so copying that span keeps untouched markup intact.
+    def updatepos(self, i, j):
+        if i < j:
+            if self._replacement is not None:
+                self._write(self._replacement)
+            else:
+                self._write(self.rawdata[i:j])
+        self._replacement = None
+        return super().updatepos(i, j)
+
+    def _rewrite_attrs(self, tag, attrs):
+        new_attrs = []
+        for name, value in attrs:
+            if value is not None:
+                if name in URL_ATTRIBUTES:
+                    new_value = self._rewrite_url(value.strip(), tag, name)
+                    value = value if new_value is None else new_value
+                elif name == 'srcset':
+                    value = rewrite_srcset(value, self._rewrite_url, tag)
+                elif name == 'style' and 'url(' in value.lower():
+                    value = rewrite_css_urls(value, self._rewrite_url, tag)
+            new_attrs.append((name, value))
+        if self._rewrite_tag is not None:
+            new_attrs = self._rewrite_tag(tag, new_attrs) or new_attrs
+        return new_attrs
+
+    def handle_starttag(self, tag, attrs):
+        self._in_style = tag == 'style'
+        new_attrs = self._rewrite_attrs(tag, attrs)
+        if new_attrs != attrs:
+            raw = self.get_starttag_text()
+            self._replacement = serialize_starttag(tag, new_attrs, raw.endswith('/>'))
+
+    def handle_startendtag(self, tag, attrs):
+        new_attrs = self._rewrite_attrs(tag, attrs)
+        if new_attrs != attrs:
+            self._replacement = serialize_starttag(tag, new_attrs, True)
+
+    def handle_endtag(self, tag):
+        if tag == 'style':
+            self._in_style = False
+
+    def handle_data(self, data):
+        if self._in_style and 'url(' in data.lower():
+            self._replacement = rewrite_css_urls(data, self._rewrite_url, 'style')
+
+
+def rewrite_stream(infile, outfile, rewrite_url=None, rewrite_tag=None, chunk_size=CHUNK_SIZE):
+    """Rewrites a text stream chunk by chunk; only the current chunk is held in memory."""
+    rewriter = HtmlRewriter(outfile.write, rewrite_url, rewrite_tag)
+    for chunk in iter(lambda: infile.read(chunk_size), ''):
+        rewriter.feed(chunk)
+    rewriter.close()
+
+
+def rewrite_html(html_content, rewrite_url=None, rewrite_tag=None):
+    """Convenience wrapper: rewrites a whole string and returns the result."""
+    out = io.StringIO()
+    rewrite_stream(io.StringIO(html_content), out, rewrite_url, rewrite_tag)
+    return out.getvalue()
+
+
+class _Discard:
+    def write(self, text):
+        pass
+
+
+def benchmark(html_file, repeat=20):
+    """Compares the legacy regex substitution with the streaming rewriter on one file."""
+    from substitute_img_src import substitute_img_src, substitute_img_src_regex
+
+    with open(html_file, 'r', encoding='utf-8', errors='replace') as f:
+        html_content = f.read()
+    names = set(re.findall(r'''(?:src|href)\s*=\s*["']?([^"'\s>]+)''', html_content))
+    gdrive_map = {name.rsplit('/', 1)[-1]: f"ID{i}" for i, name in enumerate(sorted(names))}
+
+    for label, func in (('regex', substitute_img_src_regex), ('streaming', substitute_img_src)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func(html_content, gdrive_map)
+        elapsed = (time.perf_counter() - start) / repeat
+
+        tracemalloc.start()
+        func(html_content, gdrive_map)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:>9}: {elapsed * 1000:7.2f} ms/run, peak {peak / 1024:7.1f} KiB")
+
+    size = len(html_content)
+    start = time.perf_counter()
+    with open(html_file, 'r', encoding='utf-8', errors='replace') as infile:
+        tracemalloc.start()
+        rewrite_stream(infile, _Discard())
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    print(f"   stream: file of {size / 1024:.0f} KiB rewritten in "
+          f"{(time.perf_counter() - start) * 1000:.2f} ms, peak {peak / 1024:.1f} KiB (excluding output)")
+
+
+def main():
+    if len(sys.argv) != 3 or sys.argv[1] != '--bench':
+        print("Usage: python html_rewriter.py --bench <html_file>")
+        sys.exit(1)
+    benchmark(sys.argv[2])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+image_derivatives.py
+--------------------
+
+Builds responsive, size-appropriate copies of the images in a post's images/ folder.
+
+substitute_img_src.py used to point every <img> at the original file with a fixed
+'=s400' size, whatever its layout width, so readers downloaded multi-MB camera
+JPEGs (or a TIFF). This stage writes, next to each original:
+
+    image1.jpg  ->  image1.320w.webp, image1.640w.webp, image1.1024w.webp, image1.1600w.webp
+
+- EXIF/metadata is stripped (orientation is applied to the pixels first),
+- TIFF, PNG, BMP and still GIF inputs are converted; animated GIFs are left alone,
+- originals are never upscaled: widths above the source width are skipped,
+- images are encoded in parallel on a process pool,
+- every encoded file is cached under SCRIPT_DIR/.cache/derivatives/<sha256>/<settings>/,
+  where <settings> (encoding_key()) names the format, QUALITY and WIDTHS, so an
+  unchanged (or duplicated) photo is never re-encoded, and changing a setting
+  re-encodes instead of reusing files made with the old one.
+
+images/derivatives.json records the widths available for each original. sync_images.py
+uploads the derivatives like any other image, and substitute_img_src.py turns the
+manifest into srcset/sizes attributes.
+
+Example usage:
+    python image_derivatives.py ../HTML/2025/Nobel_save/images [--format jpeg] [--workers N]
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps
+
+from tracing import setup_from_argv
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(SCRIPT_DIR, '.cache', 'derivatives')
+MANIFEST_NAME = 'derivatives.json'
+WIDTHS = (320, 640, 1024, 1600)
+FORMATS = {'webp': ('WEBP', '.webp'), 'jpeg': ('JPEG', '.jpg')}
+QUALITY = 82
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.tif', '.tiff', '.bmp', '.webp')
+DERIVED_NAME = re.compile(r'\.\d+w\.(webp|jpg)$', re.IGNORECASE)
+
+
+def is_derivative(filename):
+    return DERIVED_NAME.search(filename) is not None
+
+
+def source_images(images_dir):
+    """Returns the original (non-derived) image names in images_dir."""
+    return sorted(name for name in os.listdir(images_dir)
+                  if name.lower().endswith(SOURCE_EXTENSIONS) and not is_derivative(name)
+                  and os.path.isfile(os.path.join(images_dir, name)))
+
+
+def file_sha256(path):
+    """Streams a file through SHA-256 and returns the hex digest (also used by build.py and create_post.py)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def encoding_key(widths=WIDTHS, fmt='webp'):
+    """Names the encoder settings, e.g. 'webp-q82-320-640-1024-1600'; cached files depend on it."""
+    return f"{fmt}-q{QUALITY}-{'-'.join(str(w) for w in sorted(widths))}"
+
+
+def derived_name(stem, width, extension):
+    return f"{stem}.{width}w{extension}"
+
+
+def derivative_stems(names):
+    """
+    Maps each source name to the stem of its derivatives: the name without its
+    extension, or the full name when two sources share a stem (e.g. a .png and a .tif).
+    """
+    counts = {}
+    for name in names:
+        stem = os.path.splitext(name)[0]
+        counts[stem] = counts.get(stem, 0) + 1
+    return {name: os.path.splitext(name)[0] if counts[os.path.splitext(name)[0]] == 1 else name
+            for name in names}
+
+
+def _encode(source, cache_dir, widths, fmt):
+    """Encodes one source (path or binary file) into cache_dir; returns [(width, height, cache_file)] or None."""
+    pil_format, extension = FORMATS[fmt]
+    with Image.open(source) as img:
+        if getattr(img, 'is_animated', False):
+            return None
+        img = ImageOps.exif_transpose(img)
+        has_alpha = img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+        mode = 'RGBA' if has_alpha and pil_format == 'WEBP' else 'RGB'
+        if img.mode != mode:
+            img = img.convert(mode)
+
+        targets = [w for w in widths if w < img.width] or [img.width]
+        if img.width not in targets and img.width < max(widths):
+            targets.append(img.width)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        results = []
+        for width in sorted(targets):
+            height = round(img.height * width / img.width)
+            cache_file = os.path.join(cache_dir, f"{width}{extension}")
+            if not os.path.exists(cache_file):
+                resized = img.resize((width, height), Image.LANCZOS) if width != img.width else img
+                tmp_file = cache_file + '.tmp'
+                # No exif= argument: the metadata of the original is dropped.
+                resized.save(tmp_file, pil_format, quality=QUALITY, optimize=True)
+                os.replace(tmp_file, cache_file)
+            results.append((width, height, cache_file))
+    return results
+
+
+def encode_cached(source, sha, widths=WIDTHS, fmt='webp'):
+    """
+    Encodes the derivatives of source (a path or a seekable binary file, e.g. a ZIP
+    member) into the cache entry of its SHA-256 and the encoder settings. Returns
+    [(width, height, cache_file)], or None for images that are skipped (animated GIFs).
+    """
+    return _encode(source, os.path.join(CACHE_DIR, sha, encoding_key(widths, fmt)), widths, fmt)
+
+
+def build_derivatives_for(source_path, widths=WIDTHS, fmt='webp', stem=None):
+    """
+    Worker entry point: hashes source_path, encodes its derivatives (or reuses the
+    cache) and places them next to it. Returns (source_name, entries) where entries
+    is a list of {"width", "height", "file"} dicts, or None for skipped images.
+    """
+    images_dir, source_name = os.path.split(source_path)
+    stem = stem or os.path.splitext(source_name)[0]
+    encoded = encode_cached(source_path, file_sha256(source_path), widths, fmt)
+    if encoded is None:
+        return source_name, None
+
+    entries = []
+    for width, height, cache_file in encoded:
+        name = derived_name(stem, width, FORMATS[fmt][1])
+        target = os.path.join(images_dir, name)
+        # A cache file newer than the copy was encoded with other settings since.
+        if (not os.path.exists(target) or os.path.getsize(target) != os.path.getsize(cache_file)
+                or os.path.getmtime(target) < os.path.getmtime(cache_file)):
+            shutil.copyfile(cache_file, target)
+        entries.append({'width': width, 'height': height, 'file': name})
+    return source_name, entries
+
+
+def load_manifest(images_dir):
+    """Returns {source_name: [{"width", "height", "file"}, ...]} or {} if no manifest exists."""
+    path = os.path.join(images_dir, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_derivatives(images_dir, widths=WIDTHS, fmt='webp', workers=None):
+    """Builds derivatives for every original in images_dir and writes the manifest."""
+    stems = derivative_stems(source_images(images_dir))
+    manifest = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(build_derivatives_for, os.path.join(images_dir, name), widths, fmt, stem)
+                   for name, stem in stems.items()]
+        for future in futures:
+            source_name, entries = future.result()
+            if entries:
+                manifest[source_name] = entries
+
+    tmp_path = os.path.join(images_dir, MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, os.path.join(images_dir, MANIFEST_NAME))
+    return manifest
+
+
+def main():
+    args = setup_from_argv()[1:]
+    fmt = 'webp'
+    workers = None
+    if '--format' in args:
+        i = args.index('--format')
+        fmt = args[i + 1]
+        del args[i:i + 2]
+    if '--workers' in args:
+        i = args.index('--workers')
+        workers = int(args[i + 1])
+        del args[i:i + 2]
+
+    if len(args) != 1 or fmt not in FORMATS:
+        print("Usage: python image_derivatives.py <images_dir> [--format webp|jpeg] [--workers N]")
+        sys.exit(1)
+
+    images_dir = args[0]
+    before = sum(os.path.getsize(os.path.join(images_dir, n)) for n in source_images(images_dir))
+    manifest = build_derivatives(images_dir, fmt=fmt, workers=workers)
+    print(f"Derivatives for {len(manifest)} image(s) written to: {images_dir}")
+    largest = sum(os.path.getsize(os.path.join(images_dir, entries[-1]['file']))
+                  for entries in manifest.values())
+    print(f"Originals: {before / 1e6:.1f} MB, largest derivatives: {largest / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
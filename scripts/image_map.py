@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Indexed, versioned store of the image -> Drive ID mapping of a site.
+
+Gdrive.list is a text file of "name (ID)" lines: every run parsed it again line
+by line, it cannot hold checksums, sizes or modification times, and names that
+contain "(" were split at the wrong parenthesis. ImageMap keeps one SQLite file
+per site root (ROOT/.image_map.sqlite) with a row per image:
+
+    folder   the images/ directory, relative to the root ('/'-separated)
+    name     the file name inside it
+    file_id  its Drive ID (NULL when not on Drive yet)
+    md5, size, mtime
+             the local file's checksum and the size/mtime it was computed for,
+             so sync_images.py only hashes files that changed
+
+Lookups hit the (folder, name) primary key, updates run in one transaction, and
+the schema version lives in PRAGMA user_version. Gdrive.list files stay the
+interchange format: ids() re-imports a folder's Gdrive.list only when its size
+or mtime differs from the last import, so lists written by other tools or by
+hand are picked up transparently, and writers that go through the map
+(generate_gdrive_lists.write_listing, sync_images.py) import the finished file
+once, streaming its lines, so a later ids() does not parse it again.
+
+Usage:
+    python image_map.py import <ROOT>               # imports every images/Gdrive.list under ROOT
+    python image_map.py lookup <IMAGES_DIR> <NAME>
+    python image_map.py stats <ROOT>
+"""
+
+import os
+import re
+import sqlite3
+import sys
+import threading
+
+MAP_NAME = '.image_map.sqlite'
+GDRIVE_LIST_NAME = 'Gdrive.list'
+SCHEMA_VERSION = 1
+# The ID is the last parenthesised token without spaces, so names may contain "(".
+GDRIVE_LIST_LINE = re.compile(r'^(.*)\s+\(([^()\s]+)\)$')
+
+MIGRATIONS = {
+    1: """
+CREATE TABLE images (
+    folder  TEXT NOT NULL,
+    name    TEXT NOT NULL,
+    file_id TEXT,
+    md5     TEXT,
+    size    INTEGER,
+    mtime   INTEGER,
+    PRIMARY KEY (folder, name)
+) WITHOUT ROWID;
+CREATE INDEX images_by_md5 ON images (md5);
+CREATE TABLE imports (
+    folder TEXT PRIMARY KEY,
+    size   INTEGER,
+    mtime  INTEGER
+);
+""",
+}
+
+
+def iter_gdrive_list(filepath):
+    """Yields the (filename, file ID) pairs of a Gdrive.list, one line at a time."""
+    with open(filepath, "r", encoding="utf-8") as f:
+        for line in f:
+            match = GDRIVE_LIST_LINE.match(line.strip())
+            if match:
+                yield match.groups()
+
+
+def parse_gdrive_list(filepath):
+    """Reads Gdrive.list and returns a mapping of image filename to file ID."""
+    return dict(iter_gdrive_list(filepath))
+
+
+def _stat_key(path):
+    """(size, mtime in ns) of path, or None when it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class ImageMap:
+    """Image name -> Drive ID (+ local checksum) for every images/ folder under root."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.path = os.path.join(self.root, MAP_NAME)
+        self._lock = threading.Lock()
+        self._ids = {}  # folder -> {name: file_id}, dropped whenever the folder's IDs change
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self._migrate()
+
+    def close(self):
+        self.db.close()
+
+    def _migrate(self):
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise RuntimeError(f"{self.path} has schema version {version}; "
+                               f"this script only knows up to {SCHEMA_VERSION}")
+        for target in range(version + 1, SCHEMA_VERSION + 1):
+            with self.db:
+                self.db.executescript(MIGRATIONS[target])
+                self.db.execute(f"PRAGMA user_version = {target}")
+
+    def folder_key(self, images_dir):
+        """The images/ directory relative to the root, as stored in the 'folder' column."""
+        rel_path = os.path.relpath(os.path.abspath(images_dir), self.root)
+        if rel_path == os.pardir or rel_path.startswith(os.pardir + os.sep):
+            raise ValueError(f"{images_dir} is not under {self.root}")
+        return '' if rel_path == os.curdir else rel_path.replace(os.sep, '/')
+
+    # ---------- Gdrive.list import ----------
+    def _refresh(self, images_dir, folder, force=False):
+        """Re-imports images_dir/Gdrive.list if it changed since the last import. Caller holds _lock."""
+        stat = _stat_key(os.path.join(images_dir, GDRIVE_LIST_NAME))
+        row = self.db.execute("SELECT size, mtime FROM imports WHERE folder = ?", (folder,)).fetchone()
+        if stat is None or (not force and row is not None and (row['size'], row['mtime']) == stat):
+            return False
+        with self.db:
+            self._replace_ids(folder, iter_gdrive_list(os.path.join(images_dir, GDRIVE_LIST_NAME)))
+            self.db.execute("INSERT OR REPLACE INTO imports VALUES (?, ?, ?)", (folder, *stat))
+        return True
+
+    def _replace_ids(self, folder, pairs):
+        # Names that left the list lose their ID but keep their cached checksum.
+        self._ids.pop(folder, None)
+        self.db.execute("UPDATE images SET file_id = NULL WHERE folder = ?", (folder,))
+        self.db.executemany(
+            "INSERT INTO images (folder, name, file_id) VALUES (?, ?, ?) "
+            "ON CONFLICT (folder, name) DO UPDATE SET file_id = excluded.file_id",
+            ((folder, name, file_id) for name, file_id in pairs))
+
+    def import_list(self, images_dir):
+        """Imports images_dir/Gdrive.list now, e.g. right after writing it."""
+        with self._lock:
+            return self._refresh(images_dir, self.folder_key(images_dir), force=True)
+
+    def import_tree(self):
+        """Imports every changed images/Gdrive.list under the root. Returns the folders imported."""
+        imported = 0
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+            if GDRIVE_LIST_NAME in filenames:
+                with self._lock:
+                    imported += self._refresh(dirpath, self.folder_key(dirpath))
+        return imported
+
+    # ---------- lookups ----------
+    def ids(self, images_dir):
+        """Returns {name: file_id} for images_dir, importing its Gdrive.list first if it changed."""
+        folder = self.folder_key(images_dir)
+        with self._lock:
+            self._refresh(images_dir, folder)
+            ids = self._ids.get(folder)
+            if ids is None:
+                ids = self._ids[folder] = dict(self.db.execute(
+                    "SELECT name, file_id FROM images WHERE folder = ? AND file_id IS NOT NULL", (folder,)))
+        return dict(ids)
+
+    def lookup(self, images_dir, name):
+        """Returns the Drive ID of one image, or None."""
+        folder = self.folder_key(images_dir)
+        with self._lock:
+            self._refresh(images_dir, folder)
+            row = self.db.execute("SELECT file_id FROM images WHERE folder = ? AND name = ?",
+                                  (folder, name)).fetchone()
+        return row['file_id'] if row else None
+
+    def find_by_md5(self, md5):
+        """Returns [(folder, name, file_id), ...] of the images with this checksum."""
+        with self._lock:
+            rows = self.db.execute("SELECT folder, name, file_id FROM images WHERE md5 = ?", (md5,)).fetchall()
+        return [(row['folder'], row['name'], row['file_id']) for row in rows]
+
+    def cached_md5(self, path):
+        """The stored checksum of a local image if its size and mtime are unchanged, else None."""
+        stat = _stat_key(path)
+        if stat is None:
+            return None
+        with self._lock:
+            row = self.db.execute("SELECT md5, size, mtime FROM images WHERE folder = ? AND name = ?",
+                                  (self.folder_key(os.path.dirname(path)), os.path.basename(path))).fetchone()
+        if row is None or row['md5'] is None or (row['size'], row['mtime']) != stat:
+            return None
+        return row['md5']
+
+    # ---------- updates ----------
+    def set_ids(self, images_dir, mapping):
+        """
+        Atomically replaces the IDs of images_dir with {name: file_id}. If the folder's
+        Gdrive.list exists it is taken as already matching, so it is not re-imported.
+        """
+        folder = self.folder_key(images_dir)
+        stat = _stat_key(os.path.join(images_dir, GDRIVE_LIST_NAME))
+        with self._lock, self.db:
+            self._replace_ids(folder, mapping.items())
+            if stat is not None:
+                self.db.execute("INSERT OR REPLACE INTO imports VALUES (?, ?, ?)", (folder, *stat))
+
+    def record_file(self, path, md5, file_id=None):
+        """Stores the checksum of a local image for its current size/mtime (and its ID if given)."""
+        size, mtime = _stat_key(path)
+        folder = self.folder_key(os.path.dirname(path))
+        with self._lock, self.db:
+            if file_id is not None:
+                self._ids.pop(folder, None)
+            self.db.execute(
+                "INSERT INTO images (folder, name, file_id, md5, size, mtime) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (folder, name) DO UPDATE SET md5 = excluded.md5, size = excluded.size, "
+                "mtime = excluded.mtime, file_id = coalesce(excluded.file_id, file_id)",
+                (folder, os.path.basename(path), file_id, md5, size, mtime))
+
+    def stats(self):
+        with self._lock:
+            row = self.db.execute("SELECT count(DISTINCT folder) AS folders, count(file_id) AS mapped, "
+                                  "count(md5) AS hashed, count(*) AS total FROM images").fetchone()
+        return dict(row)
+
+
+_maps = {}
+_maps_lock = threading.Lock()
+
+
+def find_image_map(path):
+    """Returns the ImageMap of the nearest ancestor of path holding one (shared per root), or None."""
+    directory = os.path.abspath(path)
+    while True:
+        if os.path.isfile(os.path.join(directory, MAP_NAME)):
+            with _maps_lock:
+                image_map = _maps.get(directory)
+                if image_map is None:
+                    image_map = _maps[directory] = ImageMap(directory)
+                return image_map
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def load_image_ids(images_dir):
+    """{name: file_id} for images_dir, from the site's ImageMap when there is one, else from Gdrive.list."""
+    image_map = find_image_map(images_dir)
+    if image_map is not None:
+        return image_map.ids(images_dir)
+    gdrive_list = os.path.join(images_dir, GDRIVE_LIST_NAME)
+    return parse_gdrive_list(gdrive_list) if os.path.isfile(gdrive_list) else {}
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) == 2 and args[0] in ('import', 'stats') and os.path.isdir(args[1]):
+        image_map = ImageMap(args[1])
+        if args[0] == 'import':
+            print(f"📥 Imported {image_map.import_tree()} changed Gdrive.list file(s) into {image_map.path}")
+        stats = image_map.stats()
+        print(f"🗺️  {stats['folders']} folder(s), {stats['mapped']} image(s) mapped to Drive, "
+              f"{stats['hashed']} with a cached checksum")
+    elif len(args) == 3 and args[0] == 'lookup':
+        image_map = find_image_map(args[1])
+        file_id = image_map.lookup(args[1], args[2]) if image_map else load_image_ids(args[1]).get(args[2])
+        if file_id is None:
+            print(f"❌ {args[2]}: not mapped")
+            sys.exit(1)
+        print(file_id)
+    else:
+        print("Usage: python image_map.py import <ROOT> | lookup <IMAGES_DIR> <NAME> | stats <ROOT>")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
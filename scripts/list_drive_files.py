@@ -16,10 +16,11 @@ Requirements:
         pip install --upgrade google-api-python-client google-auth-httplib2 google-auth-oauthlib
 """
 
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 import os
 
+from auth_cache import get_credentials
+from google_services import get_service
+
 # Google Drive API configuration
 SCOPES = ['https://www.googleapis.com/auth/drive.metadata.readonly']
 # Get the directory where the current script is located
@@ -27,16 +28,10 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 CREDS_FILE = os.path.join(SCRIPT_DIR, 'credentials.json')
 
 def authenticate_drive():
-    flow = InstalledAppFlow.from_client_secrets_file(
-        CREDS_FILE,
-        SCOPES,
-        redirect_uri='http://localhost:8080'
-    )
-    creds = flow.run_local_server(port=8080)
-    return creds
+    return get_credentials(SCOPES, client_secret_file=CREDS_FILE)
 
 def list_drive_files(creds, num_files=20):
-    service = build('drive', 'v3', credentials=creds)
+    service = get_service('drive', 'v3', creds)
 
     results = service.files().list(
         pageSize=num_files,
@@ -24,8 +24,11 @@ Note:
 
 import os
 import sys
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+
+from auth_cache import get_credentials
+from google_services import get_service
+from drive_path_cache import resolve_path
+from rate_limit import get_limiter
 
 # Google Drive API configuration
 SCOPES = ['https://www.googleapis.com/auth/drive.metadata.readonly']
@@ -34,16 +37,9 @@ CREDS_FILE = os.path.join(SCRIPT_DIR, 'credentials.json')
 
 
 def authenticate_drive():
-    from google_auth_oauthlib.flow import InstalledAppFlow
-
-    flow = InstalledAppFlow.from_client_secrets_file(
-        CREDS_FILE,
-        SCOPES,
-        redirect_uri='http://localhost:8080'  # Must match what’s in your OAuth client settings
-    )
-    # run_local_server can open a browser automatically, but you can disable if WSL can't open
-    creds = flow.run_local_server(port=8080, open_browser=False)
-    return creds
+    # Cached token is reused/refreshed; the browser flow only runs on first use.
+    # open_browser=False because WSL can't always open one automatically.
+    return get_credentials(SCOPES, client_secret_file=CREDS_FILE, open_browser=False)
 
 
 def resolve_local_path_to_folder_id(service, local_path):
@@ -53,6 +49,9 @@ def resolve_local_path_to_folder_id(service, local_path):
     2. Starting from 'root', searching for a folder with each component's name.
     3. Descending one level at a time.
 
+    Known prefixes are answered from the drive_path_cache.py cache, so only the
+    components not seen before cost an API call.
+
     Returns the folder ID if found, or None if any component is not found.
     """
     abs_path = os.path.abspath(local_path)
@@ -61,31 +60,18 @@ def resolve_local_path_to_folder_id(service, local_path):
     if relative_path == '.' or not relative_path:
         return 'root'
 
-    components = [comp for comp in relative_path.split(os.sep) if comp not in ('.', '..', '')]
-    folder_id = 'root'
-
-    for comp in components:
-        query = f"'{folder_id}' in parents and name = '{comp}' and mimeType = 'application/vnd.google-apps.folder'"
-        response = service.files().list(q=query, fields='files(id, name)').execute()
-        folders = response.get('files', [])
-
-        if not folders:
-            print(f"Folder '{comp}' not found under parent ID '{folder_id}'.")
-            return None
-        folder_id = folders[0]['id']
-
-    return folder_id
+    return resolve_path(service, relative_path)
 
 def list_drive_files(creds, folder_id=None, num_files=20):
     """Lists up to num_files from the specified folder_id in Google Drive (or root if None)."""
-    service = build('drive', 'v3', credentials=creds)
+    service = get_service('drive', 'v3', creds)
     query = f"'{folder_id}' in parents" if folder_id and folder_id != 'root' else None
 
-    results = service.files().list(
+    results = get_limiter('drive').execute(service.files().list(
         q=query,
         pageSize=num_files,
         fields="nextPageToken, files(id, name)"
-    ).execute()
+    ))
 
     items = results.get('files', [])
     if not items:
@@ -97,7 +83,7 @@ def list_drive_files(creds, folder_id=None, num_files=20):
 
 if __name__ == '__main__':
     creds = authenticate_drive()
-    service = build('drive', 'v3', credentials=creds)
+    service = get_service('drive', 'v3', creds)
 
     local_path = sys.argv[1] if len(sys.argv) > 1 else None
     if local_path:
@@ -7,6 +7,9 @@ This script authenticates a user via OAuth2 and lists files from a folder in Goo
 Usage:
     python list_drive_files_v3.py <TOP_MOUNTED_DRIVE_PATH> <FULL_PATH_TO_FOLDER>
 
+All result pages are followed, so large folders are no longer truncated at 20 files.
+To write Gdrive.list for every images/ folder under a tree, see generate_gdrive_lists.py.
+
 Example:
     python list_drive_files_v3.py /home/evan/GdriveMagnes /home/evan/GdriveMagnes/Github/Private/Blog/HTML/2025/Nobel_save/images
 
@@ -23,8 +26,12 @@ Note:
 
 import os
 import sys
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+
+from auth_cache import get_credentials
+from google_services import get_service
+from rate_limit import get_limiter
+from drive_path_cache import resolve_path
+from tracing import count, setup_from_argv
 
 # Google Drive API configuration
 SCOPES = ['https://www.googleapis.com/auth/drive.metadata.readonly']
@@ -48,47 +55,55 @@ def get_relative_drive_path(top_mount_path, full_path):
 
 
 def authenticate_drive():
-    flow = InstalledAppFlow.from_client_secrets_file(
-        CREDS_FILE,
-        SCOPES,
-        redirect_uri='http://localhost:8080'
-    )
-    creds = flow.run_local_server(port=8080, open_browser=True)
-    return creds
+    return get_credentials(SCOPES, client_secret_file=CREDS_FILE, open_browser=True)
 
 
 def resolve_local_path_to_folder_id(service, relative_path):
-    components = [comp for comp in relative_path.split(os.sep) if comp not in ('.', '..', '')]
-    folder_id = 'root'
-
-    for comp in components:
-        query = f"'{folder_id}' in parents and name = '{comp}' and mimeType = 'application/vnd.google-apps.folder'"
-        response = service.files().list(q=query, fields='files(id, name)').execute()
-        folders = response.get('files', [])
-
-        if not folders:
-            print(f"Folder '{comp}' not found under parent ID '{folder_id}'.")
-            return None
-        folder_id = folders[0]['id']
-
-    return folder_id
+    """Resolves a mount-relative path to a folder ID through the cached, batched resolver."""
+    return resolve_path(service, relative_path)
 
 
-def list_drive_files(creds, folder_id=None, num_files=20):
-    service = build('drive', 'v3', credentials=creds)
-    query = f"'{folder_id}' in parents" if folder_id and folder_id != 'root' else None
+MAX_PAGE_SIZE = 1000  # largest page Drive returns for files().list
 
-    results = service.files().list(
-        q=query,
-        pageSize=num_files,
-        fields="nextPageToken, files(id, name)"
-    ).execute()
 
-    items = results.get('files', [])
+def iter_drive_files(service, folder_id=None, fields="id, name", http=None):
+    """
+    Yields every non-trashed file in folder_id (or the whole Drive for 'root'/None),
+    following nextPageToken with the maximum page size.
+    """
+    query = "trashed = false"
+    if folder_id and folder_id != 'root':
+        query = f"'{folder_id}' in parents and {query}"
+
+    page_token = None
+    while True:
+        request = service.files().list(
+            q=query,
+            pageSize=MAX_PAGE_SIZE,
+            pageToken=page_token,
+            fields=f"nextPageToken, files({fields})"
+        )
+        results = get_limiter('drive').execute(request, http=http)
+        count('drive.files_listed', len(results.get('files', [])))
+        yield from results.get('files', [])
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+
+
+def list_drive_files(creds, folder_id=None, num_files=None):
+    """Returns the files in folder_id (all pages, or the first num_files if given)."""
+    service = get_service('drive', 'v3', creds)
+    items = []
+    for item in iter_drive_files(service, folder_id):
+        items.append(item)
+        if num_files is not None and len(items) >= num_files:
+            break
     return items
 
 
 if __name__ == '__main__':
+    setup_from_argv()
     if len(sys.argv) != 3:
         print("Usage: python list_drive_files_v3.py <TOP_MOUNTED_DRIVE_PATH> <FULL_PATH_TO_FOLDER>")
         sys.exit(1)
@@ -97,7 +112,7 @@ if __name__ == '__main__':
     full_path = sys.argv[2]
 
     creds = authenticate_drive()
-    service = build('drive', 'v3', credentials=creds)
+    service = get_service('drive', 'v3', creds)
 
     try:
         relative_path = get_relative_drive_path(top_mount, full_path)
@@ -105,14 +120,17 @@ if __name__ == '__main__':
 
         folder_id = resolve_local_path_to_folder_id(service, relative_path)
         if folder_id:
-            items = list_drive_files(creds, folder_id)
-            output_file = os.path.join(full_path, 'Gdrive.list')
-            with open(output_file, 'w') as f:
-                for item in items:
-                    line = f"{item['name']} ({item['id']})\n"
-                    print(line.strip())
-                    f.write(line)
-            print(f"File list saved to: {output_file}")
+            # Same writer as generate_gdrive_lists.py: atomic rename, image map kept in step.
+            from generate_gdrive_lists import GDRIVE_LIST_NAME, write_listing
+            from image_map import find_image_map
+
+            def rows():
+                for item in iter_drive_files(service, folder_id):
+                    print(f"{item['name']} ({item['id']})")
+                    yield item['name'], item['id']
+
+            write_listing(rows(), full_path, find_image_map(full_path))
+            print(f"File list saved to: {os.path.join(full_path, GDRIVE_LIST_NAME)}")
         else:
             print("Could not resolve the provided path to a Drive folder ID.")
     except ValueError as e:
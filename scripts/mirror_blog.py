@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Local SQLite mirror of the posts already on the blog, synced incrementally.
+
+Checking a published post used to mean opening it in the browser. This module pages
+through posts().list with fetchBodies and a field mask (only the columns below
+travel over the wire) and stores every post in SCRIPT_DIR/.blog_mirror.sqlite, with
+the HTML zlib-compressed.
+
+Later syncs ask for posts ordered by 'updated', newest first, and stop paging at the
+first post not newer than the previous sync, so an unchanged blog costs one call.
+(posts().list's startDate filters on the publish date, so it cannot find edits of old
+posts; the ordering can.) Timestamps are compared as datetimes and stored in UTC,
+since RFC 3339 strings with different offsets do not sort as text. Posts deleted on
+Blogger only disappear from the mirror with --full, which re-lists everything.
+
+Usage:
+    python mirror_blog.py sync [--full] [--blog BLOG_ID]
+    python mirror_blog.py list [--blog BLOG_ID]
+    python mirror_blog.py show <POST_ID|URL>
+
+Example:
+    python mirror_blog.py sync
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+
+from rate_limit import get_limiter
+from tracing import setup_from_argv, traced
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MIRROR_FILE = os.path.join(SCRIPT_DIR, '.blog_mirror.sqlite')
+PAGE_SIZE = 100
+POST_FIELDS = 'id, title, url, published, updated, status, labels, etag, content'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id        TEXT PRIMARY KEY,
+    blog_id   TEXT NOT NULL,
+    title     TEXT,
+    url       TEXT,
+    published TEXT,
+    updated   TEXT,
+    status    TEXT,
+    labels    TEXT,
+    etag      TEXT,
+    sha256    TEXT,
+    content   BLOB
+);
+CREATE INDEX IF NOT EXISTS posts_by_url ON posts (url);
+CREATE INDEX IF NOT EXISTS posts_by_updated ON posts (blog_id, updated);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def parse_timestamp(value):
+    """An RFC 3339 timestamp as an aware datetime (naive values are taken as UTC), or None."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def utc_timestamp(value):
+    """Normalises an RFC 3339 timestamp to fixed-width UTC, so stored values sort as text."""
+    parsed = parse_timestamp(value)
+    return parsed.astimezone(timezone.utc).isoformat(timespec='microseconds') if parsed else value
+
+
+def _row(blog_id, item):
+    content = item.get('content') or ''
+    return (item['id'], blog_id, item.get('title'), item.get('url'), utc_timestamp(item.get('published')),
+            utc_timestamp(item.get('updated')), item.get('status'), json.dumps(item.get('labels') or []),
+            item.get('etag'), hashlib.sha256(content.encode('utf-8')).hexdigest(),
+            zlib.compress(content.encode('utf-8'), 9))
+
+
+class BlogMirror:
+    """On-disk copy of a blog's posts with lookups by ID and URL."""
+
+    def __init__(self, path=MIRROR_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    # ---------- metadata ----------
+    def get_meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def _set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def last_updated(self, blog_id):
+        """The newest 'updated' timestamp seen for blog_id (RFC 3339, UTC), or None."""
+        return self.get_meta(f'last_updated:{blog_id}')
+
+    # ---------- synchronisation ----------
+    def _pages(self, service, blog_id):
+        """Yields pages of posts with their bodies, most recently updated first."""
+        page_token = None
+        while True:
+            results = get_limiter('blogger').execute(service.posts().list(
+                blogId=blog_id,
+                orderBy='UPDATED',
+                sortOption='DESCENDING',
+                fetchBodies=True,
+                fetchImages=False,
+                maxResults=PAGE_SIZE,
+                pageToken=page_token,
+                fields=f"nextPageToken, items({POST_FIELDS})"
+            ))
+            yield results.get('items', [])
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+
+    @traced('mirror_sync')
+    def sync(self, service, blog_id, full=False):
+        """
+        Fetches the posts updated since the last sync (all posts when full or on first
+        use). Returns (fetched, removed).
+        """
+        since = None if full else parse_timestamp(self.last_updated(blog_id))
+        newest = since
+        fetched = removed = 0
+        seen = set()
+        with self._lock, self.db:
+            for items in self._pages(service, blog_id):
+                fresh = [item for item in items
+                         if since is None or (parse_timestamp(item.get('updated')) or since) > since]
+                self.db.executemany("INSERT OR REPLACE INTO posts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                    [_row(blog_id, item) for item in fresh])
+                fetched += len(fresh)
+                seen.update(item['id'] for item in items)
+                for item in fresh:
+                    updated = parse_timestamp(item.get('updated'))
+                    if updated is not None and (newest is None or updated > newest):
+                        newest = updated
+                if len(fresh) < len(items):
+                    break  # reached posts that were already mirrored
+            if full:
+                removed = self._remove_missing(blog_id, seen)
+            if newest is not None:
+                self._set_meta(f'last_updated:{blog_id}', newest.astimezone(timezone.utc).isoformat(timespec='microseconds'))
+            self._set_meta(f'synced_at:{blog_id}', str(time.time()))
+        return fetched, removed
+
+    def _remove_missing(self, blog_id, seen):
+        stored = {row['id'] for row in self.db.execute("SELECT id FROM posts WHERE blog_id = ?", (blog_id,))}
+        missing = stored - seen
+        self.db.executemany("DELETE FROM posts WHERE id = ?", [(post_id,) for post_id in missing])
+        return len(missing)
+
+    def upsert(self, blog_id, item):
+        """Records a post returned by posts().insert/patch without a sync."""
+        with self._lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO posts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            _row(blog_id, item))
+
+    # ---------- lookups ----------
+    def posts(self, blog_id=None):
+        """Returns the post rows (without content), most recently updated first."""
+        query = "SELECT id, blog_id, title, url, published, updated, status, labels, sha256 FROM posts"
+        if blog_id is None:
+            return self.db.execute(query + " ORDER BY updated DESC").fetchall()
+        return self.db.execute(query + " WHERE blog_id = ? ORDER BY updated DESC", (blog_id,)).fetchall()
+
+    def post(self, post_id_or_url):
+        """Returns the row for a post ID or URL, or None."""
+        return self.db.execute("SELECT * FROM posts WHERE id = ? OR url = ? LIMIT 1",
+                               (post_id_or_url, post_id_or_url)).fetchone()
+
+    def content(self, post_id_or_url):
+        """Returns the stored HTML of a post, or None."""
+        row = self.post(post_id_or_url)
+        return zlib.decompress(row['content']).decode('utf-8') if row is not None else None
+
+
+def main():
+    args = setup_from_argv()[1:]
+    blog_id = None
+    if '--blog' in args:
+        i = args.index('--blog')
+        blog_id = args[i + 1]
+        del args[i:i + 2]
+    full = '--full' in args
+    if full:
+        args.remove('--full')
+
+    if not args or args[0] not in ('sync', 'list', 'show') or (args[0] == 'show') != (len(args) == 2):
+        print("Usage: python mirror_blog.py sync [--full] [--blog BLOG_ID] | list [--blog BLOG_ID] | show <POST_ID|URL>")
+        sys.exit(1)
+
+    from create_post import BLOG_ID, authenticate
+    from google_services import get_service
+
+    blog_id = blog_id or BLOG_ID
+    mirror = BlogMirror()
+    command = args[0]
+
+    if command == 'sync':
+        service = get_service('blogger', 'v3', authenticate())
+        fetched, removed = mirror.sync(service, blog_id, full=full)
+        print(f"🔄 {fetched} post(s) fetched, {removed} removed; "
+              f"{len(mirror.posts(blog_id))} post(s) mirrored.")
+    elif command == 'list':
+        for row in mirror.posts(blog_id):
+            print(f"{row['updated']}  {row['id']}  {row['title']}  {row['url']}")
+    else:
+        html_content = mirror.content(args[1])
+        if html_content is None:
+            print(f"Post '{args[1]}' is not in the mirror.")
+            sys.exit(1)
+        print(html_content)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Image loading optimizations applied while substitute_img_src.py rewrites a post.
+
+Every <img> used to become one more lh3.google.com request, fetched eagerly and
+without dimensions, so small icons cost a round trip each and the text jumped
+around while images arrived. AssetOptimizer wraps the rewriter callbacks of
+substitute_img_src.make_rewriters() and:
+
+    - inlines local images up to INLINE_LIMIT bytes as data: URIs (in <img> src and
+      srcset, style and <style> url(...); links such as <a href> keep pointing at the
+      file), removing their requests altogether,
+    - adds width/height from the image file itself; a percentage width moves to
+      style="width: N%; height: auto" so the browser can reserve the box from the
+      aspect ratio before the image loads (no layout shift),
+    - adds loading="lazy" and decoding="async" to every image except the first one
+      fetched from the network, which gets fetchpriority="high" instead (a post body
+      has no <head> for <link rel="preload">, and the attribute has the same effect).
+
+Attributes already present in the source are kept.
+
+Usage:
+    python optimize_assets.py <post.html> [--inline-limit BYTES]   # prints what would change
+
+    from optimize_assets import AssetOptimizer
+    optimizer = AssetOptimizer(images_dir)
+    substitute_img_src_file(html_file, output, gdrive_map, derivatives, optimizer)
+    print(optimizer.summary())
+"""
+
+import base64
+import mimetypes
+import os
+import re
+import sys
+
+from PIL import Image
+
+from image_map import load_image_ids
+from substitute_img_src import local_filename, substitute_img_src
+from tracing import count
+
+INLINE_LIMIT = 4 * 1024  # bytes of the original file; base64 adds a third
+EXIF_ORIENTATION = 274  # 5-8 are rotated by 90 degrees
+PERCENT = re.compile(r'\s*([\d.]+)\s*%\s*$')
+PIXELS = re.compile(r'\s*([\d.]+)\s*(px)?\s*$')
+INLINED_ATTRIBUTES = {('img', 'src'), ('img', 'srcset')}  # plus CSS url(...) of any tag
+
+
+class AssetOptimizer:
+    """
+    Per-post state: data URIs and dimensions of images_dir's files, and what was
+    changed. Use one instance per document; the first-image rule depends on order.
+    """
+
+    def __init__(self, images_dir, inline_limit=INLINE_LIMIT, lazy=True):
+        self.images_dir = images_dir
+        self.inline_limit = inline_limit
+        self.lazy = lazy
+        self.stats = {'images': 0, 'inlined': 0, 'inlined_bytes': 0, 'sized': 0, 'lazy': 0, 'priority': 0}
+        self._data_uris = {}
+        self._dimensions = {}
+        self._inlined = set()  # files inlined at least once: one request saved each
+        self._img_file = None  # local file of the <img> whose attributes are being rewritten
+        self._seen_network_image = False
+
+    # ---------- files ----------
+    def _path(self, filename):
+        path = os.path.join(self.images_dir, filename)
+        return path if filename and os.path.isfile(path) else None
+
+    def data_uri(self, filename):
+        """A data: URI for a local image no larger than inline_limit, else None."""
+        if filename not in self._data_uris:
+            path = self._path(filename)
+            mime_type = mimetypes.guess_type(filename)[0] if path else None
+            uri = None
+            if mime_type and mime_type.startswith('image/') and os.path.getsize(path) <= self.inline_limit:
+                with open(path, 'rb') as f:
+                    uri = f"data:{mime_type};base64,{base64.b64encode(f.read()).decode('ascii')}"
+            self._data_uris[filename] = uri
+        return self._data_uris[filename]
+
+    def dimensions(self, filename):
+        """(width, height) of a local image as displayed (EXIF rotation applied), or None."""
+        if filename not in self._dimensions:
+            path = self._path(filename)
+            size = None
+            if path:
+                try:
+                    with Image.open(path) as image:  # reads the header only
+                        size = image.size
+                        if image.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8):
+                            size = size[::-1]
+                except (OSError, SyntaxError):
+                    size = None
+            self._dimensions[filename] = size
+        return self._dimensions[filename]
+
+    def inline_candidates(self):
+        """Names of the images in images_dir small enough to be inlined (build.py inputs)."""
+        if not os.path.isdir(self.images_dir):
+            return []
+        return sorted(name for name in os.listdir(self.images_dir) if self.data_uri(name) is not None)
+
+    # ---------- rewriter callbacks ----------
+    def wrap(self, rewrite_url, rewrite_tag):
+        """Returns (rewrite_url, rewrite_tag) applying the optimizations around the given callbacks."""
+        def optimized_url(url, tag, attr):
+            filename = local_filename(url)
+            if tag == 'img' and attr == 'src':
+                self._img_file = filename
+            inlinable = (tag, attr) in INLINED_ATTRIBUTES or attr == 'style'
+            uri = self.data_uri(filename) if filename and inlinable else None
+            if uri is not None:
+                if filename not in self._inlined:
+                    self._inlined.add(filename)
+                    self.stats['inlined'] += 1
+                    self.stats['inlined_bytes'] += os.path.getsize(self._path(filename))
+                count('assets.inlined')
+                return uri
+            return rewrite_url(url, tag, attr) if rewrite_url else None
+
+        def optimized_tag(tag, attrs):
+            new_attrs = (rewrite_tag(tag, attrs) if rewrite_tag else None) or attrs
+            if tag != 'img':
+                return new_attrs
+            filename, self._img_file = self._img_file, None
+            return self.optimize_img(new_attrs, filename)
+
+        return optimized_url, optimized_tag
+
+    def optimize_img(self, attrs, filename=None):
+        """Returns the attributes of one <img> with dimensions and loading hints added."""
+        self.stats['images'] += 1
+        values = dict(attrs)
+        added = []
+
+        dimensions = self.dimensions(filename) if filename else None
+        if dimensions and 'height' not in values:
+            sized = self._size_attributes(values, dimensions)
+            if sized is not None:
+                style, width, height = sized
+                attrs = [(name, value) for name, value in attrs if name not in ('width', 'style')]
+                added += [('width', str(width)), ('height', str(height))] + ([('style', style)] if style else [])
+                self.stats['sized'] += 1
+
+        inline = (values.get('src') or '').startswith('data:')
+        if self.lazy and not inline:
+            if not self._seen_network_image:
+                self._seen_network_image = True
+                if 'fetchpriority' not in values and 'loading' not in values:
+                    added.append(('fetchpriority', 'high'))
+                    self.stats['priority'] += 1
+            elif 'loading' not in values:
+                added.append(('loading', 'lazy'))
+                if 'decoding' not in values:
+                    added.append(('decoding', 'async'))
+                self.stats['lazy'] += 1
+        return attrs + added if added else attrs
+
+    @staticmethod
+    def _size_attributes(values, dimensions):
+        """
+        (style, width, height) for an <img> without height, or None when its width is not
+        understood. 'height: auto' keeps the aspect ratio when the theme caps the width
+        (max-width: 100%) instead of stretching the image to the height attribute.
+        """
+        natural_width, natural_height = dimensions
+        style = (values.get('style') or '').strip().rstrip(';')
+        css = [] if 'height' in style.lower() else ['height: auto']
+        width = values.get('width')
+        percent = PERCENT.match(width) if width is not None else None
+        pixels = PIXELS.match(width) if width is not None else None
+        if width is None:
+            width, height = natural_width, natural_height
+        elif percent:
+            # width/height only carry the aspect ratio; CSS keeps the percentage layout.
+            css.insert(0, f"width: {percent.group(1)}%")
+            width, height = natural_width, natural_height
+        elif pixels:
+            width = round(float(pixels.group(1)))
+            height = round(width * natural_height / natural_width)
+        else:
+            return None
+        return '; '.join(([style] if style else []) + css), width, height
+
+    def summary(self):
+        s = self.stats
+        return (f"⚡ {s['images']} image(s): {s['inlined']} inlined ({s['inlined_bytes'] / 1024:.1f} KB, "
+                f"{s['inlined']} request(s) saved), {s['sized']} sized, {s['lazy']} lazy, "
+                f"{s['priority']} high priority")
+
+
+def main():
+    args = sys.argv[1:]
+    inline_limit = INLINE_LIMIT
+    if '--inline-limit' in args:
+        i = args.index('--inline-limit')
+        inline_limit = int(args[i + 1])
+        del args[i:i + 2]
+    if len(args) != 1 or not os.path.isfile(args[0]):
+        print("Usage: python optimize_assets.py <post.html> [--inline-limit BYTES]")
+        sys.exit(1)
+
+    images_dir = os.path.join(os.path.dirname(args[0]), 'images')
+    optimizer = AssetOptimizer(images_dir, inline_limit)
+    with open(args[0], 'r', encoding='utf-8') as f:
+        substitute_img_src(f.read(), load_image_ids(images_dir), optimizer=optimizer)
+    print(optimizer.summary())
+
+
+if __name__ == '__main__':
+    main()
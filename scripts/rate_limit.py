@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Adaptive rate limiting, retries and quota accounting for Blogger and Drive calls.
+
+Bulk runs (create_post.py --batch, generate_gdrive_lists.py, sync_images.py) used
+to either fail on the first 403 rateLimitExceeded / 429 / 5xx or, with a fixed
+interval, stay far below what the API accepts. RateLimiter combines:
+
+    - a token bucket shared by every thread (and the async client), so requests
+      start at most 'rate' per second with short bursts of up to 'burst',
+    - AIMD adaptation: each success raises the rate a little (up to max_rate),
+      each throttling response halves it (down to min_rate),
+    - retries of throttled and 5xx responses, waiting for Retry-After when the
+      server sends it and for a jittered exponential backoff otherwise,
+    - a QuotaLedger counting calls, quota units, retries and throttling per API
+      method (e.g. blogger.posts.insert), printed at the end of a run.
+
+Neither API publishes per-method unit costs, so every call is counted as one
+unit unless QUOTA_COSTS says otherwise.
+
+Usage:
+    from rate_limit import get_limiter
+    post = get_limiter('blogger').execute(service.posts().insert(...), http=http)
+
+    python rate_limit.py    # prints the default limits
+"""
+
+import email.utils
+import json
+import random
+import threading
+import time
+
+from googleapiclient.errors import HttpError
+
+from tracing import count, span
+
+RETRYABLE_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded', 'backendError', 'internalError'}
+THROTTLE_STATUSES = {429}
+DEFAULT_LIMITS = {
+    # api: (initial requests/second, burst, max requests/second)
+    'blogger': (1.0, 1, 5.0),
+    'drive': (10.0, 10, 50.0),
+}
+QUOTA_COSTS = {}  # 'api.resource.method' -> units; anything missing costs 1
+MAX_RETRIES = 8
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 64.0
+
+
+def error_reason(error):
+    """Returns the first 'reason' of a googleapiclient HttpError (or a JSON error body), else ''."""
+    content = getattr(error, 'content', error)
+    try:
+        details = json.loads(content.decode('utf-8') if isinstance(content, bytes) else content)
+        return details['error']['errors'][0].get('reason', '')
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+        return ''
+
+
+def is_retryable(status, reason=''):
+    """429, any 5xx, and 403s caused by rate limits are worth retrying."""
+    if status in THROTTLE_STATUSES or status >= 500:
+        return True
+    return status == 403 and reason in RETRYABLE_REASONS
+
+
+def is_throttled(status, reason=''):
+    """True when the server asked us to slow down (as opposed to a transient failure)."""
+    return status in THROTTLE_STATUSES or (status == 403 and reason in RETRYABLE_REASONS)
+
+
+def retry_after(headers):
+    """Returns the Retry-After delay in seconds (delta or HTTP date), or None."""
+    if not headers:
+        return None
+    value = headers.get('retry-after') or headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """'Full jitter' exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class QuotaLedger:
+    """Per-method counters of calls, quota units, retries and throttled responses."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.methods = {}
+
+    def _entry(self, method):
+        return self.methods.setdefault(method, {'calls': 0, 'units': 0, 'retries': 0, 'throttled': 0})
+
+    def record(self, method, units=None, retried=False, throttled=False):
+        with self._lock:
+            entry = self._entry(method)
+            entry['calls'] += 1
+            entry['units'] += QUOTA_COSTS.get(method, 1) if units is None else units
+            entry['retries'] += int(retried)
+            entry['throttled'] += int(throttled)
+
+    def total_units(self):
+        with self._lock:
+            return sum(entry['units'] for entry in self.methods.values())
+
+    def report(self):
+        """Returns the ledger as printable lines (empty string when nothing was called)."""
+        with self._lock:
+            if not self.methods:
+                return ''
+            lines = ["📊 API quota used this run:"]
+            for method, entry in sorted(self.methods.items()):
+                lines.append(f"   {method}: {entry['calls']} call(s), {entry['units']} unit(s), "
+                             f"{entry['retries']} retried, {entry['throttled']} throttled")
+            return '\n'.join(lines)
+
+
+LEDGER = QuotaLedger()
+
+
+class RateLimiter:
+    """Thread-safe adaptive token bucket with retrying execute helpers."""
+
+    def __init__(self, rate, burst=1, max_rate=None, min_rate=0.05, max_retries=MAX_RETRIES, ledger=LEDGER,
+                 backoff_base=BACKOFF_BASE):
+        self.rate = float(rate)
+        self.burst = max(1, burst)
+        self.max_rate = float(max_rate or rate)
+        self.min_rate = min(min_rate, self.rate)
+        self.max_retries = max_retries
+        self.ledger = ledger
+        self.backoff_base = backoff_base
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    # ---------- token bucket ----------
+    def _reserve(self, units=1):
+        """Takes 'units' tokens and returns how long the caller must sleep first."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= units  # may go negative: later callers queue behind this one
+            delay = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+            return max(delay, self._paused_until - now)
+
+    def acquire(self, units=1):
+        delay = self._reserve(units)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, units=1):
+        import asyncio
+
+        delay = self._reserve(units)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    # ---------- adaptation ----------
+    def on_success(self):
+        with self._lock:
+            # Additive increase: about +1 request/s after 'rate' successes.
+            self.rate = min(self.max_rate, self.rate + 1.0 / max(self.rate, 1.0))
+
+    def on_throttled(self, wait=None):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            if wait:
+                # Retry-After applies to everyone, not only to the caller that saw it.
+                self._paused_until = max(self._paused_until, time.monotonic() + wait)
+
+    def retry_delay(self, attempt, status, reason='', headers=None):
+        """
+        Decides what to do with a failed response: returns the seconds to wait before
+        retrying, or None when the error is not retryable or retries are exhausted.
+        """
+        if attempt >= self.max_retries or not is_retryable(status, reason):
+            return None
+        wait = retry_after(headers)
+        if is_throttled(status, reason):
+            self.on_throttled(wait)
+        return wait if wait is not None else backoff_delay(attempt, self.backoff_base)
+
+    # ---------- helpers ----------
+    def call(self, function, method='call', units=None):
+        """
+        Runs function() under the limiter, retrying retryable HttpErrors.
+        'method' names the ledger line, e.g. 'drive.files.list'.
+        """
+        cost = QUOTA_COSTS.get(method, 1) if units is None else units
+        attempt = 0
+        while True:
+            with span('rate_wait'):
+                self.acquire(cost)
+            count('api.calls')
+            try:
+                with span('api', method=method, attempt=attempt):
+                    result = function()
+            except HttpError as e:
+                status = e.resp.status
+                reason = error_reason(e)
+                delay = self.retry_delay(attempt, status, reason, e.resp)
+                self.ledger.record(method, cost, retried=delay is not None,
+                                   throttled=is_throttled(status, reason))
+                if delay is None:
+                    raise
+                count('api.retries')
+                with span('backoff', seconds=round(delay, 3)):
+                    time.sleep(delay)
+                attempt += 1
+                continue
+            self.ledger.record(method, cost)
+            self.on_success()
+            return result
+
+    def execute(self, request, http=None):
+        """Executes a googleapiclient HttpRequest under the limiter."""
+        method = getattr(request, 'methodId', None) or 'request'
+        return self.call(lambda: request.execute(http=http), method)
+
+    def execute_batch(self, service, requests, callback, http=None):
+        """
+        Executes {request_id: HttpRequest} (at most 100) as batch requests, resending
+        only the parts that failed with a retryable error. callback(request_id,
+        response, exception) is called once per request with its final outcome.
+        """
+        pending = dict(requests)
+        attempt = 0
+        while pending:
+            retry = {}
+            delays = []
+
+            def on_result(request_id, response, exception):
+                method = getattr(pending[request_id], 'methodId', None) or 'request'
+                if isinstance(exception, HttpError):
+                    status, reason = exception.resp.status, error_reason(exception)
+                    delay = self.retry_delay(attempt, status, reason, exception.resp)
+                    self.ledger.record(method, retried=delay is not None, throttled=is_throttled(status, reason))
+                    if delay is not None:
+                        retry[request_id] = pending[request_id]
+                        delays.append(delay)
+                        return
+                else:
+                    self.ledger.record(method)
+                callback(request_id, response, exception)
+
+            with span('rate_wait'):
+                self.acquire(len(pending))
+            batch = service.new_batch_http_request(callback=on_result)
+            for request_id, request in pending.items():
+                batch.add(request, request_id=request_id)
+            count('api.calls', len(pending))
+            count('api.batches')
+            try:
+                with span('api_batch', size=len(pending), attempt=attempt):
+                    batch.execute(http=http)
+            except HttpError as e:
+                # The whole batch was rejected (e.g. 429 on the batch endpoint itself).
+                delay = self.retry_delay(attempt, e.resp.status, error_reason(e), e.resp)
+                if delay is None:
+                    raise
+                retry, delays = pending, [delay]
+            else:
+                if not retry:
+                    self.on_success()
+            pending = retry
+            if pending:
+                count('api.retries', len(pending))
+                with span('backoff', seconds=round(max(delays), 3)):
+                    time.sleep(max(delays))
+                attempt += 1
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(api):
+    """Returns the process-wide limiter for 'blogger' or 'drive' (created on first use)."""
+    with _limiters_lock:
+        limiter = _limiters.get(api)
+        if limiter is None:
+            rate, burst, max_rate = DEFAULT_LIMITS.get(api, (1.0, 1, 5.0))
+            limiter = _limiters[api] = RateLimiter(rate, burst, max_rate)
+        return limiter
+
+
+def set_limits(api, rate, burst=1, max_rate=None, backoff_base=BACKOFF_BASE):
+    """Replaces the process-wide limiter of api, e.g. to lift the limits against a local server."""
+    with _limiters_lock:
+        limiter = _limiters[api] = RateLimiter(rate, burst, max_rate, backoff_base=backoff_base)
+        return limiter
+
+
+def main():
+    for api, (rate, burst, max_rate) in sorted(DEFAULT_LIMITS.items()):
+        print(f"{api}: starts at {rate:g} req/s (burst {burst}), adapts up to {max_rate:g} req/s")
+    print(f"Retries: up to {MAX_RETRIES}, backoff {BACKOFF_BASE:g}s doubling to {BACKOFF_CAP:g}s with jitter")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Full-text search and near-duplicate detection over local posts and the blog mirror.
+
+Folders such as HTML/2025/Sequencing_Lab_2003 hold many versions of one text (Seq,
+Seq_v2, Seq_v3_css, SEQUENCING_v02, ...), and finding the file with a given passage
+meant grepping raw HTML. This module keeps SCRIPT_DIR/.search_index.sqlite with:
+
+    - the visible text of every HTML file (scripts, styles and markup removed) and,
+      with --mirror, of every post in the blog mirror (mirror_blog.py), in an FTS5
+      table ranked with bm25,
+    - a 64-value MinHash signature of the 5-word shingles of each text.
+
+Indexing is incremental: a file whose size and mtime are unchanged is not read, a
+file whose content hash is unchanged is not re-indexed, mirrored posts are compared
+by the hash the mirror stores, and files that disappeared are dropped.
+
+'dups' groups the signatures into LSH bands to find candidate pairs without
+comparing every pair, then reports pairs whose estimated Jaccard similarity is at
+least the threshold, merged into groups. Members already published (per the publish
+journal of create_post.py) are marked, so redundant drafts can be dropped first.
+
+Usage:
+    python search_posts.py index [ROOT ...] [--mirror]
+    python search_posts.py query "<FTS5 query>" [--limit N]
+    python search_posts.py dups [--threshold 0.8]
+
+Example:
+    python search_posts.py index ../HTML --mirror
+    python search_posts.py query '"dideoxy nucleotides" NEAR sanger'
+"""
+
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import sys
+from array import array
+from collections import defaultdict
+from html.parser import HTMLParser
+
+from tracing import setup_from_argv
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_FILE = os.path.join(SCRIPT_DIR, '.search_index.sqlite')
+DEFAULT_ROOT = os.path.join(SCRIPT_DIR, '..', 'HTML')
+SHINGLE_WORDS = 5
+NUM_HASHES = 64
+BANDS = 16  # 16 bands x 4 rows: pairs above ~0.6 similarity almost always collide
+DEFAULT_THRESHOLD = 0.8
+MERSENNE_61 = (1 << 61) - 1
+SKIPPED_TAGS = {'script', 'style', 'head', 'xml', 'noscript'}
+BLOCK_TAGS = {'p', 'div', 'br', 'li', 'tr', 'td', 'th', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+              'table', 'ul', 'ol', 'pre', 'blockquote', 'section', 'article'}
+WORD = re.compile(r'\w+')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id       INTEGER PRIMARY KEY,
+    source   TEXT UNIQUE NOT NULL,
+    title    TEXT,
+    mtime_ns INTEGER,
+    size     INTEGER,
+    sha256   TEXT,
+    minhash  BLOB
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(title, body, tokenize='unicode61 remove_diacritics 2');
+"""
+
+# Fixed seeds so stored signatures stay comparable between runs.
+_rng = random.Random(20250101)
+_PERMUTATIONS = [(_rng.randrange(1, MERSENNE_61), _rng.randrange(0, MERSENNE_61)) for _ in range(NUM_HASHES)]
+
+
+class _TextExtractor(HTMLParser):
+    """Collects the <title> and the visible text of a document."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = []
+        self.text = []
+        self._skip = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'title':
+            self._in_title = True
+        elif tag in SKIPPED_TAGS:
+            self._skip += 1
+        elif tag in BLOCK_TAGS:
+            self.text.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self._in_title = False
+        elif tag in SKIPPED_TAGS and self._skip:
+            self._skip -= 1
+        elif tag in BLOCK_TAGS:
+            self.text.append('\n')
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title.append(data)
+        elif not self._skip:
+            self.text.append(data)
+
+
+def extract_text(html_content):
+    """Returns (title, text) with whitespace collapsed; paragraphs stay on separate lines."""
+    parser = _TextExtractor()
+    parser.feed(html_content)
+    parser.close()
+    title = ' '.join(''.join(parser.title).split())
+    lines = (' '.join(line.split()) for line in ''.join(parser.text).split('\n'))
+    return title, '\n'.join(line for line in lines if line)
+
+
+def shingles(text, size=SHINGLE_WORDS):
+    """Returns the set of lower-cased 'size'-word shingles of text."""
+    words = WORD.findall(text.lower())
+    if len(words) < size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(text):
+    """
+    Returns the MinHash signature (NUM_HASHES unsigned 64-bit values) of text's shingles,
+    or an empty array for a text without words, which has nothing to compare.
+    """
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'little')
+              for s in shingles(text)]
+    if not hashes:
+        return array('Q')
+    return array('Q', [min((a * h + b) % MERSENNE_61 for h in hashes) for a, b in _PERMUTATIONS])
+
+
+def similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(x == y for x, y in zip(signature_a, signature_b)) / NUM_HASHES
+
+
+def html_files(root):
+    """Yields every .html/.htm file below root, skipping generated _Gdrive/_clean copies."""
+    from build import GENERATED_SUFFIXES
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for name in sorted(filenames):
+            if name.lower().endswith(('.html', '.htm')) and not name.endswith(GENERATED_SUFFIXES):
+                yield os.path.join(dirpath, name)
+
+
+class SearchIndex:
+    """FTS5 text index plus MinHash signatures, one row per file or mirrored post."""
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def _store(self, source, title, text, mtime_ns=None, size=None, sha256=None):
+        row = self.db.execute("SELECT id FROM documents WHERE source = ?", (source,)).fetchone()
+        signature = minhash(text).tobytes()
+        if row is None:
+            doc_id = self.db.execute(
+                "INSERT INTO documents (source, title, mtime_ns, size, sha256, minhash) VALUES (?, ?, ?, ?, ?, ?)",
+                (source, title, mtime_ns, size, sha256, signature)).lastrowid
+        else:
+            doc_id = row['id']
+            self.db.execute("UPDATE documents SET title = ?, mtime_ns = ?, size = ?, sha256 = ?, minhash = ? "
+                            "WHERE id = ?", (title, mtime_ns, size, sha256, signature, doc_id))
+            self.db.execute("DELETE FROM documents_fts WHERE rowid = ?", (doc_id,))
+        self.db.execute("INSERT INTO documents_fts (rowid, title, body) VALUES (?, ?, ?)", (doc_id, title, text))
+
+    def _remove(self, doc_id):
+        self.db.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+        self.db.execute("DELETE FROM documents_fts WHERE rowid = ?", (doc_id,))
+
+    def update_files(self, roots):
+        """Indexes new and changed HTML files below roots. Returns (indexed, removed)."""
+        from create_post import read_html_file
+
+        known = {row['source']: row for row in self.db.execute(
+            "SELECT id, source, mtime_ns, size, sha256 FROM documents WHERE source LIKE 'file:%'")}
+        roots = [os.path.abspath(root) for root in roots]
+        indexed = removed = 0
+        seen = set()
+        with self.db:
+            for root in roots:
+                for path in html_files(root):
+                    source = 'file:' + os.path.abspath(path)
+                    seen.add(source)
+                    st = os.stat(path)
+                    row = known.get(source)
+                    if row is not None and (row['mtime_ns'], row['size']) == (st.st_mtime_ns, st.st_size):
+                        continue
+                    with open(path, 'rb') as f:
+                        digest = hashlib.sha256(f.read()).hexdigest()
+                    if row is not None and row['sha256'] == digest:
+                        self.db.execute("UPDATE documents SET mtime_ns = ?, size = ? WHERE id = ?",
+                                        (st.st_mtime_ns, st.st_size, row['id']))
+                        continue
+                    title, text = extract_text(read_html_file(path))
+                    self._store(source, title or os.path.basename(path), text, st.st_mtime_ns, st.st_size, digest)
+                    indexed += 1
+            for source, row in known.items():
+                path = source[len('file:'):]
+                under_root = any(path == root or path.startswith(root + os.sep) for root in roots)
+                if under_root and source not in seen:
+                    self._remove(row['id'])
+                    removed += 1
+        return indexed, removed
+
+    def update_mirror(self, mirror):
+        """Indexes new and changed posts of a BlogMirror. Returns (indexed, removed)."""
+        known = {row['source']: row for row in self.db.execute(
+            "SELECT id, source, sha256 FROM documents WHERE source LIKE 'post:%'")}
+        indexed = removed = 0
+        seen = set()
+        with self.db:
+            for post in mirror.posts():
+                source = f"post:{post['id']}"
+                seen.add(source)
+                row = known.get(source)
+                if row is not None and row['sha256'] == post['sha256']:
+                    continue
+                _, text = extract_text(mirror.content(post['id']))
+                self._store(source, post['title'] or '', text, sha256=post['sha256'])
+                indexed += 1
+            for source, row in known.items():
+                if source not in seen:
+                    self._remove(row['id'])
+                    removed += 1
+        return indexed, removed
+
+    def query(self, match, limit=20):
+        """Runs an FTS5 MATCH query; returns rows (source, title, snippet) best first."""
+        return self.db.execute(
+            "SELECT d.source, d.title, snippet(documents_fts, 1, '[', ']', ' ... ', 12) AS snippet "
+            "FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid "
+            "WHERE documents_fts MATCH ? ORDER BY bm25(documents_fts) LIMIT ?", (match, limit)).fetchall()
+
+    def near_duplicates(self, threshold=DEFAULT_THRESHOLD):
+        """Returns [(similarity, source_a, source_b), ...] above threshold, most similar first."""
+        signatures = {}
+        for row in self.db.execute("SELECT source, minhash FROM documents"):
+            signature = array('Q')
+            signature.frombytes(row['minhash'])
+            # Documents without words would all match each other. Older indexes stored
+            # them as MERSENNE_61 everywhere, a value real signatures never contain.
+            if len(signature) == NUM_HASHES and signature[0] != MERSENNE_61:
+                signatures[row['source']] = signature
+
+        rows_per_band = NUM_HASHES // BANDS
+        candidates = set()
+        for band in range(BANDS):
+            buckets = defaultdict(list)
+            for source, signature in signatures.items():
+                buckets[tuple(signature[band * rows_per_band:(band + 1) * rows_per_band])].append(source)
+            for sources in buckets.values():
+                for i, a in enumerate(sources):
+                    for b in sources[i + 1:]:
+                        candidates.add((min(a, b), max(a, b)))
+
+        pairs = []
+        for a, b in candidates:
+            score = similarity(signatures[a], signatures[b])
+            if score >= threshold:
+                pairs.append((score, a, b))
+        return sorted(pairs, reverse=True)
+
+
+def duplicate_groups(pairs):
+    """Merges near-duplicate pairs into groups: [(best_similarity, [source, ...]), ...]."""
+    parent = {}
+
+    def find(source):
+        parent.setdefault(source, source)
+        while parent[source] != source:
+            parent[source] = parent[parent[source]]
+            source = parent[source]
+        return source
+
+    best = {}
+    for score, a, b in pairs:
+        parent[find(a)] = find(b)
+    for score, a, b in pairs:
+        root = find(a)
+        best[root] = max(best.get(root, 0.0), score)
+    groups = defaultdict(list)
+    for source in parent:
+        groups[find(source)].append(source)
+    return sorted(((best[root], sorted(members)) for root, members in groups.items()), reverse=True)
+
+
+def _display(source, root=None):
+    kind, _, value = source.partition(':')
+    if kind == 'file':
+        return os.path.relpath(value, root or os.getcwd())
+    return f"blog post {value}"
+
+
+def main():
+    args = setup_from_argv()[1:]
+    options = {}
+    for flag in ('--limit', '--threshold'):
+        if flag in args:
+            i = args.index(flag)
+            options[flag] = args[i + 1]
+            del args[i:i + 2]
+    use_mirror = '--mirror' in args
+    if use_mirror:
+        args.remove('--mirror')
+
+    if not args or args[0] not in ('index', 'query', 'dups') or (args[0] == 'query' and len(args) != 2):
+        print("Usage: python search_posts.py index [ROOT ...] [--mirror] | "
+              "query \"<FTS5 query>\" [--limit N] | dups [--threshold 0.8]")
+        sys.exit(1)
+
+    index = SearchIndex()
+    command = args[0]
+
+    if command == 'index':
+        roots = args[1:] or [DEFAULT_ROOT]
+        indexed, removed = index.update_files(roots)
+        print(f"📚 Files: {indexed} (re)indexed, {removed} removed.")
+        if use_mirror:
+            from mirror_blog import BlogMirror
+
+            indexed, removed = index.update_mirror(BlogMirror())
+            print(f"📚 Blog posts: {indexed} (re)indexed, {removed} removed.")
+    elif command == 'query':
+        try:
+            rows = index.query(args[1], limit=int(options.get('--limit', 20)))
+        except sqlite3.OperationalError as e:
+            print(f"Invalid query: {e}")
+            sys.exit(1)
+        for row in rows:
+            print(f"🔎 {_display(row['source'])}  ({row['title']})\n   {row['snippet']}")
+        if not rows:
+            print("No matches.")
+    else:
+        from create_post import Journal
+
+        journal = Journal()
+        threshold = float(options.get('--threshold', DEFAULT_THRESHOLD))
+        groups = duplicate_groups(index.near_duplicates(threshold))
+        for score, members in groups:
+            print(f"♊ {len(members)} near-duplicates (up to {score:.2f} similar):")
+            for source in members:
+                published = source.startswith('file:') and journal.get(source[len('file:'):]) is not None
+                print(f"   {_display(source)}{' (published)' if published else ''}")
+        print(f"{len(groups)} group(s) at similarity >= {threshold:g}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,70 +3,182 @@ substitute_img_src.py
 ----------------------
 
 This script takes an HTML file with <img src="images/..."> tags and replaces the src attributes with corresponding Google Drive links.
-It uses a `Gdrive.list` file located in the `images/` directory, which maps local image filenames to their Google Drive file IDs.
+The file is streamed through html_rewriter.py, so srcset, href, inline styles and <style> url(...)
+references to the same images are rewritten too, whatever their quoting.
+It uses a `Gdrive.list` file located in the `images/` directory, which maps local image filenames to their Google Drive file IDs
+(through the site's image_map.py store when one exists).
 
 Example of Gdrive.list:
     image1.jpg (1AbcDeFgHiJkLmNoPqRsTuVwXyZ123456)
     image2.png (2BcDeFgHiJkLmNoPqRsTuVwXyZ654321)
 
 Example usage:
-    python substitute_img_src.py Nobel.html
+    python substitute_img_src.py Nobel.html [--optimize]
 
 This will create a new file called Nobel_Gdrive.html with updated image source links.
+With --optimize, small images are inlined and the others get dimensions and
+lazy-loading hints (see optimize_assets.py).
+
+Responsive images:
+    If images/derivatives.json exists (see image_derivatives.py) and Gdrive.list maps the
+    derivative files, each <img> also gets srcset/sizes attributes pointing at the
+    resized copies, so browsers download a file matching the layout width instead of
+    the original.
 """
 
 import sys
 import os
 import re
 
-def parse_gdrive_list(filepath):
-    """Reads Gdrive.list and returns a mapping of image filename to file ID."""
-    mapping = {}
-    with open(filepath, "r", encoding="utf-8") as f:
-        for line in f:
-            match = re.match(r'(.+?)\s+\(([^)]+)\)', line.strip())
-            if match:
-                filename, file_id = match.groups()
-                mapping[filename] = file_id
-    return mapping
-
-def substitute_img_src(html_content, gdrive_map):
-    """Substitute the src attribute in img tags using the Blogger-compatible Google Drive image link."""
+from html_rewriter import rewrite_html, rewrite_stream
+from image_derivatives import is_derivative, load_manifest
+from image_map import load_image_ids
+from tracing import setup_from_argv, span
+
+DRIVE_IMAGE_URL = 'https://lh3.google.com/u/0/d/{file_id}'
+DEFAULT_SIZE = '=s400'
+# Width of the Blogger post column; used to turn percentage widths into 'sizes'.
+COLUMN_WIDTH = 700
+
+def sizes_for(width):
+    """Builds a 'sizes' value from an <img> width attribute (percent or pixels)."""
+    match = re.match(r'\s*([\d.]+)\s*(%|px)?', width or '')
+    if match and match.group(2) == '%':
+        fraction = float(match.group(1)) / 100
+        return f"(max-width: {COLUMN_WIDTH}px) {fraction * 100:g}vw, {round(COLUMN_WIDTH * fraction)}px"
+    if match:
+        pixels = min(round(float(match.group(1))), COLUMN_WIDTH)
+        return f"(max-width: {pixels}px) 100vw, {pixels}px"
+    return f"(max-width: {COLUMN_WIDTH}px) 100vw, {COLUMN_WIDTH}px"
+
+
+def responsive_attributes(filename, gdrive_map, derivatives):
+    """
+    Returns (src, srcset) for a file with uploaded derivatives, or None.
+    src is the derivative closest to the column width, used by browsers without srcset.
+    """
+    entries = [e for e in (derivatives or {}).get(filename, []) if e['file'] in gdrive_map]
+    if not entries:
+        return None
+    srcset = ", ".join(f"{DRIVE_IMAGE_URL.format(file_id=gdrive_map[e['file']])} {e['width']}w"
+                       for e in entries)
+    fallback = min(entries, key=lambda e: abs(e['width'] - COLUMN_WIDTH))
+    return DRIVE_IMAGE_URL.format(file_id=gdrive_map[fallback['file']]), srcset
+
+
+def local_filename(url):
+    """Returns the file name of a relative URL, or None for absolute/data URLs."""
+    if re.match(r'[a-zA-Z][a-zA-Z0-9+.-]*:|//', url):
+        return None
+    return os.path.basename(url.split('#', 1)[0].split('?', 1)[0])
+
+
+def make_rewriters(gdrive_map, derivatives=None):
+    """
+    Returns (rewrite_url, rewrite_tag) callbacks for html_rewriter.HtmlRewriter.
+    Every URL-bearing attribute goes through the same gdrive_map lookup; <img> tags
+    with uploaded derivatives additionally get srcset/sizes.
+    """
+    drive_urls = {}
+    for name, file_id in sorted(gdrive_map.items()) if derivatives else ():
+        if is_derivative(name):
+            continue
+        url = DRIVE_IMAGE_URL.format(file_id=file_id) + DEFAULT_SIZE
+        other = drive_urls.setdefault(url, name)
+        if other == name:
+            continue
+        # Identical uploads share one ID; keep the name that has derivatives.
+        if other not in derivatives and name in derivatives:
+            drive_urls[url] = name
+        print(f"⚠️ {other} and {name} share Drive ID {file_id}; srcset follows {drive_urls[url]}.")
+
+    def rewrite_url(url, tag, attr):
+        filename = local_filename(url)
+        if filename in gdrive_map:
+            return DRIVE_IMAGE_URL.format(file_id=gdrive_map[filename]) + DEFAULT_SIZE
+        return None
+
+    def rewrite_tag(tag, attrs):
+        if tag != 'img' or not derivatives:
+            return None
+        values = dict(attrs)
+        # The URL pass has already replaced src; map it back to the local file name.
+        filename = drive_urls.get(values.get('src'))
+        responsive = responsive_attributes(filename, gdrive_map, derivatives) if filename else None
+        if responsive is None or 'srcset' in values:
+            return None
+        new_src, srcset = responsive
+        new_attrs = [(name, new_src if name == 'src' else value) for name, value in attrs]
+        return new_attrs + [('srcset', srcset), ('sizes', sizes_for(values.get('width')))]
+
+    return rewrite_url, rewrite_tag
+
+
+def _rewriters(gdrive_map, derivatives, optimizer):
+    rewriters = make_rewriters(gdrive_map, derivatives)
+    return optimizer.wrap(*rewriters) if optimizer is not None else rewriters
+
+
+def substitute_img_src(html_content, gdrive_map, derivatives=None, optimizer=None):
+    """
+    Substitute image URLs using the Blogger-compatible Google Drive image link.
+    An optimize_assets.AssetOptimizer also inlines small images and adds loading hints.
+    """
+    return rewrite_html(html_content, *_rewriters(gdrive_map, derivatives, optimizer))
+
+
+def substitute_img_src_file(input_path, output_path, gdrive_map, derivatives=None, optimizer=None):
+    """Streams input_path to output_path with substituted image URLs."""
+    with span('substitute', file=os.path.basename(input_path)), \
+            open(input_path, "r", encoding="utf-8") as infile, \
+            open(output_path, "w", encoding="utf-8") as outfile:
+        rewrite_stream(infile, outfile, *_rewriters(gdrive_map, derivatives, optimizer))
+
+
+def substitute_img_src_regex(html_content, gdrive_map):
+    """Legacy regex substitution (double-quoted <img src> only), kept for benchmarks."""
     def replacer(match):
         tag = match.group(0)
         src = match.group(1)
         filename = os.path.basename(src)
         if filename in gdrive_map:
-            new_src = f'https://lh3.google.com/u/0/d/{gdrive_map[filename]}=s400'
+            new_src = DRIVE_IMAGE_URL.format(file_id=gdrive_map[filename]) + DEFAULT_SIZE
             return tag.replace(src, new_src)
         return tag
 
     return re.sub(r'<img[^>]*src="([^"]+)"[^>]*>', replacer, html_content)
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python substitute_img_src.py Nobel.html")
+    args = setup_from_argv()[1:]
+    optimize = '--optimize' in args
+    if optimize:
+        args.remove('--optimize')
+    if len(args) != 1:
+        print("Usage: python substitute_img_src.py Nobel.html [--optimize]")
         sys.exit(1)
 
-    html_file = sys.argv[1]
-    with open(html_file, "r", encoding="utf-8") as f:
-        html_content = f.read()
-
+    html_file = args[0]
     img_dir = os.path.join(os.path.dirname(html_file), "images")
-    gdrive_list_path = os.path.join(img_dir, "Gdrive.list")
 
-    if not os.path.isfile(gdrive_list_path):
-        print(f"Error: Gdrive.list not found in {img_dir}")
+    gdrive_map = load_image_ids(img_dir)
+    if not gdrive_map:
+        print(f"Error: no Gdrive.list (or image map entries) found for {img_dir}")
         sys.exit(1)
 
-    gdrive_map = parse_gdrive_list(gdrive_list_path)
-    updated_html = substitute_img_src(html_content, gdrive_map)
+    derivatives = load_manifest(img_dir)
+
+    optimizer = None
+    if optimize:
+        from optimize_assets import AssetOptimizer
+
+        optimizer = AssetOptimizer(img_dir)
 
     output_file = os.path.splitext(html_file)[0] + "_Gdrive.html"
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(updated_html)
+    substitute_img_src_file(html_file, output_file, gdrive_map, derivatives, optimizer)
 
     print(f"Updated HTML saved to: {output_file}")
+    if optimizer is not None:
+        print(optimizer.summary())
 
 if __name__ == "__main__":
     main()
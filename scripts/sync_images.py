@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Upload local post images to Drive, skipping everything Drive already has.
+
+For every images/ folder under ROOT this script:
+    1. hashes each local image (MD5, the same digest Drive reports as md5Checksum),
+    2. compares it with the Drive index (drive_index.py) instead of listing folders:
+         - same name and checksum in the Drive folder -> nothing to do,
+         - same content elsewhere under ROOT's Drive folder (e.g. a copy in another
+           post) -> reuse that ID; copies outside the blog's tree are never reused,
+         - same name with a different checksum -> upload a new revision (files().update),
+         - otherwise -> upload a new file into the folder (files().create),
+    3. runs the uploads as resumable, chunked uploads on a thread pool,
+    4. writes images/Gdrive.list mapping every local file name to its Drive ID,
+       ready for substitute_img_src.py, and records the IDs in ROOT/.image_map.sqlite.
+
+Checksums are cached in the image map (image_map.py) per file size and mtime, so
+only new or modified images are read and hashed again.
+
+Identical files inside the run are uploaded once, so only new or changed bytes
+ever leave the machine.
+
+Usage:
+    python sync_images.py <TOP_MOUNTED_DRIVE_PATH> <ROOT> [--workers N] [--dry-run]
+
+Example:
+    python sync_images.py /home/evan/GdriveMagnes /home/evan/GdriveMagnes/Github/Private/Blog/HTML/2025
+"""
+
+import hashlib
+import mimetypes
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from googleapiclient.http import MediaFileUpload
+
+from auth_cache import DRIVE_WRITE_SCOPES, get_credentials, thread_http
+from drive_index import FILE_FIELDS, DriveIndex
+from generate_gdrive_lists import find_image_dirs, write_listing
+from google_services import get_service
+from image_map import ImageMap, find_image_map
+from list_drive_files_v3 import CREDS_FILE, get_relative_drive_path
+from rate_limit import LEDGER, get_limiter
+from tracing import count, setup_from_argv, span
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.tif', '.tiff', '.webp', '.bmp', '.svg')
+CHUNK_SIZE = 8 * 1024 * 1024  # resumable upload chunk; must be a multiple of 256 KiB
+HASH_BLOCK = 1024 * 1024
+DEFAULT_WORKERS = 4
+
+
+def file_md5(path):
+    """Streams a file through MD5 and returns the hex digest."""
+    digest = hashlib.md5()
+    with span('hash', file=os.path.basename(path)), open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+            count('bytes_hashed', len(block))
+    return digest.hexdigest()
+
+
+def local_images(local_dir):
+    """Returns the sorted image file names directly inside local_dir."""
+    return sorted(name for name in os.listdir(local_dir)
+                  if name.lower().endswith(IMAGE_EXTENSIONS)
+                  and os.path.isfile(os.path.join(local_dir, name)))
+
+
+def local_md5(path, image_map=None):
+    """MD5 of a local file, reusing the image map's cached value when the file is unchanged."""
+    md5 = image_map.cached_md5(path) if image_map is not None else None
+    if md5 is None:
+        md5 = file_md5(path)
+        if image_map is not None:
+            image_map.record_file(path, md5)
+    return md5
+
+
+def plan_folder(index, folder_id, local_dir, image_map=None, scope_id=None):
+    """
+    Compares a local images/ folder with the index.
+    Returns (id_map, uploads): id_map holds the names already available on Drive,
+    uploads is a list of dicts describing the files that must be sent. Files with
+    the same content are reused from folder_id, or from below scope_id if given.
+    """
+    id_map = {}
+    uploads = []
+    for name in local_images(local_dir):
+        path = os.path.join(local_dir, name)
+        md5 = local_md5(path, image_map)
+        existing = index.child(folder_id, name)
+
+        if existing is not None and existing['md5'] == md5:
+            id_map[name] = existing['id']
+            continue
+        same_content = index.find_reusable(md5, folder_id, scope_id)
+        if same_content is not None:
+            id_map[name] = same_content['id']
+            continue
+        uploads.append({'name': name, 'path': path, 'md5': md5, 'folder_id': folder_id,
+                        'file_id': existing['id'] if existing is not None else None,
+                        'local_dir': local_dir})
+    return id_map, uploads
+
+
+def upload_file(service, upload, http=None, media=None):
+    """
+    Sends one file with a resumable, chunked upload and returns the Drive metadata.
+    media replaces the MediaFileUpload of upload['path'] (e.g. a ZIP member, see zip_ingest.py).
+    """
+    if media is None:
+        mime_type = mimetypes.guess_type(upload['name'])[0] or 'application/octet-stream'
+        media = MediaFileUpload(upload['path'], mimetype=mime_type, chunksize=CHUNK_SIZE, resumable=True)
+    if upload['file_id']:
+        request = service.files().update(fileId=upload['file_id'], media_body=media, fields=FILE_FIELDS)
+    else:
+        body = {'name': upload['name'], 'parents': [upload['folder_id']]}
+        request = service.files().create(body=body, media_body=media, fields=FILE_FIELDS)
+
+    # A chunk that fails with 429/5xx is resent from the last committed offset.
+    limiter = get_limiter('drive')
+    response = None
+    with span('upload', file=upload['name']):
+        while response is None:
+            _, response = limiter.call(lambda: request.next_chunk(http=http), request.methodId)
+    count('bytes_uploaded', media.size())
+    return response
+
+
+def sync_images(creds, top_mount, root, workers=DEFAULT_WORKERS, dry_run=False, index=None, image_map=None):
+    """Uploads new/changed images under root and writes every Gdrive.list. Returns failures."""
+    service = get_service('drive', 'v3', creds)
+    if index is None:
+        index = DriveIndex()
+    if image_map is None:
+        image_map = find_image_map(root) or ImageMap(root)
+    index.sync(service)
+
+    folders = {}
+    pending = {}  # md5 -> first upload with that content; duplicates wait for its ID
+    duplicates = []
+    failed = 0
+    scope_id = index.resolve_path(get_relative_drive_path(top_mount, root))
+    for local_dir in find_image_dirs(root):
+        rel_path = get_relative_drive_path(top_mount, local_dir)
+        folder_id = index.resolve_path(rel_path)
+        if folder_id is None:
+            print(f"❌ {rel_path}: no matching Drive folder")
+            failed += 1
+            continue
+        id_map, uploads = plan_folder(index, folder_id, local_dir, image_map, scope_id)
+        folders[local_dir] = id_map
+        for upload in uploads:
+            if upload['md5'] in pending:
+                duplicates.append(upload)
+            else:
+                pending[upload['md5']] = upload
+
+    total_bytes = sum(os.path.getsize(u['path']) for u in pending.values())
+    print(f"⬆️  {len(pending)} file(s) to upload ({total_bytes / 1e6:.1f} MB), "
+          f"{len(duplicates)} duplicate(s) reuse an upload.")
+    if dry_run:
+        for upload in pending.values():
+            print(f"   {'update' if upload['file_id'] else 'create'}: {upload['path']}")
+        return failed
+
+    def upload_one(upload):
+        return upload_file(service, upload, http=thread_http(creds))
+
+    uploaded = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(upload_one, upload): upload for upload in pending.values()}
+        for future in as_completed(futures):
+            upload = futures[future]
+            try:
+                item = future.result()
+            except Exception as e:
+                print(f"❌ {upload['path']}: {e}")
+                failed += 1
+                continue
+            index.upsert(item)
+            uploaded[upload['md5']] = item['id']
+            folders[upload['local_dir']][upload['name']] = item['id']
+            print(f"✅ {upload['name']} -> {item['id']}")
+
+    for upload in duplicates:
+        if upload['md5'] in uploaded:
+            folders[upload['local_dir']][upload['name']] = uploaded[upload['md5']]
+
+    for local_dir, id_map in folders.items():
+        written = write_listing(sorted(id_map.items()), local_dir, image_map)
+        print(f"📝 {os.path.join(local_dir, 'Gdrive.list')}: {written} entries")
+    return failed
+
+
+def main():
+    args = setup_from_argv()[1:]
+    dry_run = '--dry-run' in args
+    if dry_run:
+        args.remove('--dry-run')
+    workers = DEFAULT_WORKERS
+    if '--workers' in args:
+        i = args.index('--workers')
+        workers = int(args[i + 1])
+        del args[i:i + 2]
+
+    if len(args) != 2:
+        print("Usage: python sync_images.py <TOP_MOUNTED_DRIVE_PATH> <ROOT> [--workers N] [--dry-run]")
+        sys.exit(1)
+
+    top_mount, root = args
+    try:
+        get_relative_drive_path(top_mount, root)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    creds = get_credentials(DRIVE_WRITE_SCOPES, client_secret_file=CREDS_FILE)
+    failed = sync_images(creds, top_mount, root, workers=workers, dry_run=dry_run)
+    report = LEDGER.report()
+    if report:
+        print(report)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Spans, counters and profiling shared by every script.
+
+The scripts only printed status lines, so a slow run could not be pinned on auth,
+discovery, path resolution, listing, file reads or the API call itself. This module
+provides:
+
+    with span('publish', file=path):      # nested, timed, thread- and asyncio-aware
+        ...
+    count('bytes_read', len(data))        # named counters
+
+Both are no-ops until tracing is enabled: span() then returns one shared null
+object and count() returns at once, so instrumented code pays a global lookup.
+
+Enable it from any script's command line (setup_from_argv() strips the flags):
+
+    --trace[=FILE]     JSON-lines trace, one record per finished span plus a final
+                       counters record (default trace-<time>.jsonl); a FILE.folded
+                       file with span stacks weighted by microseconds is written
+                       next to it for flamegraph.pl, speedscope or inferno
+    --profile[=FILE]   cProfile statistics (default profile-<time>.prof), readable
+                       with pstats, snakeviz or flameprof
+
+or with BLOG_TRACE=FILE / BLOG_PROFILE=FILE in the environment. A per-span summary
+is printed when the run ends.
+
+Usage:
+    python tracing.py <trace.jsonl>      # prints the summary of a saved trace
+"""
+
+import atexit
+import contextvars
+import cProfile
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+
+_tracer = None
+_profiler = None
+_current = contextvars.ContextVar('current_span', default=None)
+
+
+class _NullSpan:
+    """What span() returns while tracing is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """One timed, named operation; the parent is whatever span was open in this context."""
+
+    __slots__ = ('tracer', 'name', 'attrs', 'id', 'parent', 'stack', 'start', '_token')
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.id = next(tracer.ids)
+
+    def __enter__(self):
+        parent = _current.get()
+        self.parent = parent.id if parent is not None else None
+        self.stack = (parent.stack + ';' if parent is not None else '') + self.name
+        self._token = _current.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer.finish(self, duration)
+        return False
+
+    def set(self, **attrs):
+        """Adds attributes discovered while the span runs (e.g. a post ID)."""
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    """Collects finished spans into a JSON-lines file and per-name statistics."""
+
+    def __init__(self, path):
+        self.path = path
+        self.ids = itertools.count(1)
+        self.origin = time.perf_counter()
+        self.counters = defaultdict(int)
+        self.stats = defaultdict(lambda: [0, 0.0, 0.0])  # name -> [count, total, max]
+        self.folded = defaultdict(float)  # 'a;b;c' -> inclusive seconds of c under a;b
+        self._lock = threading.Lock()
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def finish(self, span, duration):
+        record = {'type': 'span', 'name': span.name, 'id': span.id, 'parent': span.parent,
+                  'start_ms': round(1000 * (span.start - self.origin), 3),
+                  'duration_ms': round(1000 * duration, 3), 'thread': threading.current_thread().name}
+        if span.attrs:
+            record['attrs'] = span.attrs
+        line = json.dumps(record, default=str) + '\n'
+        with self._lock:
+            self._file.write(line)
+            stat = self.stats[span.name]
+            stat[0] += 1
+            stat[1] += duration
+            stat[2] = max(stat[2], duration)
+            self.folded[span.stack] += duration
+
+    def count(self, name, value):
+        with self._lock:
+            self.counters[name] += value
+
+    def close(self):
+        with self._lock:
+            self._file.write(json.dumps({'type': 'counters', 'counters': dict(self.counters)}) + '\n')
+            self._file.close()
+            # Collapsed stacks hold inclusive time; subtract children so each frame is self time.
+            self_time = dict(self.folded)
+            for stack, seconds in self.folded.items():
+                parent = stack.rpartition(';')[0]
+                if parent in self_time:
+                    self_time[parent] -= seconds
+            with open(self.path + '.folded', 'w', encoding='utf-8') as f:
+                for stack, seconds in sorted(self_time.items()):
+                    if seconds > 0:
+                        f.write(f"{stack} {int(seconds * 1e6)}\n")
+
+    def summary(self):
+        return format_summary({name: tuple(stat) for name, stat in self.stats.items()}, self.counters)
+
+
+def format_summary(stats, counters):
+    """Formats {name: (count, total_s, max_s)} and counters as printable lines."""
+    lines = ["🔬 Trace summary (inclusive time per span):"]
+    for name, (calls, total, longest) in sorted(stats.items(), key=lambda item: -item[1][1]):
+        lines.append(f"   {name:<24} {calls:>6}x  total {total:8.3f}s  mean {1000 * total / calls:9.2f} ms  "
+                     f"max {1000 * longest:9.2f} ms")
+    for name, value in sorted(counters.items()):
+        lines.append(f"   # {name}: {value}")
+    return '\n'.join(lines)
+
+
+# ---------- public API ----------
+def span(name, **attrs):
+    """Returns a context manager timing the enclosed block (a no-op when tracing is off)."""
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return Span(tracer, name, attrs)
+
+
+def count(name, value=1):
+    """Adds value to a named counter (a no-op when tracing is off)."""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.count(name, value)
+
+
+def traced(name=None):
+    """Decorator form of span() for whole functions."""
+    def decorate(function):
+        span_name = name or function.__name__
+
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return function(*args, **kwargs)
+            with Span(_tracer, span_name, {}):
+                return function(*args, **kwargs)
+
+        wrapper.__name__ = function.__name__
+        wrapper.__doc__ = function.__doc__
+        wrapper.__wrapped__ = function
+        return wrapper
+    return decorate
+
+
+def enabled():
+    return _tracer is not None
+
+
+def enable(trace_path=None, profile_path=None):
+    """Starts tracing and/or profiling; finish() (registered at exit) writes the results."""
+    global _tracer, _profiler
+    if trace_path and _tracer is None:
+        _tracer = Tracer(trace_path)
+    if profile_path and _profiler is None:
+        _profiler = (cProfile.Profile(), profile_path)
+        _profiler[0].enable()
+    if _tracer is not None or _profiler is not None:
+        atexit.register(finish)
+
+
+def finish():
+    """Stops tracing/profiling, writes the files and prints the summary. Safe to call twice."""
+    global _tracer, _profiler
+    if _profiler is not None:
+        profiler, path = _profiler
+        _profiler = None
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"🔬 Profile written to {path}", file=sys.stderr)
+    if _tracer is not None:
+        tracer = _tracer
+        _tracer = None
+        tracer.close()
+        print(tracer.summary(), file=sys.stderr)
+        print(f"🔬 Trace written to {tracer.path} (+ .folded)", file=sys.stderr)
+
+
+def setup_from_argv(argv=None):
+    """
+    Removes --trace[=FILE] and --profile[=FILE] from argv (default: sys.argv, in place)
+    and enables what they ask for; BLOG_TRACE / BLOG_PROFILE work the same way.
+    Returns argv.
+    """
+    argv = sys.argv if argv is None else argv
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    paths = {'--trace': os.environ.get('BLOG_TRACE'), '--profile': os.environ.get('BLOG_PROFILE')}
+    defaults = {'--trace': f'trace-{stamp}.jsonl', '--profile': f'profile-{stamp}.prof'}
+    kept = []
+    for arg in argv:
+        flag, _, value = arg.partition('=')
+        if flag in paths:
+            paths[flag] = value or defaults[flag]
+        else:
+            kept.append(arg)
+    argv[:] = kept
+    enable(paths['--trace'], paths['--profile'])
+    return argv
+
+
+def summarize_file(path):
+    """Rebuilds the summary of a saved trace file."""
+    stats = {}
+    counters = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if record['type'] == 'counters':
+                counters = record['counters']
+                continue
+            calls, total, longest = stats.get(record['name'], (0, 0.0, 0.0))
+            duration = record['duration_ms'] / 1000
+            stats[record['name']] = (calls + 1, total + duration, max(longest, duration))
+    return format_summary(stats, counters)
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python tracing.py <trace.jsonl>")
+        sys.exit(1)
+    print(summarize_file(sys.argv[1]))
+
+
+if __name__ == '__main__':
+    main()
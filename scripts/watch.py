@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Watch the HTML tree and republish a post as soon as one of its files is saved.
+
+Publishing an edit meant running build.py (or the manual script chain) again,
+which authenticated, loaded the image map and walked the whole tree every time.
+watch.py stays running instead:
+
+    - inotify reports every write to the tree (inotify_simple when installed,
+      otherwise the tree is polled every POLL_INTERVAL seconds),
+    - events are debounced: a batch is processed once the tree has been quiet for
+      DEBOUNCE seconds (editors write temp files and rename them, Drive sync
+      touches files several times), but never later than MAX_DELAY after the
+      first event of the batch,
+    - each changed path is mapped to its post folder (the folder of the HTML, or
+      the parent of images/) and only that folder's build.py steps are checked,
+    - the Blogger service, OAuth credentials, image map and build state are
+      created once and reused, so a save costs the substitute step plus one
+      posts().patch through create_post.publish_file().
+
+Files the build writes itself (*_Gdrive.html, *_clean.html, derivatives.json,
+resized derivatives), hidden files and editor temp files are ignored, so a
+rebuild never triggers another one.
+
+Usage:
+    python watch.py <ROOT> [--derivatives] [--optimize] [--no-publish] [--debounce SECONDS]
+
+Example:
+    python watch.py ../HTML/2025 --optimize
+"""
+
+import os
+import sys
+import time
+
+from build import (STATE_NAME, BuildState, GENERATED_SUFFIXES, make_publisher, plan_folder,
+                   post_files, run_steps)
+from image_derivatives import MANIFEST_NAME, is_derivative
+from image_map import ImageMap, find_image_map
+from tracing import count, setup_from_argv, span
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # polling fallback
+    INotify = None
+
+DEBOUNCE = 1.0  # seconds without events before a batch is processed
+MAX_DELAY = 10.0  # a continuous stream of events still gets processed after this long
+POLL_INTERVAL = 1.0
+TEMP_SUFFIXES = ('~', '.swp', '.swx', '.tmp', '.part', '.crdownload', '.kate-swp')
+
+
+def is_ignored(path):
+    """True for files that never affect a post: hidden, editor temp and build outputs."""
+    name = os.path.basename(path)
+    return (name.startswith(('.', '#', '~$')) or name.endswith(TEMP_SUFFIXES)
+            or name.endswith(GENERATED_SUFFIXES) or name in (MANIFEST_NAME, STATE_NAME)
+            or is_derivative(name))
+
+
+def post_folder(path):
+    """The post folder a changed file belongs to."""
+    directory = os.path.dirname(path)
+    return os.path.dirname(directory) if os.path.basename(directory) == 'images' else directory
+
+
+class InotifyWatcher:
+    """Recursive inotify watch of root; read() returns the changed paths."""
+
+    def __init__(self, root):
+        self.inotify = INotify()
+        self.mask = (flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.CREATE
+                     | flags.DELETE | flags.DELETE_SELF)
+        self.dirs = {}  # watch descriptor -> directory
+        self._add_tree(root)
+
+    def _add_tree(self, directory):
+        """Watches directory and its subfolders; returns the files already inside them."""
+        found = []
+        for dirpath, dirnames, filenames in os.walk(directory):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            try:
+                self.dirs[self.inotify.add_watch(dirpath, self.mask)] = dirpath
+            except OSError:  # removed meanwhile
+                continue
+            found += [os.path.join(dirpath, name) for name in filenames]
+        return found
+
+    def read(self, timeout=None):
+        """Blocks up to timeout seconds (forever if None) for events; returns the changed paths."""
+        changed = set()
+        for event in self.inotify.read(timeout=None if timeout is None else int(timeout * 1000)):
+            directory = self.dirs.get(event.wd)
+            if directory is None:
+                continue
+            if event.mask & flags.IGNORED:
+                del self.dirs[event.wd]
+                continue
+            path = os.path.join(directory, event.name) if event.name else directory
+            if event.mask & flags.ISDIR:
+                if event.mask & (flags.CREATE | flags.MOVED_TO) and not event.name.startswith('.'):
+                    # Files written before the watch was added produced no event of their own.
+                    changed.update(self._add_tree(path))
+                continue
+            changed.add(path)
+        return changed
+
+
+class PollingWatcher:
+    """Same interface as InotifyWatcher, comparing (mtime, size) snapshots of the tree."""
+
+    def __init__(self, root, interval=POLL_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def read(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(self.interval if deadline is None else max(0, min(self.interval, deadline - time.monotonic())))
+            snapshot = self._scan()
+            changed = {path for path in snapshot.keys() | self.snapshot.keys()
+                       if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+
+def next_batch(watcher, debounce=DEBOUNCE, max_delay=MAX_DELAY):
+    """Waits for a change, then collects events until debounce seconds pass without one."""
+    changed = watcher.read()
+    first = time.monotonic()
+    while True:
+        remaining = max_delay - (time.monotonic() - first)
+        if remaining <= 0:
+            break
+        more = watcher.read(min(debounce, remaining))
+        if not more:
+            break
+        changed |= more
+    return {path for path in changed if not is_ignored(path)}
+
+
+class Rebuilder:
+    """build.py's per-folder steps with the image map, build state and publisher kept in memory."""
+
+    def __init__(self, root, derivatives=False, publish=True, optimize=False):
+        self.root = os.path.abspath(root)
+        self.derivatives = derivatives
+        self.optimize = optimize
+        self.state = BuildState(os.path.join(self.root, STATE_NAME))
+        self.image_map = find_image_map(self.root) or ImageMap(self.root)
+        self.publisher = make_publisher() if publish else None
+
+    def rebuild(self, folder):
+        """Runs the out-of-date steps of one post folder. Returns the names that ran."""
+        html_files = post_files(folder) if os.path.isdir(folder) else []
+        if not html_files:
+            return []
+        steps = plan_folder(folder, html_files, self.image_map, self.derivatives, self.publisher, self.optimize)
+        with span('rebuild', folder=os.path.relpath(folder, self.root)):
+            ran = run_steps(steps, self.state)
+        if ran:
+            self.state.save()
+        return ran
+
+    def handle(self, changed):
+        """Rebuilds every post folder touched by the changed paths. Returns the number of failures."""
+        failures = 0
+        for folder in sorted({post_folder(path) for path in changed}):
+            start = time.perf_counter()
+            try:
+                ran = self.rebuild(folder)
+            except Exception as e:
+                print(f"❌ {folder}: {e}")
+                failures += 1
+                continue
+            count('watch.rebuilds')
+            for name in ran:
+                print(f"🔨 {name}")
+            if ran:
+                print(f"⏱️  {os.path.relpath(folder, self.root)} done in {time.perf_counter() - start:.2f}s")
+        return failures
+
+
+def watch(root, derivatives=False, publish=True, optimize=False, debounce=DEBOUNCE):
+    """Rebuilds and republishes posts under root as their files change, until interrupted."""
+    rebuilder = Rebuilder(root, derivatives, publish, optimize)
+    watcher = InotifyWatcher(root) if INotify is not None else PollingWatcher(root)
+    mode = 'inotify' if INotify is not None else f'polling every {POLL_INTERVAL:g}s'
+    print(f"👀 Watching {rebuilder.root} ({mode}); Ctrl+C to stop.")
+    try:
+        while True:
+            changed = next_batch(watcher, debounce)
+            if changed:
+                rebuilder.handle(changed)
+    except KeyboardInterrupt:
+        print("👋 Stopped watching.")
+
+
+def main():
+    args = setup_from_argv()[1:]
+    flags_given = {flag: flag in args for flag in ('--derivatives', '--optimize', '--no-publish')}
+    args = [a for a in args if a not in flags_given]
+    debounce = DEBOUNCE
+    if '--debounce' in args:
+        i = args.index('--debounce')
+        debounce = float(args[i + 1])
+        del args[i:i + 2]
+
+    if len(args) != 1 or not os.path.isdir(args[0]):
+        print("Usage: python watch.py <ROOT> [--derivatives] [--optimize] [--no-publish] [--debounce SECONDS]")
+        sys.exit(1)
+
+    watch(args[0], derivatives=flags_given['--derivatives'], publish=not flags_given['--no-publish'],
+          optimize=flags_given['--optimize'], debounce=debounce)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Publish the images and HTML of Drive/Docs export ZIPs without unpacking them.
+
+Exports such as HTML/2025/Tests/Untitled document.zip used to be unzipped by hand
+next to the archive, doubling the disk usage, before sync_images.py and
+substitute_img_src.py could run. This script reads the members straight from the
+archive. Member paths are taken relative to the ZIP's folder, as if it had been
+unzipped in place, and:
+
+    1. every image member is decompressed once, and the same bytes are hashed (MD5,
+       plus SHA-256, the key of the derivative cache), resized and uploaded;
+       members whose content the Drive index (drive_index.py) knows in the same
+       folder or below the site's Drive folder, or the image map (image_map.py)
+       already has, reuse that file's ID, and identical members inside the
+       archive are uploaded once,
+    2. the other members are sent with resumable uploads (ZipMemberUpload) into the
+       Drive folder matching the member's folder, which is created when missing;
+       uploads start while the next members are being read,
+    3. with --derivatives, the resized copies (image_derivatives.py) are encoded from
+       the member's bytes and uploaded the same way,
+    4. every HTML member is rewritten with substitute_img_src.py's rewriters while it
+       is read and saved as <name>_Gdrive.html next to the archive,
+    5. the new IDs are added to the site's image map, when there is one.
+
+Only the generated _Gdrive.html files (and the derivative cache) are written to disk.
+
+Usage:
+    python zip_ingest.py <TOP_MOUNTED_DRIVE_PATH> <ZIP> [<ZIP> ...] [--derivatives] [--workers N] [--dry-run]
+
+Example:
+    python zip_ingest.py /home/evan/GdriveMagnes "/home/evan/GdriveMagnes/Github/Private/Blog/HTML/2025/Tests/Untitled document.zip"
+"""
+
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import sys
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from googleapiclient.http import MediaUpload
+
+from auth_cache import DRIVE_WRITE_SCOPES, get_credentials, thread_http
+from build import OUTPUT_SUFFIX
+from drive_index import FILE_FIELDS, DriveIndex
+from drive_path_cache import FOLDER_MIME, path_components
+from google_services import get_service
+from html_rewriter import rewrite_stream
+from image_derivatives import FORMATS, WIDTHS, derivative_stems, derived_name, encode_cached
+from image_map import find_image_map
+from list_drive_files_v3 import CREDS_FILE, get_relative_drive_path
+from rate_limit import LEDGER, get_limiter
+from substitute_img_src import make_rewriters
+from sync_images import CHUNK_SIZE, HASH_BLOCK, IMAGE_EXTENSIONS, file_md5, upload_file
+from tracing import count, setup_from_argv, span
+
+HTML_EXTENSIONS = ('.html', '.htm')
+DEFAULT_WORKERS = 4
+MEMBER_BUFFER_LIMIT = 64 * 1024 * 1024  # larger members are decompressed again for their upload
+
+
+class ZipMemberUpload(MediaUpload):
+    """
+    Resumable upload body of a ZIP member. Chunks are sliced from the member's bytes
+    when they were read already (data); otherwise they are decompressed from the
+    archive, and a resent chunk seeks back, which re-decompresses from the start of
+    the member. The size comes from the archive directory either way.
+
+    to_json() records the archive path and member name, so an interrupted upload can
+    be resumed by another process with ZipMemberUpload.from_json() (new_from_json()
+    only revives googleapiclient's own classes).
+    """
+
+    def __init__(self, zip_path, info, mimetype, chunksize=CHUNK_SIZE, data=None):
+        super().__init__()
+        self._zip_path = zip_path
+        self._info = info
+        self._mimetype = mimetype
+        self._chunksize = chunksize
+        self._data = data
+        self._archive = None
+        self._fd = None
+
+    def chunksize(self):
+        return self._chunksize
+
+    def mimetype(self):
+        return self._mimetype
+
+    def size(self):
+        return self._info.file_size
+
+    def resumable(self):
+        return True
+
+    def has_stream(self):
+        return False
+
+    def getbytes(self, begin, length):
+        if self._data is not None:
+            return self._data[begin:begin + length]
+        if self._fd is None:
+            # One ZipFile per upload: worker threads never share a file position.
+            self._archive = zipfile.ZipFile(self._zip_path)
+            self._fd = self._archive.open(self._info)
+        self._fd.seek(begin)
+        data = self._fd.read(length)
+        if begin + len(data) >= self._info.file_size:
+            self.close()
+        return data
+
+    def close(self):
+        if self._fd is not None:
+            self._fd.close()
+            self._archive.close()
+            self._fd = self._archive = None
+
+    def to_json(self):
+        return json.dumps({'_class': type(self).__name__, '_module': type(self).__module__,
+                           'zip_path': self._zip_path, 'member': self._info.filename,
+                           'mimetype': self._mimetype, 'chunksize': self._chunksize})
+
+    @classmethod
+    def from_json(cls, s):
+        d = json.loads(s)
+        with zipfile.ZipFile(d['zip_path']) as archive:
+            info = archive.getinfo(d['member'])
+        return cls(d['zip_path'], info, d['mimetype'], d['chunksize'])
+
+
+def member_path(zip_path, name):
+    """The path a member would have if the archive were unzipped in place; None if it escapes that folder."""
+    base = os.path.dirname(os.path.abspath(zip_path))
+    path = os.path.normpath(os.path.join(base, name))
+    return path if path.startswith(base + os.sep) else None
+
+
+def read_member(archive, info):
+    """
+    Decompresses a member once and returns (data, md5, sha256). Members larger than
+    MEMBER_BUFFER_LIMIT are only streamed through the digests (data is None).
+    """
+    md5, sha256 = hashlib.md5(), hashlib.sha256()
+    with span('read', member=info.filename):
+        if info.file_size <= MEMBER_BUFFER_LIMIT:
+            data = archive.read(info)  # checks the member's CRC too
+            md5.update(data)
+            sha256.update(data)
+        else:
+            data = None
+            with archive.open(info) as f:
+                for block in iter(lambda: f.read(HASH_BLOCK), b''):
+                    md5.update(block)
+                    sha256.update(block)
+    count('bytes_hashed', info.file_size)
+    return data, md5.hexdigest(), sha256.hexdigest()
+
+
+def known_file_id(md5, index, image_map=None, folder_id=None, scope_id=None):
+    """
+    The Drive ID of a file with this content, or None: from the Drive index when it
+    lies in folder_id or below scope_id (DriveIndex.find_reusable), else from the image map.
+    """
+    row = index.find_reusable(md5, folder_id, scope_id)
+    if row is not None:
+        return row['id']
+    for _, _, file_id in (image_map.find_by_md5(md5) if image_map is not None else []):
+        if file_id:
+            return file_id
+    return None
+
+
+def ensure_drive_folder(service, index, relative_path, create=True, http=None):
+    """Returns the folder ID of relative_path, creating missing folders (None if missing and not create)."""
+    folder_id = index.root_id
+    for name in path_components(relative_path):
+        row = index.child(folder_id, name, folders_only=True)
+        if row is not None:
+            folder_id = row['id']
+            continue
+        if not create:
+            return None
+        body = {'name': name, 'mimeType': FOLDER_MIME, 'parents': [folder_id]}
+        item = get_limiter('drive').execute(service.files().create(body=body, fields=FILE_FIELDS), http=http)
+        index.upsert(item)
+        print(f"📁 Created Drive folder {name}")
+        folder_id = item['id']
+    return folder_id
+
+
+def plan_archive(zip_path, archive):
+    """
+    Sorts the members of an open archive, from its directory only (nothing is read).
+    Returns (image_members, html_members), both lists of (info, local_path).
+    """
+    image_members, html_members = [], []
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        path = member_path(zip_path, info.filename)
+        if path is None:
+            print(f"⚠️  {info.filename}: outside the archive folder, ignored")
+            continue
+        if info.filename.lower().endswith(HTML_EXTENSIONS):
+            html_members.append((info, path))
+        elif info.filename.lower().endswith(IMAGE_EXTENSIONS):
+            image_members.append((info, path))
+    return image_members, html_members
+
+
+def encode_member_derivatives(archive, info, data, sha256, stem, widths=WIDTHS, fmt='webp'):
+    """Encodes the derivatives of an image member; returns [{"width", "height", "file", "path"}] or None."""
+    with span('derivatives', member=info.filename), \
+            (io.BytesIO(data) if data is not None else archive.open(info)) as f:
+        encoded = encode_cached(f, sha256, widths, fmt)
+    if encoded is None:
+        return None
+    return [{'width': width, 'height': height, 'file': derived_name(stem, width, FORMATS[fmt][1]), 'path': cache_file}
+            for width, height, cache_file in encoded]
+
+
+def write_substituted_html(archive, info, output_path, gdrive_map, derivatives=None):
+    """Rewrites an HTML member into output_path while reading it (UTF-8, else latin-1)."""
+    tmp_path = output_path + '.tmp'
+    for encoding in ('utf-8-sig', 'latin-1'):
+        try:
+            with span('substitute', member=info.filename), archive.open(info) as member, \
+                    io.TextIOWrapper(member, encoding=encoding) as infile, \
+                    open(tmp_path, 'w', encoding='utf-8') as outfile:
+                rewrite_stream(infile, outfile, *make_rewriters(gdrive_map, derivatives))
+            break
+        except UnicodeDecodeError:
+            continue
+    os.replace(tmp_path, output_path)
+
+
+def ingest_archive(service, creds, top_mount, zip_path, index, image_map=None, derivatives=False,
+                   workers=DEFAULT_WORKERS, dry_run=False):
+    """Uploads the new images of one archive and writes its substituted HTML. Returns the failures."""
+    def upload_one(item, make_media):
+        upload = {'name': item['name'], 'path': item.get('path'), 'file_id': None,
+                  'folder_id': folders[item['local_dir']]}
+        return upload_file(service, upload, http=thread_http(creds), media=make_media() if make_media else None)
+
+    images = []  # every member and derivative: {name, local_dir, md5, file_id[, path]}
+    first_by_md5 = {}  # md5 -> the item whose upload the others with that content wait for
+    uploads = {}  # future (or None in a dry run) -> item
+    manifests = {}
+    # Queued uploads hold their member's bytes; bound how many wait at once.
+    in_flight = threading.BoundedSemaphore(2 * max(1, workers))
+
+    def queue(item, make_media):
+        first_by_md5[item['md5']] = item
+        if dry_run:
+            uploads[len(uploads)] = item
+            return
+        in_flight.acquire()
+        future = executor.submit(upload_one, item, make_media)
+        future.add_done_callback(lambda _: in_flight.release())
+        uploads[future] = item
+
+    with zipfile.ZipFile(zip_path) as archive, ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        image_members, html_members = plan_archive(zip_path, archive)
+        local_dirs = sorted({os.path.dirname(path) for _, path in image_members})
+        folders = {local_dir: ensure_drive_folder(service, index, get_relative_drive_path(top_mount, local_dir),
+                                                  create=not dry_run)
+                   for local_dir in local_dirs}
+        # Content is only reused from the site's own Drive tree (the ZIP's folder without an image map).
+        site_dir = image_map.root if image_map is not None else os.path.dirname(os.path.abspath(zip_path))
+        try:
+            scope_id = index.resolve_path(get_relative_drive_path(top_mount, site_dir))
+        except ValueError:  # the site root is outside the mount
+            scope_id = None
+        stems = {local_dir: derivative_stems([os.path.basename(path) for _, path in image_members
+                                              if os.path.dirname(path) == local_dir])
+                 for local_dir in local_dirs} if derivatives else {}
+
+        # Each member is decompressed once; its upload starts while the next ones are read.
+        for info, path in image_members:
+            data, md5, sha256 = read_member(archive, info)
+            image = {'name': os.path.basename(path), 'local_dir': os.path.dirname(path), 'md5': md5,
+                     'file_id': known_file_id(md5, index, image_map, folders[os.path.dirname(path)], scope_id)}
+            images.append(image)
+            if image['file_id'] is None and md5 not in first_by_md5:
+                mime_type = mimetypes.guess_type(image['name'])[0] or 'application/octet-stream'
+                queue(image, lambda info=info, mime_type=mime_type, data=data: ZipMemberUpload(
+                    zip_path, info, mime_type, data=data))
+            if not derivatives:
+                continue
+            entries = encode_member_derivatives(archive, info, data, sha256, stems[image['local_dir']][image['name']])
+            if not entries:
+                continue
+            manifests.setdefault(image['local_dir'], {})[image['name']] = entries
+            for entry in entries:
+                derived_md5 = file_md5(entry['path'])
+                file_id = known_file_id(derived_md5, index, image_map, folders[image['local_dir']], scope_id)
+                derived = {'name': entry['file'], 'path': entry['path'], 'local_dir': image['local_dir'],
+                           'md5': derived_md5, 'file_id': file_id}
+                images.append(derived)
+                if derived['file_id'] is None and derived_md5 not in first_by_md5:
+                    queue(derived, None)
+
+        reused = sum(1 for image in images if image['file_id'] is not None)
+        print(f"🗜️  {os.path.basename(zip_path)}: {len(uploads)} upload(s), {reused} reused, "
+              f"{len(html_members)} HTML file(s)")
+        if dry_run:
+            for item in uploads.values():
+                print(f"   upload: {os.path.join(item['local_dir'], item['name'])}")
+            return 0
+
+        failed = 0
+        for future in as_completed(uploads):
+            item = uploads[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ {item['name']}: {e}")
+                failed += 1
+                continue
+            index.upsert(result)
+            item['file_id'] = result['id']
+            print(f"✅ {item['name']} -> {result['id']}")
+
+        # Duplicates take the ID of the copy that was uploaded.
+        ids = {}
+        for item in images:
+            file_id = item['file_id'] or first_by_md5[item['md5']]['file_id']
+            if file_id:
+                ids.setdefault(item['local_dir'], {})[item['name']] = file_id
+
+        for info, path in html_members:
+            images_dir = os.path.join(os.path.dirname(path), 'images')
+            output_path = os.path.splitext(path)[0] + OUTPUT_SUFFIX
+            manifest = {name: [{key: value for key, value in entry.items() if key != 'path'} for entry in entries]
+                        for name, entries in manifests.get(images_dir, {}).items()}
+            write_substituted_html(archive, info, output_path, ids.get(images_dir, {}), manifest)
+            print(f"📝 {output_path}")
+
+    if image_map is not None:
+        for local_dir, folder_ids in ids.items():
+            image_map.set_ids(local_dir, {**image_map.ids(local_dir), **folder_ids})
+    return failed
+
+
+def main():
+    args = setup_from_argv()[1:]
+    flags = {flag: flag in args for flag in ('--derivatives', '--dry-run')}
+    args = [a for a in args if a not in flags]
+    workers = DEFAULT_WORKERS
+    if '--workers' in args:
+        i = args.index('--workers')
+        workers = int(args[i + 1])
+        del args[i:i + 2]
+
+    if len(args) < 2 or not all(zipfile.is_zipfile(path) for path in args[1:]):
+        print("Usage: python zip_ingest.py <TOP_MOUNTED_DRIVE_PATH> <ZIP> [<ZIP> ...] [--derivatives] [--workers N] "
+              "[--dry-run]")
+        sys.exit(1)
+
+    top_mount, zip_paths = args[0], args[1:]
+    try:
+        for zip_path in zip_paths:
+            get_relative_drive_path(top_mount, os.path.dirname(os.path.abspath(zip_path)))
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    creds = get_credentials(DRIVE_WRITE_SCOPES, client_secret_file=CREDS_FILE)
+    service = get_service('drive', 'v3', creds)
+    index = DriveIndex()
+    index.sync(service)
+    failed = 0
+    for zip_path in zip_paths:
+        failed += ingest_archive(service, creds, top_mount, zip_path, index,
+                                 image_map=find_image_map(os.path.dirname(os.path.abspath(zip_path))),
+                                 derivatives=flags['--derivatives'], workers=workers, dry_run=flags['--dry-run'])
+    report = LEDGER.report()
+    if report:
+        print(report)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
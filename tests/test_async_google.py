@@ -0,0 +1,58 @@
+"""async_google.py against the local stub (fake_google_api.py)."""
+
+import asyncio
+import hashlib
+
+import httpx
+import pytest
+from google.auth.credentials import AnonymousCredentials
+
+import google_services
+import rate_limit
+from async_google import AsyncGoogleClient
+from fake_google_api import FakeGoogleApi
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeGoogleApi(retry_after=0.01).start()
+    monkeypatch.setenv(google_services.API_ROOT_ENV, server.root_url)
+    rate_limit.set_limits('drive', 1000, 100, 1000)
+    rate_limit.set_limits('blogger', 1000, 100, 1000)
+    yield server
+    server.stop()
+
+
+def test_uploads_concurrently_and_lists_every_page(server, monkeypatch):
+    folder_id = server.drive.folder('Blog/post/images')
+    failures = iter([False, True])  # the second request is throttled once and retried
+    monkeypatch.setattr(server, 'should_fail', lambda: next(failures, False))
+
+    async def main():
+        async with AsyncGoogleClient(AnonymousCredentials(), max_concurrency=4) as client:
+            uploaded = await asyncio.gather(*(
+                client.drive_upload(f'image{i:02d}.png', folder_id, b'png %d' % i, 'image/png')
+                for i in range(12)))
+            listed = [item async for item in client.drive_list(f"'{folder_id}' in parents",
+                                                               'id, name, md5Checksum', page_size=5)]
+            return uploaded, listed
+
+    uploaded, listed = asyncio.run(main())
+
+    assert [item['md5Checksum'] for item in uploaded] == [hashlib.md5(b'png %d' % i).hexdigest() for i in range(12)]
+    assert sorted(item['id'] for item in listed) == sorted(item['id'] for item in uploaded)
+    assert server.calls['GET /drive/v3/files'] == 3  # pages of 5, 5 and 2
+    assert sum(n for endpoint, n in server.calls.items() if endpoint.startswith('throttled:')) == 1
+
+
+def test_publishes_and_surfaces_errors(server):
+    async def main():
+        async with AsyncGoogleClient(AnonymousCredentials()) as client:
+            post = await client.blogger_insert('BLOG', {'title': 'Hello', 'content': '<p>hi</p>'})
+            await client.blogger_patch('BLOG', post['id'], {'title': 'Hello again'})
+            titles = [item['title'] async for item in client.blogger_list('BLOG')]
+            with pytest.raises(httpx.HTTPStatusError) as missing:
+                await client.blogger_patch('BLOG', 'no-such-post', {'title': 'x'})
+            return titles, missing.value.response.status_code
+
+    assert asyncio.run(main()) == (['Hello again'], 404)
@@ -0,0 +1,29 @@
+"""bench_pipeline.py on a tiny corpus."""
+
+import bench_pipeline
+
+
+def test_runs_selected_benchmarks_on_a_corpus(tmp_path):
+    corpus = tmp_path / 'HTML' / '2025'
+    for name in ('trip', 'notes'):
+        (corpus / name / 'images').mkdir(parents=True)
+        (corpus / name / 'images' / 'a.png').write_bytes(b'png')
+        (corpus / name / f'{name}.html').write_text(f'<h1>{name}</h1><img src="images/a.png">', encoding='utf-8')
+
+    results = bench_pipeline.run(str(corpus), only=['substitute', 'resolve', 'publish'])
+
+    assert sorted(results) == ['publish', 'publish_unchanged', 'resolve_cached', 'resolve_paths',
+                               'substitute', 'substitute-opt', 'substitute-regex']
+    assert results['substitute']['ops'] == 2 and results['substitute']['api_calls'] == 0
+    assert results['publish']['calls'] == {'POST /v3/blogs/*/posts': 2}
+    # The second round is answered from the journal and the warm path cache.
+    assert results['publish_unchanged']['api_calls'] == 0
+    assert results['resolve_paths']['api_calls'] > 0
+    assert results['resolve_cached']['api_calls'] == 0
+
+
+def test_compare_flags_throughput_drops():
+    baseline = {'substitute': {'ops_per_s': 100.0}, 'publish': {'ops_per_s': 10.0}}
+    results = {'substitute': {'ops_per_s': 70.0}, 'publish': {'ops_per_s': 9.0}, 'new': {'ops_per_s': 1.0}}
+
+    assert bench_pipeline.compare(results, baseline, tolerance=0.25) == ['substitute']
@@ -0,0 +1,48 @@
+"""build.py: which steps run on an incremental build."""
+
+import os
+
+import build
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+
+
+def test_reruns_only_what_changed(tmp_path, monkeypatch):
+    post = tmp_path / 'trip' / 'trip.html'
+    write(post, '<img src="images/a.png">')
+    write(tmp_path / 'trip' / 'images' / 'Gdrive.list', 'a.png (A)\n')
+    plain = tmp_path / 'notes' / 'notes.html'
+    write(plain, '<p>no images</p>')
+    write(tmp_path / 'notes' / '~$notes.html', 'Word lock file')
+    published = []
+    monkeypatch.setattr(build, 'make_publisher', lambda: published.append)
+
+    assert build.build(str(tmp_path), publish=True) == (3, 0)
+    output = tmp_path / 'trip' / 'trip_Gdrive.html'
+    assert output.read_text(encoding='utf-8') == '<img src="https://lh3.google.com/u/0/d/A=s400">'
+    # A post without images/Gdrive.list is published as it is.
+    assert sorted(published) == [str(plain), str(output)]
+
+    assert build.build(str(tmp_path), publish=True) == (0, 0)
+
+    # Touched but unchanged: the content hash keeps it up to date.
+    os.utime(post, ns=(1, 1))
+    assert build.build(str(tmp_path), publish=True) == (0, 0)
+
+    write(tmp_path / 'trip' / 'images' / 'Gdrive.list', 'a.png (B)\n')
+    published.clear()
+    assert build.build(str(tmp_path), publish=True) == (2, 0)
+    assert output.read_text(encoding='utf-8') == '<img src="https://lh3.google.com/u/0/d/B=s400">'
+    assert published == [str(output)]
+
+
+def test_dry_run_changes_nothing(tmp_path):
+    write(tmp_path / 'trip' / 'trip.html', '<img src="images/a.png">')
+    write(tmp_path / 'trip' / 'images' / 'Gdrive.list', 'a.png (A)\n')
+
+    assert build.build(str(tmp_path), publish=True, dry_run=True) == (2, 0)
+    assert not (tmp_path / 'trip' / 'trip_Gdrive.html').exists()
+    assert not (tmp_path / build.STATE_NAME).exists()
@@ -0,0 +1,144 @@
+"""check_links.py against the local stub (fake_google_api.py): no real Google or web requests."""
+
+import pytest
+from google.auth.credentials import AnonymousCredentials
+
+import check_links
+import google_services
+import rate_limit
+from drive_index import DriveIndex
+from fake_google_api import FakeGoogleApi
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeGoogleApi().start()
+    monkeypatch.setenv(google_services.API_ROOT_ENV, server.root_url)
+    google_services.clear_services()
+    rate_limit.set_limits('drive', 1000, 100, 1000)
+    yield server
+    server.stop()
+    google_services.clear_services()
+
+
+@pytest.fixture
+def drive(server, tmp_path):
+    """(service, synced index, indexed file ID, file ID added to Drive after the sync)."""
+    folder_id = server.drive.folder('Blog')
+    indexed = server.drive.add('indexed.png', folder_id, 'image/png', b'a')
+    service = google_services.get_service('drive', 'v3', AnonymousCredentials())
+    index = DriveIndex(str(tmp_path / 'index.sqlite'))
+    index.sync(service)
+    unindexed = server.drive.add('unindexed.png', folder_id, 'image/png', b'b')
+    yield service, index, indexed['id'], unindexed['id']
+    index.close()
+
+
+def write_post(tmp_path, server, indexed_id, unindexed_id):
+    post_dir = tmp_path / 'post'
+    (post_dir / 'images').mkdir(parents=True)
+    (post_dir / 'images' / 'present.png').write_bytes(b'png')
+    (post_dir / 'post.html').write_text(f'''<html><body>
+<img src="https://lh3.google.com/u/0/d/{indexed_id}=s400">
+<img srcset="https://lh3.google.com/u/0/d/{unindexed_id} 320w, https://lh3.google.com/u/0/d/deletedfile0000 640w">
+<a href="{server.root_url}web/ok/page">fine</a>
+<a href="{server.root_url}web/gone#section">gone</a>
+<a href="mailto:someone@example.com">mail</a><a href="#top">top</a>
+<div style="background: url(images/present.png)"></div>
+<img src="images/missing.png">
+</body></html>''', encoding='utf-8')
+    return str(post_dir / 'post.html')
+
+
+def collect(tmp_path):
+    links = check_links.Links()
+    for path, html_content in check_links.local_documents(str(tmp_path)):
+        links.add_document(path, html_content)
+    return links
+
+
+def test_extract_urls_reads_attributes_srcset_and_css():
+    html_content = ('<img src="a.png" srcset="b.png 1x, c.png 2x">'
+                    '<p style="background:url(\'d.png\')"></p><style>p{background:url(e.png)}</style>')
+    assert check_links.extract_urls(html_content) == ['a.png', 'b.png', 'c.png', 'd.png', 'e.png']
+
+
+def test_drive_id_patterns():
+    assert check_links.drive_id('https://lh3.google.com/u/0/d/abcdefghijkl=s400') == 'abcdefghijkl'
+    assert check_links.drive_id('https://drive.google.com/file/d/abcdefghijkl/view') == 'abcdefghijkl'
+    assert check_links.drive_id('https://drive.google.com/uc?export=view&id=abcdefghijkl') == 'abcdefghijkl'
+    assert check_links.drive_id('https://example.com/d/abcdefghijkl') is None
+
+
+def test_reports_broken_links(server, drive, tmp_path):
+    service, index, indexed_id, unindexed_id = drive
+    post = write_post(tmp_path, server, indexed_id, unindexed_id)
+    links = collect(tmp_path)
+    assert set(links.drive) == {indexed_id, unindexed_id, 'deletedfile0000'}
+    assert set(links.web) == {f'{server.root_url}web/ok/page', f'{server.root_url}web/gone'}
+
+    server.reset_counts()
+    problems = check_links.check_links(links, service, index, cache=check_links.LinkCache(None))
+
+    assert problems == sorted([
+        (post, 'drive:deletedfile0000', 'HTTP 404'),
+        (post, f'{server.root_url}web/gone', 'HTTP 404'),
+        (post, 'images/missing.png', 'no such local file'),
+    ])
+    # Every ID's sharing was fetched, in one batch request.
+    assert server.calls['batch'] == 1
+    assert server.calls['GET /drive/v3/files/*'] == 3
+    assert server.calls['HEAD /web/*'] == 2
+    # The file found on Drive was added to the index.
+    assert index.known_ids([unindexed_id]) == {unindexed_id}
+
+
+def test_cache_skips_working_urls(server, drive, tmp_path):
+    service, index, indexed_id, unindexed_id = drive
+    write_post(tmp_path, server, indexed_id, unindexed_id)
+    cache_path = str(tmp_path / 'links.json')
+
+    cache = check_links.LinkCache(cache_path)
+    first = check_links.check_links(collect(tmp_path), cache=cache)
+    cache.save()
+    server.reset_counts()
+    second = check_links.check_links(collect(tmp_path), cache=check_links.LinkCache(cache_path))
+
+    assert first == second
+    # The working URL is served from the cache; the broken one is checked again.
+    assert server.calls['HEAD /web/*'] == 1
+
+
+def test_revoked_sharing_is_broken_and_shared_ids_are_cached(server, drive, tmp_path):
+    service, index, indexed_id, unindexed_id = drive
+    post = write_post(tmp_path, server, indexed_id, unindexed_id)
+    server.drive.files[unindexed_id]['permissionIds'] = []
+    cache_path = str(tmp_path / 'links.json')
+
+    cache = check_links.LinkCache(cache_path)
+    problems = check_links.check_links(collect(tmp_path), service, index, external=False, cache=cache)
+    cache.save()
+    assert (post, f'drive:{unindexed_id}', 'not shared with anyone with the link') in problems
+
+    server.reset_counts()
+    again = check_links.check_links(collect(tmp_path), service, index, external=False,
+                                    cache=check_links.LinkCache(cache_path))
+    assert again == problems
+    # The ID that is still shared comes from the cache; the two broken ones are fetched again.
+    assert server.calls['GET /drive/v3/files/*'] == 2
+
+
+def test_head_refused_falls_back_to_get(server, monkeypatch):
+    statuses = iter([405])
+    original = server.route
+
+    def route(method, path, query, headers, body):
+        if method == 'HEAD' and path.startswith('/web/'):
+            server.count('HEAD /web/*')
+            return next(statuses, 200), None, None
+        return original(method, path, query, headers, body)
+
+    monkeypatch.setattr(server, 'route', route)
+    url = f'{server.root_url}web/ok/only-get'
+    assert check_links.check_urls([url]) == {}
+    assert server.calls['GET /web/*'] == 1
@@ -0,0 +1,41 @@
+"""clean_html.py: what a Word export keeps after cleaning."""
+
+from clean_html import byte_savings, clean_html
+
+WORD_EXPORT = '''<html><head><meta name=ProgId content=Word.Document>
+<meta http-equiv=Content-Type content="text/html; charset=windows-1252">
+<style>
+p.MsoNormal { margin:0; mso-pagination:widow-orphan }
+.separator { text-align: center }
+.unused { color: red }
+@page WordSection1 { size: 8.5in 11in }
+</style></head><body lang=EN-US>
+<p class="MsoNormal separator" style="mso-line-height-rule:exactly;color:blue">Hello <span class=SpellE>wrold</span><span
+lang=EN-GB></span>   <span style="mso-spacerun:yes">  </span><o:p></o:p></p>
+<!--more-->
+<!--[if gte mso 9]><xml><w:WordDocument/></xml><![endif]-->
+<p><![if !supportLists]><span style="color:red">1.</span><![endif]> item <span style="color:red"><span
+lang=EN-GB></span></span></p>
+<pre>  keep   this  </pre>
+</body></html>'''
+
+
+def test_cleans_a_word_export():
+    cleaned = clean_html(WORD_EXPORT)
+
+    assert cleaned == (
+        '<html><head> <style>.separator{text-align:center}</style></head><body> '
+        # Word classes and mso-* styles go, theme classes stay; attribute-less and empty spans are unwrapped.
+        '<p class="separator" style="color:blue">Hello wrold </p> '
+        # The jump break survives; other comments and Office XML do not.
+        '<!--more--> '
+        # A span that only wraps an empty span is empty too; spans with content are kept.
+        '<p><span style="color:red">1.</span> item </p> '
+        '<pre>  keep   this  </pre> </body></html>\n')
+    before, after, saved = byte_savings(WORD_EXPORT, cleaned)
+    assert after < before and saved > 0
+
+
+def test_is_stable_on_its_own_output():
+    cleaned = clean_html(WORD_EXPORT)
+    assert clean_html(cleaned) == cleaned
@@ -0,0 +1,109 @@
+"""create_post.py's batch collection and incremental publishing against the local stub (fake_google_api.py)."""
+
+import pytest
+from google.auth.credentials import AnonymousCredentials
+
+import create_post
+import google_services
+import rate_limit
+from fake_google_api import FakeGoogleApi
+
+BLOG = 'blog1'
+INSERT = 'POST /v3/blogs/*/posts'
+PATCH = 'PATCH /v3/blogs/*/posts/*'
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeGoogleApi().start()
+    monkeypatch.setenv(google_services.API_ROOT_ENV, server.root_url)
+    google_services.clear_services()
+    rate_limit.set_limits('blogger', 1000, 100, 1000)
+    yield server
+    server.stop()
+    google_services.clear_services()
+
+
+@pytest.fixture
+def publish(server, tmp_path):
+    """publish(path, title=None) -> action, through one service and a journal in tmp_path."""
+    service = google_services.get_service('blogger', 'v3', AnonymousCredentials())
+    journal = create_post.Journal(str(tmp_path / 'journal.jsonl'))
+
+    def publish(path, title=None):
+        return create_post.publish_file(service, BLOG, str(path), title, journal, clean=False)[0]
+
+    return publish
+
+
+def test_batch_prefers_build_output_and_skips_lock_files(tmp_path):
+    post_dir = tmp_path / 'post'
+    post_dir.mkdir()
+    for name in ('post.html', 'post_Gdrive.html', 'post_clean.html', 'draft.html', '~$post.html', '.hidden.html'):
+        (post_dir / name).write_text('<p>x</p>', encoding='utf-8')
+
+    paths = [path for path, _ in create_post.collect_post_files([str(post_dir)])]
+
+    assert paths == [str(post_dir / 'draft.html'), str(post_dir / 'post_Gdrive.html')]
+    # A glob that matches both the source and its output publishes the output once.
+    assert [path for path, _ in create_post.collect_post_files([str(post_dir / 'post*')])] == \
+        [str(post_dir / 'post_Gdrive.html')]
+
+
+def test_output_takes_over_the_post_of_its_source(server, publish, tmp_path):
+    source = tmp_path / 'post.html'
+    source.write_text('<p><img src="images/a.png"></p>', encoding='utf-8')
+    assert publish(source) == 'created'
+
+    output = tmp_path / 'post_Gdrive.html'
+    output.write_text('<p><img src="https://lh3.google.com/u/0/d/abc=s400"></p>', encoding='utf-8')
+    server.reset_counts()
+
+    assert publish(output) == 'updated'
+    assert server.calls[INSERT] == 0 and server.calls[PATCH] == 1
+    assert len(server.blogger.posts) == 1
+
+
+def test_unchanged_is_skipped_and_edit_is_patched(server, publish, tmp_path):
+    post = tmp_path / 'post.html'
+    post.write_text('<p>first</p>', encoding='utf-8')
+    assert publish(post) == 'created'
+    server.reset_counts()
+
+    assert publish(post) == 'skipped'
+    assert sum(server.calls.values()) == 0
+
+    post.write_text('<p>second</p>', encoding='utf-8')
+    assert publish(post) == 'updated'
+    assert publish(post, title='New title') == 'updated'
+    assert server.calls[PATCH] == 2 and server.calls[INSERT] == 0
+    assert [p['title'] for p in server.blogger.posts.values()] == ['New title']
+
+
+def test_post_deleted_on_blogger_is_created_again(server, publish, tmp_path):
+    post = tmp_path / 'post.html'
+    post.write_text('<p>first</p>', encoding='utf-8')
+    publish(post)
+    server.blogger.posts.clear()
+    post.write_text('<p>second</p>', encoding='utf-8')
+
+    assert publish(post) == 'created'
+    assert publish(post) == 'skipped'
+    # The replacement post is what the journal remembers after a restart.
+    (post_id,) = server.blogger.posts
+    assert create_post.Journal(str(tmp_path / 'journal.jsonl')).get(str(post))['post_id'] == post_id
+
+
+def test_hash_follows_the_source_not_the_cleaner(server, tmp_path, monkeypatch):
+    service = google_services.get_service('blogger', 'v3', AnonymousCredentials())
+    journal = create_post.Journal(str(tmp_path / 'journal.jsonl'))
+    post = tmp_path / 'post.html'
+    post.write_text('<p class="MsoNormal">text</p>', encoding='utf-8')
+    assert create_post.publish_file(service, BLOG, str(post), None, journal)[0] == 'created'
+
+    # A cleaner whose output changed does not republish the post...
+    monkeypatch.setattr(create_post, 'clean_html', lambda html_content: html_content.upper())
+    assert create_post.publish_file(service, BLOG, str(post), None, journal)[0] == 'skipped'
+    # ...unless its VERSION was bumped on purpose.
+    monkeypatch.setattr(create_post, 'CLEANER_VERSION', create_post.CLEANER_VERSION + 1)
+    assert create_post.publish_file(service, BLOG, str(post), None, journal)[0] == 'updated'
@@ -0,0 +1,73 @@
+"""generate_gdrive_lists.py's listing writers against the local stub (fake_google_api.py)."""
+
+import asyncio
+
+import pytest
+from google.auth.credentials import AnonymousCredentials
+
+import async_google
+import generate_gdrive_lists
+import google_services
+import rate_limit
+from fake_google_api import FakeGoogleApi
+from image_map import ImageMap
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeGoogleApi().start()
+    monkeypatch.setenv(google_services.API_ROOT_ENV, server.root_url)
+    google_services.clear_services()
+    rate_limit.set_limits('drive', 1000, 100, 1000)
+    yield server
+    server.stop()
+    google_services.clear_services()
+
+
+def test_async_listing_is_written_page_by_page_and_imported(server, tmp_path, monkeypatch):
+    folder_id = server.drive.folder('Blog/post/images')
+    names = [f'image{i:02d}.png' for i in range(25)]
+    ids = {name: server.drive.add(name, folder_id, 'image/png', name.encode())['id'] for name in names}
+    images_dir = tmp_path / 'post' / 'images'
+    images_dir.mkdir(parents=True)
+    image_map = ImageMap(str(tmp_path))
+    # Small pages: each page must be written out before the next one is requested.
+    monkeypatch.setattr(async_google.AsyncGoogleClient.drive_list, '__defaults__', (None, 'id, name', 10))
+    listings, seen = [], []
+
+    class Listing(generate_gdrive_lists._Listing):
+        def __init__(self, f):
+            super().__init__(f)
+            listings.append(self)
+
+    original = async_google.AsyncGoogleClient.request
+
+    async def request(self, method, url, *args, params=None, **kwargs):
+        if params and params.get('pageToken'):
+            seen.append(listings[-1].lines)
+        return await original(self, method, url, *args, params=params, **kwargs)
+
+    monkeypatch.setattr(generate_gdrive_lists, '_Listing', Listing)
+    monkeypatch.setattr(async_google.AsyncGoogleClient, 'request', request)
+
+    results = asyncio.run(generate_gdrive_lists._list_folders(
+        AnonymousCredentials(), [(folder_id, str(images_dir))], 2, image_map))
+
+    assert results == [25]
+    assert seen == [10, 20]
+    assert not (images_dir / 'Gdrive.list.tmp').exists()
+    assert image_map.ids(str(images_dir)) == ids
+
+
+def test_failed_listing_keeps_the_previous_file(tmp_path):
+    (tmp_path / 'Gdrive.list').write_text('old.png (OLD)\n', encoding='utf-8')
+
+    def rows():
+        yield 'new.png', 'NEW'
+        raise RuntimeError('connection lost')
+
+    with pytest.raises(RuntimeError):
+        generate_gdrive_lists.write_listing(rows(), str(tmp_path))
+
+    assert (tmp_path / 'Gdrive.list').read_text(encoding='utf-8') == 'old.png (OLD)\n'
+    assert not (tmp_path / 'Gdrive.list.tmp').exists()
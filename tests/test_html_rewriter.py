@@ -0,0 +1,54 @@
+"""html_rewriter.py and the substitute_img_src.py callbacks built on it."""
+
+import io
+
+from html_rewriter import rewrite_html, rewrite_stream
+from substitute_img_src import substitute_img_src
+
+DOCUMENT = '''<html><head><style>
+p.MsoNormal { margin: 0 }
+td { background-image: url('images/bg.png') }
+</style></head><body>
+<!--[if gte mso 9]><xml><o:OfficeDocumentSettings/></xml><![endif]-->
+<p class=MsoNormal><img src='images/a.png' alt="images/a.png" width=300>
+<img src=images/b.png><IMG SRC="images/missing.png"></p>
+<img srcset="images/a.png 1x, images/b.png 2x" src="https://example.com/a.png">
+<div style="background: url(images/bg.png)">&nbsp;&amp; text</div>
+<a href="images/a.png">full size</a>
+</body></html>
+'''
+
+
+def drive(file_id):
+    return f'https://lh3.google.com/u/0/d/{file_id}=s400'
+
+
+def test_rewrites_every_url_and_copies_the_rest_verbatim():
+    gdrive_map = {'a.png': 'A', 'b.png': 'B', 'bg.png': 'BG'}
+
+    result = substitute_img_src(DOCUMENT, gdrive_map)
+
+    # Quoting does not matter, and attributes that merely contain the URL are left alone.
+    assert f'<img src="{drive("A")}" alt="images/a.png" width="300">' in result
+    assert f'<img src="{drive("B")}">' in result
+    assert '<IMG SRC="images/missing.png">' in result
+    assert f'srcset="{drive("A")} 1x, {drive("B")} 2x" src="https://example.com/a.png"' in result
+    assert f"td {{ background-image: url('{drive('BG')}') }}" in result
+    assert f'<div style="background: url({drive("BG")})">&nbsp;&amp; text</div>' in result
+    assert f'<a href="{drive("A")}">' in result
+    # Unchanged markup (Word comments, entities, unquoted attributes) is copied byte for byte.
+    assert '<!--[if gte mso 9]><xml><o:OfficeDocumentSettings/></xml><![endif]-->' in result
+    assert '<p class=MsoNormal>' in result
+    assert rewrite_html(DOCUMENT) == DOCUMENT
+
+
+def test_output_does_not_depend_on_chunk_boundaries():
+    def rewrite_url(url, tag, attr):
+        return url.upper() if url.startswith('images/') else None
+
+    expected = rewrite_html(DOCUMENT, rewrite_url)
+    for chunk_size in (1, 7, 64):
+        out = io.StringIO()
+        rewrite_stream(io.StringIO(DOCUMENT), out, rewrite_url, chunk_size=chunk_size)
+        assert out.getvalue() == expected
+    assert 'IMAGES/BG.PNG' in expected and 'IMAGES/MISSING.PNG' in expected
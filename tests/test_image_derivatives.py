@@ -0,0 +1,25 @@
+"""image_derivatives.py: resized copies and their cache."""
+
+from PIL import Image
+
+import image_derivatives
+
+
+def test_cache_follows_the_encoder_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_derivatives, 'CACHE_DIR', str(tmp_path / 'cache'))
+    source = tmp_path / 'photo.jpg'
+    Image.effect_noise((800, 400), 64).convert('RGB').save(source, quality=95)
+
+    name, entries = image_derivatives.build_derivatives_for(str(source))
+    assert name == 'photo.jpg'
+    assert [(e['width'], e['height'], e['file']) for e in entries] == [
+        (320, 160, 'photo.320w.webp'), (640, 320, 'photo.640w.webp'), (800, 400, 'photo.800w.webp')]
+    first = (tmp_path / 'photo.320w.webp').read_bytes()
+
+    # Same source, other quality: re-encoded into a new cache entry and copied over the old file.
+    monkeypatch.setattr(image_derivatives, 'QUALITY', 30)
+    image_derivatives.build_derivatives_for(str(source))
+    assert (tmp_path / 'photo.320w.webp').read_bytes() != first
+    sha = image_derivatives.file_sha256(str(source))
+    assert sorted(p.name for p in (tmp_path / 'cache' / sha).iterdir()) == [
+        'webp-q30-320-640-1024-1600', 'webp-q82-320-640-1024-1600']
@@ -0,0 +1,78 @@
+"""image_map.py: Gdrive.list import, ID lookups and cached checksums."""
+
+import os
+
+import image_map
+from image_map import ImageMap, find_image_map, load_image_ids
+
+
+def write_list(images_dir, text):
+    images_dir.mkdir(parents=True, exist_ok=True)
+    (images_dir / 'Gdrive.list').write_text(text, encoding='utf-8')
+
+
+def test_imports_a_gdrive_list_only_after_it_changed(tmp_path, monkeypatch):
+    images_dir = tmp_path / 'post' / 'images'
+    write_list(images_dir, 'figure 1 (copy).png (ID1)\nplain.jpg (ID2)\nnot a listing line\n')
+    write_list(tmp_path / 'other' / 'images', 'x.png (X)\n')
+    store = ImageMap(str(tmp_path))
+    imports = []
+    original = image_map.iter_gdrive_list
+    monkeypatch.setattr(image_map, 'iter_gdrive_list', lambda path: imports.append(path) or original(path))
+
+    assert store.import_tree() == 2
+    assert store.import_tree() == 0
+    # Names may contain parentheses; the ID is the last parenthesised token.
+    assert store.ids(str(images_dir)) == {'figure 1 (copy).png': 'ID1', 'plain.jpg': 'ID2'}
+    assert store.lookup(str(images_dir), 'figure 1 (copy).png') == 'ID1'
+    assert len(imports) == 2
+
+    write_list(images_dir, 'plain.jpg (ID3)\n')
+    os.utime(images_dir / 'Gdrive.list', ns=(1, 1))  # a different mtime, even on coarse clocks
+    assert store.ids(str(images_dir)) == {'plain.jpg': 'ID3'}
+    assert store.ids(str(images_dir)) == {'plain.jpg': 'ID3'}
+    assert len(imports) == 3
+
+    # set_ids() takes the current file as matching, so it is not parsed again.
+    store.set_ids(str(images_dir), {'plain.jpg': 'ID4', 'new.png': 'ID5'})
+    assert store.ids(str(images_dir)) == {'plain.jpg': 'ID4', 'new.png': 'ID5'}
+    assert len(imports) == 3
+    assert store.stats() == {'folders': 2, 'mapped': 3, 'hashed': 0, 'total': 4}
+    store.close()
+
+
+def test_checksums_are_reused_until_the_file_changes(tmp_path):
+    images_dir = tmp_path / 'post' / 'images'
+    write_list(images_dir, 'a.png (A)\n')
+    image = images_dir / 'a.png'
+    image.write_bytes(b'one')
+    store = ImageMap(str(tmp_path))
+    assert store.ids(str(images_dir)) == {'a.png': 'A'}
+
+    assert store.cached_md5(str(image)) is None
+    store.record_file(str(image), 'md5-one')
+    assert store.cached_md5(str(image)) == 'md5-one'
+    assert store.find_by_md5('md5-one') == [('post/images', 'a.png', 'A')]
+
+    # A new listing without the name drops its ID but keeps the checksum.
+    write_list(images_dir, 'b.png (B)\n')
+    assert store.import_list(str(images_dir))
+    assert store.find_by_md5('md5-one') == [('post/images', 'a.png', None)]
+
+    image.write_bytes(b'three')
+    assert store.cached_md5(str(image)) is None
+    store.close()
+
+
+def test_load_image_ids_uses_the_nearest_map(tmp_path):
+    images_dir = tmp_path / 'site' / 'post' / 'images'
+    write_list(images_dir, 'a.png (A)\n')
+    assert find_image_map(str(images_dir)) is None
+    assert load_image_ids(str(images_dir)) == {'a.png': 'A'}
+
+    ImageMap(str(tmp_path / 'site')).close()
+    found = find_image_map(str(images_dir))
+    assert found.root == str(tmp_path / 'site')
+    assert find_image_map(str(tmp_path / 'site')) is found
+    assert load_image_ids(str(images_dir)) == {'a.png': 'A'}
+    assert found.folder_key(str(images_dir)) == 'post/images'
@@ -0,0 +1,58 @@
+"""mirror_blog.py's incremental sync against the local stub (fake_google_api.py)."""
+
+import pytest
+from google.auth.credentials import AnonymousCredentials
+
+import google_services
+import mirror_blog
+import rate_limit
+from fake_google_api import FakeGoogleApi
+
+LIST = 'GET /v3/blogs/*/posts'
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeGoogleApi().start()
+    monkeypatch.setenv(google_services.API_ROOT_ENV, server.root_url)
+    google_services.clear_services()
+    rate_limit.set_limits('blogger', 1000, 100, 1000)
+    yield server
+    server.stop()
+    google_services.clear_services()
+
+
+def test_sync_fetches_only_posts_updated_since_the_last_one(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(mirror_blog, 'PAGE_SIZE', 2)
+    blogger = server.blogger
+    posts = [blogger.insert('BLOG', {'title': f'Post {i}', 'content': f'<p>{i}</p>'}) for i in range(5)]
+    for i, post in enumerate(posts):
+        post['updated'] = f'2026-01-01T1{i}:00:00Z'
+    service = google_services.get_service('blogger', 'v3', AnonymousCredentials())
+    mirror = mirror_blog.BlogMirror(str(tmp_path / 'mirror.sqlite'))
+
+    assert mirror.sync(service, 'BLOG') == (5, 0)
+    assert server.calls[LIST] == 3
+    assert mirror.last_updated('BLOG') == '2026-01-01T14:00:00.000000+00:00'
+    assert mirror.content(posts[2]['url']) == '<p>2</p>'
+
+    # Nothing changed: one call, stopped at the first page.
+    server.reset_counts()
+    assert mirror.sync(service, 'BLOG') == (0, 0)
+    assert server.calls[LIST] == 1
+
+    # 10:00-05:00 is 15:00 UTC, newer than the last sync although it sorts lower as text.
+    blogger.patch('BLOG', posts[0]['id'], {'content': '<p>edited</p>'})
+    posts[0]['updated'] = '2026-01-01T10:00:00-05:00'
+    server.reset_counts()
+    assert mirror.sync(service, 'BLOG') == (1, 0)
+    assert server.calls[LIST] == 1
+    assert mirror.content(posts[0]['id']) == '<p>edited</p>'
+    assert mirror.last_updated('BLOG') == '2026-01-01T15:00:00.000000+00:00'
+
+    # Deletions only show up in a full sync.
+    del blogger.posts[posts[1]['id']]
+    assert mirror.sync(service, 'BLOG') == (0, 0)
+    assert mirror.sync(service, 'BLOG', full=True) == (4, 1)
+    assert [row['title'] for row in mirror.posts('BLOG')] == ['Post 0', 'Post 4', 'Post 3', 'Post 2']
+    mirror.close()
@@ -0,0 +1,25 @@
+"""optimize_assets.py: what gets inlined, and how it is counted."""
+
+from PIL import Image
+
+from optimize_assets import AssetOptimizer
+from substitute_img_src import substitute_img_src
+
+
+def test_inlines_images_and_css_but_not_links(tmp_path):
+    images_dir = tmp_path / 'images'
+    images_dir.mkdir()
+    Image.new('RGB', (4, 2), 'red').save(images_dir / 'dot.png')
+    html_content = ('<a href="images/dot.png">full size</a>'
+                    '<img src="images/dot.png" srcset="images/dot.png 1x, images/dot.png 2x">'
+                    '<div style="background: url(images/dot.png)"></div>')
+    optimizer = AssetOptimizer(str(images_dir))
+
+    result = substitute_img_src(html_content, {}, optimizer=optimizer)
+
+    assert '<a href="images/dot.png">' in result
+    assert result.count('data:image/png;base64,') == 4  # src, both srcset candidates, style
+    assert 'width="4" height="2"' in result
+    # One file inlined four times still saves a single request.
+    assert optimizer.stats['inlined'] == 1
+    assert optimizer.stats['inlined_bytes'] == (images_dir / 'dot.png').stat().st_size
@@ -0,0 +1,55 @@
+"""rate_limit.py: AIMD adaptation, retries and the quota ledger."""
+
+import pytest
+from google.auth.credentials import AnonymousCredentials
+
+import google_services
+from fake_google_api import FakeGoogleApi
+from rate_limit import QuotaLedger, RateLimiter
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeGoogleApi(retry_after=0.01).start()
+    monkeypatch.setenv(google_services.API_ROOT_ENV, server.root_url)
+    google_services.clear_services()
+    yield server
+    server.stop()
+    google_services.clear_services()
+
+
+def test_speeds_up_on_success_and_halves_when_throttled():
+    limiter = RateLimiter(2, max_rate=3, min_rate=0.5, ledger=QuotaLedger())
+
+    limiter.on_success()
+    assert limiter.rate == 2.5
+    limiter.on_success()
+    limiter.on_success()
+    assert limiter.rate == 3  # capped at max_rate
+
+    for _ in range(4):
+        limiter.on_throttled()
+    assert limiter.rate == 0.5  # floored at min_rate
+
+    # Only throttling and server errors are retried.
+    assert limiter.retry_delay(0, 404) is None
+    assert limiter.retry_delay(0, 403, 'forbidden') is None
+    assert limiter.retry_delay(limiter.max_retries, 503) is None
+
+
+def test_retries_throttled_requests_and_records_them(server, monkeypatch):
+    failures = iter([True, True])
+    monkeypatch.setattr(server, 'should_fail', lambda: next(failures, False))
+    ledger = QuotaLedger()
+    limiter = RateLimiter(8, 8, 16, ledger=ledger, backoff_base=0.01)
+    service = google_services.get_service('drive', 'v3', AnonymousCredentials())
+
+    result = limiter.execute(service.files().list(fields='files(id, name)'))
+
+    assert result['files'] == []
+    assert server.calls['throttled:GET /drive/v3/files'] == 2
+    assert server.calls['GET /drive/v3/files'] == 1
+    # 429 with Retry-After, then 403 rateLimitExceeded: halved twice, then one success.
+    assert limiter.rate == 2.5
+    assert ledger.methods == {'drive.files.list': {'calls': 3, 'units': 3, 'retries': 2, 'throttled': 2}}
+    assert 'drive.files.list: 3 call(s), 3 unit(s), 2 retried, 2 throttled' in ledger.report()
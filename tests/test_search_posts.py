@@ -0,0 +1,25 @@
+"""search_posts.py: full-text index and near-duplicate detection."""
+
+from search_posts import SearchIndex, duplicate_groups
+
+TEXT = ' '.join(f'word{i}' for i in range(200))
+
+
+def test_near_duplicates_ignore_documents_without_text(tmp_path):
+    root = tmp_path / 'posts'
+    root.mkdir()
+    (root / 'empty1.html').write_text('<p><img src="images/a.png"></p>', encoding='utf-8')
+    (root / 'empty2.html').write_text('<script>var x = 1;</script>', encoding='utf-8')
+    (root / 'draft.html').write_text(f'<p>{TEXT}</p>', encoding='utf-8')
+    (root / 'draft_v2.html').write_text(f'<p>{TEXT} one more</p>', encoding='utf-8')
+    (root / 'other.html').write_text('<p>' + ' '.join(f'other{i}' for i in range(200)) + '</p>', encoding='utf-8')
+    index = SearchIndex(str(tmp_path / 'search.sqlite'))
+
+    assert index.update_files([str(root)]) == (5, 0)
+    groups = duplicate_groups(index.near_duplicates(0.8))
+
+    assert [sorted(members) for _, members in groups] == [
+        [f'file:{root / "draft.html"}', f'file:{root / "draft_v2.html"}']]
+    assert [row['source'] for row in index.query('word150')] == [
+        f'file:{root / "draft.html"}', f'file:{root / "draft_v2.html"}']
+    index.close()
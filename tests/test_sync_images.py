@@ -0,0 +1,46 @@
+"""sync_images.py's upload planning against the local stub (fake_google_api.py)."""
+
+import hashlib
+
+import pytest
+from google.auth.credentials import AnonymousCredentials
+
+import google_services
+import rate_limit
+import sync_images
+from drive_index import DriveIndex
+from fake_google_api import FakeGoogleApi
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeGoogleApi().start()
+    monkeypatch.setenv(google_services.API_ROOT_ENV, server.root_url)
+    google_services.clear_services()
+    rate_limit.set_limits('drive', 1000, 100, 1000)
+    yield server
+    server.stop()
+    google_services.clear_services()
+
+
+def test_reuses_identical_files_only_from_the_blog_tree(server, tmp_path):
+    drive = server.drive
+    blog_id = drive.folder('Blog')
+    folder_id = drive.folder('Blog/post/images')
+    in_folder = drive.add('old-name.png', folder_id, 'image/png', b'a')
+    drive.add('a.png', drive.folder('Unrelated'), 'image/png', b'a')
+    in_blog = drive.add('b.png', drive.folder('Blog/other/images'), 'image/png', b'b')
+    drive.add('c.png', drive.folder('Shared with me'), 'image/png', b'c')
+    index = DriveIndex(str(tmp_path / 'index.sqlite'))
+    index.sync(google_services.get_service('drive', 'v3', AnonymousCredentials()))
+    local_dir = tmp_path / 'images'
+    local_dir.mkdir()
+    for name, data in (('a.png', b'a'), ('b.png', b'b'), ('c.png', b'c')):
+        (local_dir / name).write_bytes(data)
+
+    id_map, uploads = sync_images.plan_folder(index, folder_id, str(local_dir), scope_id=blog_id)
+
+    # The copy in the same folder wins over the one elsewhere; outside the blog nothing is reused.
+    assert id_map == {'a.png': in_folder['id'], 'b.png': in_blog['id']}
+    assert [(u['name'], u['md5']) for u in uploads] == [('c.png', hashlib.md5(b'c').hexdigest())]
+    index.close()
@@ -0,0 +1,56 @@
+"""tracing.py: spans, counters and the files written at the end of a run."""
+
+import json
+
+import pytest
+
+import tracing
+
+
+def test_is_a_no_op_until_enabled():
+    assert not tracing.enabled()
+    with tracing.span('anything', x=1) as s:
+        s.set(y=2)
+    tracing.count('nothing')
+    assert tracing.span('other') is tracing.span('anything')
+
+
+def test_writes_nested_spans_counters_and_folded_stacks(tmp_path, monkeypatch, capsys):
+    monkeypatch.delenv('BLOG_TRACE', raising=False)
+    monkeypatch.delenv('BLOG_PROFILE', raising=False)
+    path = tmp_path / 'trace.jsonl'
+
+    @tracing.traced('publish')
+    def publish(name):
+        with tracing.span('read', file=name):
+            tracing.count('bytes_read', 10)
+        with tracing.span('api') as s:
+            s.set(post_id='42')
+
+    argv = ['create_post.py', f'--trace={path}', 'post.html']
+    assert tracing.setup_from_argv(argv) == ['create_post.py', 'post.html']
+    try:
+        publish('post.html')
+        with pytest.raises(ValueError):
+            with tracing.span('publish'):
+                raise ValueError('boom')
+    finally:
+        tracing.finish()
+
+    records = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    spans = {(r['name'], r['id']): r for r in records if r['type'] == 'span'}
+    outer = spans[('publish', 1)]
+    assert outer['parent'] is None
+    assert spans[('read', 2)]['parent'] == 1 and spans[('read', 2)]['attrs'] == {'file': 'post.html'}
+    assert spans[('api', 3)]['attrs'] == {'post_id': '42'}
+    assert spans[('publish', 4)]['attrs'] == {'error': 'ValueError'}
+    assert records[-1] == {'type': 'counters', 'counters': {'bytes_read': 10}}
+
+    folded = dict(line.rsplit(' ', 1) for line in (tmp_path / 'trace.jsonl.folded').read_text().splitlines())
+    assert set(folded) <= {'publish', 'publish;read', 'publish;api'}
+    assert 'publish;read' in folded
+
+    summary = tracing.summarize_file(str(path))
+    assert 'publish' in summary and '2x' in summary and '# bytes_read: 10' in summary
+    assert 'Trace summary' in capsys.readouterr().err
+    assert not tracing.enabled()
@@ -0,0 +1,88 @@
+"""watch.py: event filtering, debouncing and per-folder rebuilds."""
+
+import os
+
+import watch
+
+
+class ScriptedWatcher:
+    """Returns the scripted change sets; each read() advances a fake clock by what it waited."""
+
+    def __init__(self, clock, batches, busy=None, step=0.1):
+        self.clock = clock
+        self.step = step
+        self.batches = list(batches)
+        self.busy = busy  # returned forever once the script is used up
+        self.timeouts = []
+
+    def read(self, timeout=None):
+        self.timeouts.append(timeout)
+        if self.batches:
+            self.clock[0] += self.step
+            return self.batches.pop(0)
+        if self.busy is not None:
+            self.clock[0] += self.step
+            return set(self.busy)
+        self.clock[0] += timeout
+        return set()
+
+
+def test_ignores_generated_and_temporary_files():
+    for name in ('post_Gdrive.html', 'post_clean.html', '.post.html.swp', 'post.html~', '~$post.html',
+                 'derivatives.json', '.build_state.json', 'photo.640w.webp', '#post.html#'):
+        assert watch.is_ignored(f'/site/post/{name}'), name
+    assert not watch.is_ignored('/site/post/post.html')
+    assert not watch.is_ignored('/site/post/images/photo.jpg')
+    assert watch.post_folder('/site/post/images/photo.jpg') == '/site/post'
+    assert watch.post_folder('/site/post/post.html') == '/site/post'
+
+
+def test_next_batch_waits_for_a_quiet_period(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(watch.time, 'monotonic', lambda: clock[0])
+    watcher = ScriptedWatcher(clock, [{'/s/p/p.html'}, {'/s/p/.p.html.swp', '/s/p/images/a.png'},
+                                      {'/s/p/p_Gdrive.html'}])
+
+    assert watch.next_batch(watcher, debounce=1.0, max_delay=10.0) == {'/s/p/p.html', '/s/p/images/a.png'}
+    assert watcher.timeouts == [None, 1.0, 1.0, 1.0]
+
+
+def test_next_batch_gives_up_after_max_delay(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(watch.time, 'monotonic', lambda: clock[0])
+    watcher = ScriptedWatcher(clock, [], busy={'/s/p/p.html'}, step=1.0)
+
+    assert watch.next_batch(watcher, debounce=2.0, max_delay=5.0) == {'/s/p/p.html'}
+    # The first event arrives at t=1; events every second keep the batch open until t=6,
+    # and the last wait is cut short by the deadline.
+    assert clock[0] == 6.0
+    assert watcher.timeouts == [None, 2.0, 2.0, 2.0, 2.0, 1.0]
+
+
+def test_polling_watcher_reports_changed_files(tmp_path):
+    post = tmp_path / 'post.html'
+    post.write_text('one', encoding='utf-8')
+    watcher = watch.PollingWatcher(str(tmp_path), interval=0.01)
+
+    assert watcher.read(0.05) == set()
+    post.write_text('two!', encoding='utf-8')
+    (tmp_path / 'new.html').write_text('new', encoding='utf-8')
+    assert watcher.read(0.05) == {str(post), str(tmp_path / 'new.html')}
+
+
+def test_rebuilds_only_the_touched_folder(tmp_path):
+    for name in ('trip', 'notes'):
+        (tmp_path / name / 'images').mkdir(parents=True)
+        (tmp_path / name / f'{name}.html').write_text('<img src="images/a.png">', encoding='utf-8')
+        (tmp_path / name / 'images' / 'Gdrive.list').write_text('a.png (A)\n', encoding='utf-8')
+    rebuilder = watch.Rebuilder(str(tmp_path), publish=False)
+    trip_list = tmp_path / 'trip' / 'images' / 'Gdrive.list'
+
+    assert rebuilder.handle({str(trip_list)}) == 0
+    assert os.path.exists(tmp_path / 'trip' / 'trip_Gdrive.html')
+    assert not os.path.exists(tmp_path / 'notes' / 'notes_Gdrive.html')
+
+    trip_list.write_text('a.png (B)\n', encoding='utf-8')
+    assert rebuilder.rebuild(str(tmp_path / 'trip')) == [f"substitute:{tmp_path / 'trip' / 'trip.html'}"]
+    assert rebuilder.rebuild(str(tmp_path / 'trip')) == []
+    assert 'd/B=s400' in (tmp_path / 'trip' / 'trip_Gdrive.html').read_text(encoding='utf-8')
@@ -0,0 +1,91 @@
+"""zip_ingest.py against the local stub (fake_google_api.py)."""
+
+import zipfile
+
+import pytest
+from google.auth.credentials import AnonymousCredentials
+
+import google_services
+import rate_limit
+import zip_ingest
+from drive_index import DriveIndex
+from fake_google_api import FakeGoogleApi
+from image_map import ImageMap
+
+HTML = '<p><img src="images/a.png"><img src="images/copy.png"><img src="images/old.png"></p>'
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeGoogleApi().start()
+    monkeypatch.setenv(google_services.API_ROOT_ENV, server.root_url)
+    google_services.clear_services()
+    rate_limit.set_limits('drive', 1000, 100, 1000)
+    yield server
+    server.stop()
+    google_services.clear_services()
+
+
+def drive_url(file_id):
+    return f'https://lh3.google.com/u/0/d/{file_id}=s400'
+
+
+def test_uploads_each_new_image_once_and_rewrites_the_html(server, tmp_path, monkeypatch):
+    drive = server.drive
+    old = drive.add('old.png', drive.folder('Blog/other/images'), 'image/png', b'old')
+    drive.add('a.png', drive.folder('Elsewhere'), 'image/png', b'a')  # outside the site: not reused
+    site = tmp_path / 'Blog'
+    (site / 'post').mkdir(parents=True)
+    zip_path = site / 'post' / 'export.zip'
+    with zipfile.ZipFile(zip_path, 'w') as archive:
+        archive.writestr('post.html', HTML)
+        archive.writestr('images/a.png', b'a')
+        archive.writestr('images/copy.png', b'a')
+        archive.writestr('images/old.png', b'old')
+        archive.writestr('../escape.png', b'x')
+    reads = []
+    original = zip_ingest.read_member
+    monkeypatch.setattr(zip_ingest, 'read_member', lambda archive, info: reads.append(info.filename)
+                        or original(archive, info))
+    creds = AnonymousCredentials()
+    service = google_services.get_service('drive', 'v3', creds)
+    index = DriveIndex(str(tmp_path / 'index.sqlite'))
+    index.sync(service)
+    image_map = ImageMap(str(site))
+
+    assert zip_ingest.ingest_archive(service, creds, str(tmp_path), str(zip_path), index, image_map) == 0
+
+    assert sorted(reads) == ['images/a.png', 'images/copy.png', 'images/old.png']
+    folder_id = index.resolve_path('Blog/post/images')
+    uploaded = [item for item in drive.files.values() if folder_id in item.get('parents', [])]
+    assert [item['name'] for item in uploaded] == ['a.png']
+    ids = {'a.png': uploaded[0]['id'], 'copy.png': uploaded[0]['id'], 'old.png': old['id']}
+    assert (site / 'post' / 'post_Gdrive.html').read_text(encoding='utf-8') == (
+        f'<p><img src="{drive_url(ids["a.png"])}"><img src="{drive_url(ids["copy.png"])}">'
+        f'<img src="{drive_url(ids["old.png"])}"></p>')
+    assert image_map.ids(str(site / 'post' / 'images')) == ids
+    assert sorted(p.name for p in (site / 'post').iterdir()) == ['export.zip', 'post_Gdrive.html']
+
+    # A second run finds everything on Drive already.
+    server.reset_counts()
+    assert zip_ingest.ingest_archive(service, creds, str(tmp_path), str(zip_path), index, image_map) == 0
+    assert not any(endpoint.startswith(('POST', 'PUT')) for endpoint in server.calls)
+    index.close()
+    image_map.close()
+
+
+def test_member_upload_resumes_from_json(tmp_path):
+    zip_path = tmp_path / 'export.zip'
+    data = bytes(range(256)) * 40
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('images/big.png', data)
+    with zipfile.ZipFile(zip_path) as archive:
+        media = zip_ingest.ZipMemberUpload(str(zip_path), archive.getinfo('images/big.png'), 'image/png',
+                                           chunksize=4096)
+
+    revived = zip_ingest.ZipMemberUpload.from_json(media.to_json())
+
+    assert (revived.size(), revived.mimetype(), revived.chunksize()) == (len(data), 'image/png', 4096)
+    assert revived.getbytes(4096, 4096) == data[4096:8192]
+    assert revived.getbytes(0, 10) == data[:10]  # a resent chunk seeks back
+    assert revived.getbytes(8192, 4096) == data[8192:]